@@ -0,0 +1,264 @@
+"""
+ASGI entry point for the KidSafe Analyzer API.
+
+The request paths that spend their time waiting on the network run natively
+async here: /api/analyze/stream drives IngredientAnalyzer through LangGraph
+astream with async retrievers and async LLM clients, and /api/chat calls the
+LLM asynchronously. /api/analyze awaits the async analysis path
+(aanalyze_ingredients / aanalyze_report), so concurrent duplicates are
+coalesced on the event loop and no request holds a worker thread; it is
+admitted by the shared analysis pool's async slots (AnalysisWorkerPool.arun)
+and counted with the threaded analyses. Every other route is served by the
+existing Flask app in main.py, so the API surface is identical.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import main
+from backend.analysis_report import render_markdown
+from backend.config import ANALYSIS_MODES, DEFAULT_ANALYSIS_MODE
+from backend.chat_sessions import chat_sessions
+from backend.metrics import metrics
+from backend.rule_engine import classify_ingredients
+
+# Flask-CORS handles the mounted Flask routes; the async routes need their own
+ASYNC_ROUTE_MIDDLEWARE = [Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])]
+
+
+def not_initialized_response() -> JSONResponse:
+    """Error response used before the RAG system is ready."""
+    return JSONResponse({
+        'success': False,
+        'error': 'System not initialized. Please configure API keys first.'
+    }, status_code=400)
+
+
+async def arun_analysis(cereal_name, ingredients, mode):
+    """Async variant of main.run_analysis."""
+    analyzer = main.ingredient_analyzer
+    if mode == 'structured':
+        report = await analyzer.aanalyze_report(cereal_name, ingredients)
+        return render_markdown(report), report
+    return await analyzer.aanalyze_ingredients(cereal_name, ingredients, mode), None
+
+
+async def analyze_ingredients(request: Request) -> JSONResponse:
+    """Analyze ingredients for a cereal product (async)."""
+    analyzer = main.ingredient_analyzer
+    if analyzer is None:
+        return not_initialized_response()
+
+    try:
+        data = await request.json()
+        cereal_name = data.get('cereal_name')
+        ingredients = data.get('ingredients')
+        generate_video = data.get('generate_video', True)
+        generate_audio = data.get('generate_audio', False)
+        mode = data.get('mode', DEFAULT_ANALYSIS_MODE)
+
+        if not cereal_name or not ingredients:
+            return JSONResponse({
+                'success': False,
+                'error': 'Missing cereal_name or ingredients'
+            }, status_code=400)
+
+        if mode not in ANALYSIS_MODES:
+            return JSONResponse(main.invalid_mode_error(mode), status_code=400)
+
+        print(f"Analyzing ingredients for: {cereal_name} ({mode}, async)")
+
+        rule_verdict = classify_ingredients(ingredients)
+        analysis, report = await main.analysis_pool.arun(arun_analysis, cereal_name, ingredients, mode)
+
+        result = {
+            'success': True,
+            'cereal_name': cereal_name,
+            'ingredients': ingredients,
+            'mode': mode,
+            'rule_verdict': rule_verdict,
+            'analysis': analysis
+        }
+        if report is not None:
+            result['report'] = report
+
+        result['session_id'] = chat_sessions.create(cereal_name, ingredients, analysis)['session_id']
+
+        # Media is generated in the background; clients follow the job IDs
+        if generate_video:
+            result['video'] = main.queue_video(analysis, cereal_name, report, rule_verdict=rule_verdict)
+        if generate_audio:
+            result['audio'] = main.queue_audio(analysis, cereal_name, report)
+
+        return JSONResponse(result)
+
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+
+async def analyze_ingredients_stream(request: Request):
+    """Stream an ingredient analysis as newline-delimited JSON events (async)."""
+    started = time.perf_counter()
+
+    analyzer = main.ingredient_analyzer
+    if analyzer is None:
+        return not_initialized_response()
+
+    data = await request.json()
+    cereal_name = data.get('cereal_name')
+    ingredients = data.get('ingredients')
+    mode = data.get('mode', DEFAULT_ANALYSIS_MODE)
+    generate_video = data.get('generate_video', False)
+    generate_audio = data.get('generate_audio', False)
+
+    if not cereal_name or not ingredients:
+        return JSONResponse({
+            'success': False,
+            'error': 'Missing cereal_name or ingredients'
+        }, status_code=400)
+
+    if mode not in ANALYSIS_MODES:
+        return JSONResponse(main.invalid_mode_error(mode), status_code=400)
+
+    async def generate():
+        speculative_video = None
+        confirmed = False
+        try:
+            rule_verdict = classify_ingredients(ingredients)
+            yield json.dumps({'type': 'rule_verdict', **rule_verdict}) + "\n"
+            metrics.observe('analyze_stream_ttfb_seconds', time.perf_counter() - started)
+
+            # Streams run on the connection, outside the worker pool (see AnalysisWorkerPool.streaming)
+            with main.analysis_pool.streaming('astream'):
+                async for event in analyzer.astream_analysis(cereal_name, ingredients, mode):
+                    if event['type'] == 'verdict':
+                        metrics.observe('analyze_stream_verdict_seconds', time.perf_counter() - started)
+                    elif event['type'] == 'done':
+                        event['session_id'] = chat_sessions.create(cereal_name, ingredients, event['analysis'])['session_id']
+                        if generate_video:
+                            event['video'] = main.confirm_speculative_video(
+                                speculative_video, event['analysis'], cereal_name, event.get('report'), rule_verdict
+                            )
+                            confirmed = True
+                        if generate_audio:
+                            event['audio'] = main.queue_audio(event['analysis'], cereal_name, event.get('report'))
+                    yield json.dumps(event) + "\n"
+
+                    # Start rendering while the rest of the analysis is generated
+                    if event['type'] == 'verdict' and generate_video and speculative_video is None:
+                        speculative_video = main.queue_speculative_video(event['verdict'], cereal_name, rule_verdict)
+                        yield json.dumps({'type': 'video', 'speculative': True, 'video': speculative_video}) + "\n"
+                metrics.inc('analyze_stream_requests_total', status='ok')
+        except Exception as e:
+            metrics.inc('analyze_stream_requests_total', status='error')
+            yield json.dumps({'type': 'error', 'error': str(e)}) + "\n"
+        finally:
+            # Failed or abandoned streams don't leave a video rendering
+            if speculative_video is not None and not confirmed:
+                main.cancel_speculative_video(speculative_video)
+            metrics.observe('analyze_stream_duration_seconds', time.perf_counter() - started)
+
+    return StreamingResponse(
+        generate(),
+        media_type='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def alookup_cached_answer(session, question):
+    """Async variant of main.lookup_cached_answer."""
+    answer_cache = main.answer_cache
+    if answer_cache is None or session['history'] or session['summary']:
+        return None
+    bucket = answer_cache.bucket_key(
+        session['cereal_name'], session['ingredients'], session['analysis'], main.CHAT_PROMPT_VERSION
+    )
+    return await answer_cache.alookup(bucket, question)
+
+
+async def chat(request: Request) -> JSONResponse:
+    """Handle chatbot questions about ingredients (async)."""
+    if main.ingredient_analyzer is None:
+        return not_initialized_response()
+
+    try:
+        body = await request.body()
+        data = json.loads(body)
+        question = data.get('question')
+
+        if not question:
+            return JSONResponse({
+                'success': False,
+                'error': 'Missing question'
+            }, status_code=400)
+
+        session, chat_mode = main.open_chat_session(data)
+        if session is None:
+            return JSONResponse(main.SESSION_EXPIRED_ERROR, status_code=404)
+
+        lookup = await alookup_cached_answer(session, question)
+        cached = bool(lookup and lookup['answer'] and not lookup['audit'])
+        if cached:
+            answer = lookup['answer']
+        else:
+            await main.create_history_compactor().acompact(session)
+            response = await main.create_chat_llm().ainvoke(
+                main.build_session_messages(session, question),
+                config={"metadata": {"prompt_version": main.CHAT_PROMPT_VERSION}}
+            )
+            main.record_chat_turn(response, chat_mode, len(body))
+            answer = response.content
+            if lookup and lookup['audit']:
+                await main.answer_cache.aaudit(lookup, answer)
+            elif lookup:
+                main.answer_cache.store(lookup, answer)
+        chat_sessions.append(session, question, answer)
+
+        return JSONResponse({
+            'success': True,
+            'answer': answer,
+            'cached': cached,
+            'session_id': session['session_id']
+        })
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Initialize the RAG system once at startup (off the event loop)."""
+    await asyncio.to_thread(main.initialize_system)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/api/analyze', analyze_ingredients, methods=['POST'], middleware=ASYNC_ROUTE_MIDDLEWARE),
+        Route('/api/analyze/stream', analyze_ingredients_stream, methods=['POST'], middleware=ASYNC_ROUTE_MIDDLEWARE),
+        Route('/api/chat', chat, methods=['POST'], middleware=ASYNC_ROUTE_MIDDLEWARE),
+        Mount('/', app=WSGIMiddleware(main.app)),
+    ],
+    lifespan=lifespan
+)
@@ -19,9 +19,11 @@ from langchain_core.stores import InMemoryStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_cohere import CohereRerank
 from langchain_core.documents import Document
-from langchain_openai import ChatOpenAI
 from langchain_qdrant import QdrantVectorStore
 
+from backend.clients import clients
+from backend.instrumentation import TimedCompressor
+
 
 class AdvancedRetrievalManager:
     """Manages advanced retrieval strategies."""
@@ -46,7 +48,7 @@ class AdvancedRetrievalManager:
         self.documents = documents
         self.openai_api_key = openai_api_key
         self.cohere_api_key = cohere_api_key
-        self.llm = ChatOpenAI(model="gpt-4o-mini", api_key=openai_api_key)
+        self.llm = clients.chat_model("gpt-4o-mini", temperature=0.7, api_key=openai_api_key)
         
     def get_naive_retriever(self, k: int = 5):
         """
@@ -58,7 +60,7 @@ class AdvancedRetrievalManager:
         Returns:
             Retriever instance
         """
-        return self.vectorstore.as_retriever(search_kwargs={"k": k})
+        return self.vectorstore.as_retriever(search_kwargs={"k": k}, name="naive_vector")
     
     def get_bm25_retriever(self, k: int = 5):
         """
@@ -70,7 +72,7 @@ class AdvancedRetrievalManager:
         Returns:
             BM25Retriever instance
         """
-        return BM25Retriever.from_documents(self.documents, k=k)
+        return BM25Retriever.from_documents(self.documents, k=k, name="bm25")
     
     def get_multi_query_retriever(self, k: int = 5):
         """
@@ -109,18 +111,22 @@ class AdvancedRetrievalManager:
             print("Warning: Cohere API key not provided. Compression retriever unavailable.")
             return None
         
-        base_retriever = self.vectorstore.as_retriever(search_kwargs={"k": k})
+        base_retriever = self.vectorstore.as_retriever(search_kwargs={"k": k}, name="rerank_candidates")
         
-        # Cohere Rerank for compression
-        compressor = CohereRerank(
-            model="rerank-english-v3.0",
-            cohere_api_key=self.cohere_api_key,
-            top_n=top_n
+        # Cohere Rerank for compression (timed, since compressors emit no callbacks)
+        compressor = TimedCompressor(
+            compressor=CohereRerank(
+                model="rerank-english-v3.0",
+                cohere_api_key=self.cohere_api_key,
+                top_n=top_n
+            ),
+            name="cohere_rerank"
         )
         
         return ContextualCompressionRetriever(
             base_compressor=compressor,
-            base_retriever=base_retriever
+            base_retriever=base_retriever,
+            name="cohere_rerank"
         )
     
     def get_parent_document_retriever(
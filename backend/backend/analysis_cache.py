@@ -0,0 +1,278 @@
+"""
+Persistent SQLite cache for ingredient analysis results.
+
+Entries are keyed by the canonical product name and canonical ingredient list
+(see ingredient_parser) plus a version hash covering the analysis prompt, chat
+model, retrieval strategy and corpus version, so any change to those
+automatically invalidates old results.
+
+Entries can also carry LSH band hashes of their ingredient list (see
+near_duplicates), indexed so that similar ingredient lists can be found
+without scanning the cache.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from backend.config import (
+    ANALYSIS_CACHE_PATH,
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_MAX_AGE_SECONDS
+)
+from backend.ingredient_parser import canonical_ingredient_key
+from backend.metrics import metrics
+
+
+def canonical_text(text: str) -> str:
+    """
+    Normalize free text so trivially different inputs share a cache key.
+
+    Args:
+        text: Product name
+
+    Returns:
+        Lowercased text with collapsed whitespace and separators
+    """
+    text = re.sub(r'\s*,\s*', ', ', text.strip().lower())
+    return re.sub(r'\s+', ' ', text).rstrip('.')
+
+
+def make_version(*parts: str) -> str:
+    """
+    Hash the inputs that determine an analysis into a short version string.
+
+    Args:
+        *parts: Prompt text, model name, retrieval strategy, corpus version, ...
+
+    Returns:
+        Hex digest identifying this configuration
+    """
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """SQLite-backed analysis cache with age and size based eviction."""
+
+    def __init__(
+        self,
+        path: Path = ANALYSIS_CACHE_PATH,
+        max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+        max_age_seconds: int = ANALYSIS_CACHE_MAX_AGE_SECONDS
+    ):
+        """
+        Initialize the analysis cache.
+
+        Args:
+            path: SQLite database file (':memory:' for a throwaway cache)
+            max_entries: Maximum number of cached analyses
+            max_age_seconds: Entries older than this are evicted
+        """
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                cereal_name TEXT NOT NULL,
+                ingredients TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses (accessed_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_bands (
+                key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                rule_key TEXT NOT NULL,
+                band INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_bands_lookup ON analysis_bands (version, band, rule_key)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_bands_key ON analysis_bands (key)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(cereal_name: str, ingredients: str, version: str) -> str:
+        """
+        Build the cache key for an analysis request.
+
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Ingredient list
+            version: Configuration version from make_version()
+
+        Returns:
+            Hex digest cache key
+        """
+        raw = "\x1f".join([canonical_text(cereal_name), canonical_ingredient_key(ingredients), version])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, cereal_name: str, ingredients: str, version: str) -> Optional[str]:
+        """
+        Look up a cached analysis.
+
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Ingredient list
+            version: Configuration version
+
+        Returns:
+            Cached analysis text or None on a miss
+        """
+        key = self.make_key(cereal_name, ingredients, version)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self.max_age_seconds:
+                self._conn.execute("UPDATE analyses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                metrics.inc('analysis_cache_requests_total', result='hit')
+                return row[0]
+
+            self.misses += 1
+
+        metrics.inc('analysis_cache_requests_total', result='miss')
+        return None
+
+    def put(self, cereal_name: str, ingredients: str, version: str, analysis: str,
+            bands: Sequence[int] = (), rule_key: str = ""):
+        """
+        Store an analysis and evict old entries.
+
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Ingredient list
+            version: Configuration version
+            analysis: Generated analysis text
+            bands: LSH band hashes of the ingredient list (empty to leave it
+                out of near-duplicate lookups)
+            rule_key: Rule-engine fingerprint candidates must share
+        """
+        key = self.make_key(cereal_name, ingredients, version)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, version, cereal_name, ingredients, analysis, now, now)
+            )
+            self._conn.execute("DELETE FROM analysis_bands WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO analysis_bands VALUES (?, ?, ?, ?)",
+                [(key, version, rule_key, band) for band in bands]
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def similar(self, version: str, bands: Sequence[int], rule_key: str,
+                limit: int) -> List[Tuple[str, str, str, int]]:
+        """
+        Find cached analyses sharing LSH bands with an ingredient list.
+
+        Args:
+            version: Configuration version
+            bands: LSH band hashes of the ingredient list
+            rule_key: Rule-engine fingerprint candidates must share
+            limit: Maximum number of candidates
+
+        Returns:
+            (cereal_name, ingredients, analysis, shared band count) tuples,
+            most shared bands first
+        """
+        if not bands:
+            return []
+        placeholders = ", ".join("?" * len(bands))
+        with self._lock:
+            return self._conn.execute(
+                f"""
+                SELECT a.cereal_name, a.ingredients, a.analysis, COUNT(*) AS shared
+                FROM analysis_bands b JOIN analyses a ON a.key = b.key
+                WHERE b.version = ? AND b.band IN ({placeholders}) AND b.rule_key = ? AND a.created_at >= ?
+                GROUP BY b.key
+                ORDER BY shared DESC
+                LIMIT ?
+                """,
+                (version, *bands, rule_key, time.time() - self.max_age_seconds, limit)
+            ).fetchall()
+
+    def _evict(self, now: float):
+        """Drop expired entries and the least recently used beyond max_entries."""
+        stale = self._conn.execute(
+            """
+            SELECT key FROM analyses WHERE created_at < ?
+            UNION
+            SELECT key FROM (SELECT key FROM analyses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)
+            """,
+            (now - self.max_age_seconds, self.max_entries)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM analyses WHERE key = ?", stale)
+        self._conn.executemany("DELETE FROM analysis_bands WHERE key = ?", stale)
+
+    def purge_stale_versions(self, *versions: str) -> int:
+        """
+        Delete entries produced under any other configuration version.
+
+        Args:
+            *versions: The current configuration versions (one per analysis mode)
+
+        Returns:
+            Number of entries removed
+        """
+        placeholders = ", ".join("?" * len(versions))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM analyses WHERE version NOT IN ({placeholders})", versions
+            )
+            self._conn.execute(f"DELETE FROM analysis_bands WHERE version NOT IN ({placeholders})", versions)
+            self._conn.commit()
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove every cached analysis."""
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.execute("DELETE FROM analysis_bands")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Report cache size and hit ratio since startup.
+
+        Returns:
+            Dict with entries, hits, misses and hit_ratio
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'max_age_seconds': self.max_age_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
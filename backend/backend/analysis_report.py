@@ -0,0 +1,105 @@
+"""
+Structured analysis reports.
+
+The structured analysis mode asks the LLM for an AnalysisReport instead of
+free-form markdown. Downstream consumers (audio/video scripts, caches, the
+API) read fields directly; markdown is rendered from the report only when a
+text view is needed.
+"""
+
+from typing import Annotated, List, Literal, TypedDict
+
+# Bump when the report schema below changes (invalidates cached reports)
+REPORT_SCHEMA_VERSION = "1"
+
+# Verdict labels as they appear in the markdown view
+VERDICT_LABELS = {
+    "GOOD": "GOOD ✅",
+    "MODERATE": "MODERATE ⚠️",
+    "BAD": "BAD ❌"
+}
+
+
+class RedFlag(TypedDict):
+    """An ingredient that triggers a BAD verdict rule."""
+    ingredient: Annotated[str, ..., "Ingredient name as listed on the label"]
+    reason: Annotated[str, ..., "Why it is a concern for children"]
+
+
+class SugarPosition(TypedDict):
+    """Where an added sugar or sweetener appears in the ingredient list."""
+    ingredient: Annotated[str, ..., "Added sugar or sweetener as listed on the label"]
+    position: Annotated[int, ..., "1-based position in the top-level ingredient list"]
+
+
+class IngredientAssessment(TypedDict):
+    """One entry of the ingredient-by-ingredient breakdown."""
+    name: Annotated[str, ..., "Ingredient or ingredient category"]
+    rating: Literal["Good", "Concerning", "Harmful"]
+    explanation: Annotated[str, ..., "1-3 sentences on nutrition and concerns for children"]
+
+
+class ReportSections(TypedDict):
+    """The detailed analysis sections."""
+    overall_assessment: Annotated[str, ..., "Section 1 as markdown, without the heading"]
+    red_flag_ingredients: Annotated[str, ..., "Section 2 as markdown, without the heading"]
+    added_sugar_analysis: Annotated[str, ..., "Section 3 as markdown, without the heading"]
+    ingredient_breakdown: Annotated[List[IngredientAssessment], ..., "Section 4 entries"]
+    key_concerns: Annotated[List[str], ..., "Section 5, most severe first"]
+    positive_aspects: Annotated[List[str], ..., "Section 6"]
+
+
+class AnalysisReport(TypedDict):
+    """Structured ingredient analysis for a product."""
+    verdict: Literal["GOOD", "MODERATE", "BAD"]
+    summary: Annotated[str, ..., "1-2 sentences explaining the verdict"]
+    red_flags: Annotated[List[RedFlag], ..., "Red flag ingredients (empty if none)"]
+    sugar_positions: Annotated[List[SugarPosition], ..., "Added sugars and their positions (empty if none)"]
+    sections: ReportSections
+
+
+def render_markdown(report: AnalysisReport) -> str:
+    """
+    Render a report in the same markdown layout as the prose analysis.
+
+    Args:
+        report: Structured analysis
+
+    Returns:
+        Analysis markdown
+    """
+    sections = report["sections"]
+    lines = [
+        f"## VERDICT: {VERDICT_LABELS.get(report['verdict'], report['verdict'])}",
+        "",
+        f"**Quick Summary:** {report['summary']}",
+        "",
+        "---",
+        "",
+        "## Detailed Analysis",
+        "",
+        "### 1. Overall Assessment",
+        sections["overall_assessment"].strip(),
+        "",
+        "### 2. Red Flag Ingredients",
+        sections["red_flag_ingredients"].strip()
+    ]
+    lines.extend(f"- **{flag['ingredient']}**: {flag['reason']}" for flag in report["red_flags"])
+
+    lines += ["", "### 3. Added Sugar Analysis", sections["added_sugar_analysis"].strip()]
+    lines.extend(
+        f"- **{sugar['ingredient']}**: ingredient #{sugar['position']}" for sugar in report["sugar_positions"]
+    )
+
+    lines += ["", "### 4. Ingredient-by-Ingredient Breakdown"]
+    for entry in sections["ingredient_breakdown"]:
+        lines.append(f"- **{entry['name']}**: {entry['rating']}")
+        lines.append(f"  - {entry['explanation']}")
+
+    lines += ["", "### 5. Key Concerns"]
+    lines.extend(f"{i}. {concern}" for i, concern in enumerate(sections["key_concerns"], 1))
+
+    lines += ["", "### 6. Positive Aspects"]
+    lines.extend(f"- {aspect}" for aspect in sections["positive_aspects"])
+
+    return "\n".join(lines).strip() + "\n"
@@ -0,0 +1,286 @@
+"""
+Semantic cache for chatbot answers.
+
+Parents ask the same few questions about each product ("is this OK for a
+toddler?", "how much sugar is in it?") in many different wordings. Answers
+are cached per product and analysis: a question is embedded and compared
+with the cached questions of the same product, and an answer is reused when
+the nearest one is above a similarity threshold.
+
+Each product has a small in-memory vector index (a normalized matrix, so a
+lookup is one matrix-vector product) with LRU eviction, and products
+themselves are evicted LRU beyond a limit. A sample of hits is audited: the
+question is answered fresh anyway and the two answers are compared, so the
+false-hit rate of the threshold can be watched and bad entries dropped.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, TypedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.analysis_cache import canonical_text, make_version
+from backend.config import (
+    CHAT_ANSWER_CACHE_AUDIT_AGREEMENT,
+    CHAT_ANSWER_CACHE_AUDIT_RATE,
+    CHAT_ANSWER_CACHE_MAX_PER_PRODUCT,
+    CHAT_ANSWER_CACHE_MAX_PRODUCTS,
+    CHAT_ANSWER_CACHE_THRESHOLD
+)
+from backend.ingredient_parser import canonical_ingredient_key
+from backend.metrics import metrics
+
+# Audit results kept for inspection
+AUDIT_LOG_SIZE = 100
+
+# Histogram buckets for the question similarity of served hits
+SIMILARITY_BUCKETS = (0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0)
+
+
+class AnswerLookup(TypedDict):
+    """Result of a cache lookup; pass it back to store() or audit()."""
+    bucket: str
+    question: str
+    vector: Any
+    answer: Optional[str]
+    matched_question: Optional[str]
+    similarity: float
+    audit: bool
+
+
+class _ProductIndex:
+    """Cached questions and answers for one product and analysis."""
+
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.used: List[float] = []
+
+    def nearest(self, vector: np.ndarray):
+        """Return (position, similarity) of the most similar cached question."""
+        if not self.questions:
+            return None, 0.0
+        similarities = self.vectors @ vector
+        position = int(np.argmax(similarities))
+        return position, float(similarities[position])
+
+    def add(self, vector: np.ndarray, question: str, answer: str, max_entries: int):
+        """Add an entry, replacing the least recently used one when full."""
+        if len(self.questions) >= max_entries:
+            self.remove(int(np.argmin(self.used)))
+        self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.used.append(time.time())
+
+    def remove(self, position: int):
+        """Drop one entry."""
+        self.vectors = np.delete(self.vectors, position, axis=0)
+        del self.questions[position]
+        del self.answers[position]
+        del self.used[position]
+
+
+class SemanticAnswerCache:
+    """Per-product nearest-neighbour cache of chatbot answers."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = CHAT_ANSWER_CACHE_THRESHOLD,
+        max_products: int = CHAT_ANSWER_CACHE_MAX_PRODUCTS,
+        max_entries_per_product: int = CHAT_ANSWER_CACHE_MAX_PER_PRODUCT,
+        audit_rate: float = CHAT_ANSWER_CACHE_AUDIT_RATE,
+        audit_agreement: float = CHAT_ANSWER_CACHE_AUDIT_AGREEMENT
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embeddings: Embeddings model for questions (and audited answers)
+            threshold: Minimum cosine similarity for a question to reuse an answer
+            max_products: Product indexes kept before the least recently used is evicted
+            max_entries_per_product: Cached questions kept per product
+            audit_rate: Fraction of hits that are answered fresh and compared
+            audit_agreement: Minimum answer similarity for an audited hit to count as correct
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_products = max_products
+        self.max_entries_per_product = max_entries_per_product
+        self.audit_rate = audit_rate
+        self.audit_agreement = audit_agreement
+        self._lock = threading.Lock()
+        self._products: "OrderedDict[str, _ProductIndex]" = OrderedDict()
+        self._audits: deque = deque(maxlen=AUDIT_LOG_SIZE)
+
+    @staticmethod
+    def bucket_key(cereal_name: str, ingredients: str, analysis: str, prompt_version: str = "") -> str:
+        """
+        Key of the index a product's answers live in.
+
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Ingredient list
+            analysis: Analysis the answers are based on
+            prompt_version: Version of the chat prompt
+
+        Returns:
+            Hex digest; a new analysis or prompt starts an empty index
+        """
+        return make_version(
+            canonical_text(cereal_name or ''),
+            canonical_ingredient_key(ingredients or ''),
+            analysis or '',
+            prompt_version
+        )
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        """Unit-length float32 vector, so dot products are cosine similarities."""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _lookup(self, bucket: str, question: str, vector: List[float]) -> AnswerLookup:
+        """Find the nearest cached question in a product's index."""
+        vector = self._normalize(vector)
+        result: AnswerLookup = {
+            'bucket': bucket,
+            'question': question,
+            'vector': vector,
+            'answer': None,
+            'matched_question': None,
+            'similarity': 0.0,
+            'audit': False
+        }
+
+        with self._lock:
+            index = self._products.get(bucket)
+            if index is not None:
+                self._products.move_to_end(bucket)
+                position, similarity = index.nearest(vector)
+                result['similarity'] = similarity
+                if position is not None and similarity >= self.threshold:
+                    index.used[position] = time.time()
+                    result['answer'] = index.answers[position]
+                    result['matched_question'] = index.questions[position]
+
+        if result['answer'] is None:
+            metrics.inc('answer_cache_requests_total', result='miss')
+        elif random.random() < self.audit_rate:
+            result['audit'] = True
+            metrics.inc('answer_cache_requests_total', result='audit')
+        else:
+            metrics.inc('answer_cache_requests_total', result='hit')
+            metrics.observe('answer_cache_hit_similarity', result['similarity'], buckets=SIMILARITY_BUCKETS)
+        return result
+
+    def lookup(self, bucket: str, question: str) -> AnswerLookup:
+        """
+        Look for a cached answer to a question.
+
+        Args:
+            bucket: Product index from bucket_key()
+            question: User question
+
+        Returns:
+            AnswerLookup; 'answer' is set on a hit that should be served,
+            'audit' on a hit that should be answered fresh and checked
+        """
+        return self._lookup(bucket, question, self.embeddings.embed_query(question))
+
+    async def alookup(self, bucket: str, question: str) -> AnswerLookup:
+        """Async variant of lookup."""
+        return self._lookup(bucket, question, await self.embeddings.aembed_query(question))
+
+    def store(self, lookup: AnswerLookup, answer: str):
+        """
+        Cache a freshly generated answer for a missed question.
+
+        Args:
+            lookup: Result of the lookup that missed
+            answer: Answer generated for lookup['question']
+        """
+        with self._lock:
+            index = self._products.get(lookup['bucket'])
+            if index is None:
+                index = self._products[lookup['bucket']] = _ProductIndex()
+                while len(self._products) > self.max_products:
+                    self._products.popitem(last=False)
+            self._products.move_to_end(lookup['bucket'])
+            index.add(lookup['vector'], lookup['question'], answer, self.max_entries_per_product)
+
+    def _audit(self, lookup: AnswerLookup, vectors: List[List[float]]) -> bool:
+        """Compare the cached and fresh answers; drop the entry on a false hit."""
+        cached, fresh = (self._normalize(v) for v in vectors)
+        agreement = float(cached @ fresh)
+        correct = agreement >= self.audit_agreement
+
+        if not correct:
+            with self._lock:
+                index = self._products.get(lookup['bucket'])
+                if index is not None and lookup['matched_question'] in index.questions:
+                    index.remove(index.questions.index(lookup['matched_question']))
+
+        self._audits.append({
+            'question': lookup['question'],
+            'matched_question': lookup['matched_question'],
+            'question_similarity': round(lookup['similarity'], 4),
+            'answer_similarity': round(agreement, 4),
+            'correct': correct,
+            'audited_at': time.time()
+        })
+        metrics.inc('answer_cache_audits_total', result='correct' if correct else 'false_hit')
+        return correct
+
+    def audit(self, lookup: AnswerLookup, fresh_answer: str) -> bool:
+        """
+        Check an audited hit against a freshly generated answer.
+
+        Args:
+            lookup: Result of a lookup with 'audit' set
+            fresh_answer: Answer generated for lookup['question']
+
+        Returns:
+            True if the cached answer agreed with the fresh one
+        """
+        vectors = self.embeddings.embed_documents([lookup['answer'], fresh_answer])
+        return self._audit(lookup, vectors)
+
+    async def aaudit(self, lookup: AnswerLookup, fresh_answer: str) -> bool:
+        """Async variant of audit."""
+        vectors = await self.embeddings.aembed_documents([lookup['answer'], fresh_answer])
+        return self._audit(lookup, vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit rate, audit results and index sizes."""
+        counts = {'hit': 0, 'audit': 0, 'miss': 0, 'correct': 0, 'false_hit': 0}
+        for name in ('answer_cache_requests_total', 'answer_cache_audits_total'):
+            for labels, value in metrics.counter_series(name):
+                counts[labels.get('result')] = value
+        lookups = counts['hit'] + counts['audit'] + counts['miss']
+        false_hits = counts['false_hit']
+        audited = false_hits + counts['correct']
+
+        with self._lock:
+            entries = sum(len(index.questions) for index in self._products.values())
+            products = len(self._products)
+            recent_audits = list(self._audits)
+
+        return {
+            'threshold': self.threshold,
+            'products': products,
+            'entries': entries,
+            'lookups': lookups,
+            'hit_rate': round((counts['hit'] + counts['audit']) / lookups, 4) if lookups else 0.0,
+            'audit_rate': self.audit_rate,
+            'audited': audited,
+            'false_hit_rate': round(false_hits / audited, 4) if audited else 0.0,
+            'recent_audits': recent_audits
+        }
@@ -4,11 +4,75 @@ Simple audio generation using Google Text-to-Speech (FREE alternative to D-ID).
 
 import os
 import re
-import base64
-from typing import Optional, Dict
-from gtts import gTTS
+import time
+from typing import Iterator, List, Optional, Dict
 import io
 
+from backend.config import TTS_ENGINE, TTS_MAX_WORKERS, TTS_STANDIN_SECONDS_PER_CHAR
+from backend.media_cache import media_cache, media_key
+from backend.metrics import metrics
+from backend.worker_pool import AnalysisWorkerPool
+
+# gTTS language; part of the media cache key
+TTS_LANGUAGE = 'en'
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + bytes(413)
+
+# Sentences of streamed scripts are synthesized on their own small pool
+tts_pool = AnalysisWorkerPool(TTS_MAX_WORKERS, name="tts")
+
+
+# Candidate sentence breaks: whitespace after terminal punctuation, not before a number ("No. 5")
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+(?!\d)')
+# Words ending in a period that don't end a sentence ("Dr.", "e.g.", "U.S.")
+_ABBREVIATION = re.compile(
+    r'(?:\b(?:dr|mr|mrs|ms|st|vs|approx|e\.g|i\.e)|(?:^|\s)(?:[a-z]\.)*[a-z])\.$',
+    re.IGNORECASE
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a script into sentences (and lines) to synthesize separately."""
+    sentences = []
+    for line in text.splitlines():
+        current = ''
+        for piece in _SENTENCE_BREAK.split(line.strip()):
+            current = f'{current} {piece}' if current else piece
+            if not _ABBREVIATION.search(current):
+                sentences.append(current)
+                current = ''
+        if current:
+            sentences.append(current)
+    return [sentence for sentence in sentences if sentence]
+
+
+def standin_synthesize(text: str) -> bytes:
+    """
+    Local stand-in for a TTS service.
+    
+    Sleeps TTS_STANDIN_SECONDS_PER_CHAR per character and returns silent MP3
+    frames of roughly the length speaking the text would take.
+    
+    Args:
+        text: Text to "speak"
+        
+    Returns:
+        MP3 bytes
+    """
+    time.sleep(len(text) * TTS_STANDIN_SECONDS_PER_CHAR)
+    # About 15 characters per second of speech, 38 frames per second
+    return SILENT_MP3_FRAME * max(1, len(text) * 38 // 15)
+
+
+def audio_url(key: str) -> str:
+    """URL /api/audio serves the cached MP3 with this media cache key from."""
+    return f"/api/audio/{key}"
+
+
+def audio_stream_url(key: str) -> str:
+    """URL /api/audio/stream speaks the script issued under this media cache key from."""
+    return f"/api/audio/stream/{key}"
 
 class AudioGenerator:
     """Generate audio explanations using free Google TTS."""
@@ -17,24 +81,30 @@ class AudioGenerator:
         """Initialize audio generator."""
         pass
     
-    def extract_key_points(self, analysis: str, product_name: str) -> str:
+    def extract_key_points(self, analysis: str, product_name: str, report: Optional[dict] = None) -> str:
         """
         Extract key points from analysis for script.
         
         Args:
             analysis: Full analysis text
             product_name: Name of the product
+            report: Structured analysis (AnalysisReport); read directly instead
+                of scanning the markdown when given
             
         Returns:
             Child-friendly script
         """
-        # Extract verdict
-        verdict_match = re.search(r'VERDICT:\s*\[?(GOOD|MODERATE|BAD)[^\]]*\]?', analysis, re.IGNORECASE)
-        verdict = verdict_match.group(1).upper() if verdict_match else 'MODERATE'
-        
-        # Extract quick summary
-        summary_match = re.search(r'\*\*Quick Summary:\*\*\s*([^\n]+)', analysis)
-        summary = summary_match.group(1).strip() if summary_match else ''
+        if report is not None:
+            verdict = report['verdict']
+            summary = report['summary'].strip()
+        else:
+            # Extract verdict
+            verdict_match = re.search(r'VERDICT:\s*\[?(GOOD|MODERATE|BAD)[^\]]*\]?', analysis, re.IGNORECASE)
+            verdict = verdict_match.group(1).upper() if verdict_match else 'MODERATE'
+            
+            # Extract quick summary
+            summary_match = re.search(r'\*\*Quick Summary:\*\*\s*([^\n]+)', analysis)
+            summary = summary_match.group(1).strip() if summary_match else ''
         
         # Build script based on verdict
         if verdict == 'GOOD':
@@ -61,6 +131,82 @@ class AudioGenerator:
         
         return script.strip()
     
+    def cache_key(self, text: str) -> str:
+        """Media cache key of the audio for a script."""
+        return media_key('audio', text, f"{TTS_ENGINE}:{TTS_LANGUAGE}")
+    
+    def cached_audio(self, text: str) -> Optional[str]:
+        """
+        Look up previously synthesized audio for a script.
+        
+        Args:
+            text: Script text
+            
+        Returns:
+            Audio URL, or None if it isn't cached
+        """
+        key = self.cache_key(text)
+        return audio_url(key) if media_cache.get_path(key) is not None else None
+    
+    def synthesize(self, text: str) -> bytes:
+        """
+        Convert text to MP3 bytes with the configured TTS engine.
+        
+        Args:
+            text: Text to speak
+            
+        Returns:
+            MP3 bytes
+        """
+        if TTS_ENGINE == 'standin':
+            return standin_synthesize(text)
+        
+        from gtts import gTTS
+        
+        # Create TTS object
+        tts = gTTS(text=text, lang=TTS_LANGUAGE, slow=False)
+        
+        # Save to bytes buffer
+        audio_buffer = io.BytesIO()
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+    
+    def stream_audio(self, text: str) -> Iterator[bytes]:
+        """
+        Synthesize a script sentence by sentence, yielding MP3 segments in order.
+        
+        All sentences are synthesized concurrently on the TTS pool, so the
+        first segment is ready after one sentence instead of the whole script,
+        and later ones are usually done by the time earlier ones finish
+        playing. MP3 frames concatenate, so the segments form one playable
+        stream. The joined audio is cached for /api/audio afterwards.
+        
+        Args:
+            text: Script text to convert to speech
+            
+        Yields:
+            MP3 bytes per sentence
+        """
+        started = time.perf_counter()
+        futures = [tts_pool.submit(self.synthesize, sentence) for sentence in split_sentences(text)]
+        segments = []
+        try:
+            for future in futures:
+                segment = future.result()
+                if not segments:
+                    first_audio = time.perf_counter() - started
+                    metrics.observe('tts_time_to_first_audio_seconds', first_audio, engine=TTS_ENGINE)
+                    print(f"🎙️  First audio after {first_audio:.2f}s ({len(futures)} sentences)")
+                segments.append(segment)
+                yield segment
+            
+            metrics.observe('tts_stream_seconds', time.perf_counter() - started, engine=TTS_ENGINE)
+            media_cache.put_bytes(self.cache_key(text), 'audio', b''.join(segments))
+        finally:
+            # The client went away: don't synthesize the rest
+            for future in futures:
+                future.cancel()
+    
     def generate_audio(self, text: str) -> Optional[str]:
         """
         Generate audio using Google Text-to-Speech (gTTS - FREE!).
@@ -69,24 +215,23 @@ class AudioGenerator:
             text: Script text to convert to speech
             
         Returns:
-            Base64 encoded audio data or None if failed
+            URL the MP3 is served from, or None if failed
         """
         try:
-            print("🎙️  Generating audio with Google TTS (free)...")
-            
-            # Create TTS object
-            tts = gTTS(text=text, lang='en', slow=False)
+            cached = self.cached_audio(text)
+            if cached is not None:
+                print("🎙️  Reusing cached audio")
+                return cached
             
-            # Save to bytes buffer
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
+            print("🎙️  Generating audio with Google TTS (free)...")
+            audio_bytes = self.synthesize(text)
             
-            # Convert to base64 for easy transmission
-            audio_base64 = base64.b64encode(audio_buffer.read()).decode('utf-8')
+            # Store the MP3 for /api/audio instead of inlining it in the JSON
+            key = self.cache_key(text)
+            media_cache.put_bytes(key, 'audio', audio_bytes)
             
-            print(f"   ✅ Audio generated ({len(audio_base64)} bytes)")
-            return audio_base64
+            print(f"   ✅ Audio generated ({len(audio_bytes)} bytes)")
+            return audio_url(key)
             
         except Exception as e:
             print(f"   ❌ Error generating audio: {str(e)}")
@@ -95,7 +240,8 @@ class AudioGenerator:
     def create_explanation_audio(
         self, 
         analysis: str, 
-        product_name: str
+        product_name: str,
+        report: Optional[dict] = None
     ) -> Dict[str, any]:
         """
         Create audio explanation from analysis.
@@ -103,21 +249,22 @@ class AudioGenerator:
         Args:
             analysis: Full analysis text
             product_name: Name of the product
+            report: Optional structured analysis (AnalysisReport)
             
         Returns:
-            Dict with audio_data, script, and status
+            Dict with audio_url, script, and status
         """
         try:
             # Extract script
-            script = self.extract_key_points(analysis, product_name)
+            script = self.extract_key_points(analysis, product_name, report)
             print(f"\n📝 Script generated ({len(script)} chars)")
             
             # Generate audio
-            audio_base64 = self.generate_audio(script)
+            url = self.generate_audio(script)
             
             return {
-                'success': audio_base64 is not None,
-                'audio_base64': audio_base64,
+                'success': url is not None,
+                'audio_url': url,
                 'script': script,
                 'type': 'audio'  # Changed from 'video'
             }
@@ -129,7 +276,7 @@ class AudioGenerator:
             
             return {
                 'success': False,
-                'audio_base64': None,
+                'audio_url': None,
                 'script': script if 'script' in locals() else '',
                 'error': str(e),
                 'type': 'audio'
@@ -0,0 +1,127 @@
+"""
+Token-budgeted chat history.
+
+Instead of keeping the last N messages, a session's history is kept under a
+token budget: when the recent messages plus the running summary exceed it,
+the oldest messages are folded into the summary with one small summarization
+call. The summary is stored on the session and only ever extended, so a turn
+costs at most one summarization of the few messages that just overflowed.
+"""
+
+from typing import List
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from backend.chat_sessions import ChatMessage, ChatSession, ChatSessionStore, chat_sessions
+from backend.config import (
+    CHAT_HISTORY_MIN_RECENT_MESSAGES,
+    CHAT_HISTORY_TOKEN_BUDGET,
+    CHAT_SUMMARY_MAX_TOKENS
+)
+from backend.metrics import metrics, record_token_usage
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+You maintain a running summary of a conversation between a parent and a food ingredient assistant about the product "{cereal_name}".
+Update the summary with the new messages. Keep the questions asked, facts given and advice; drop greetings and filler.
+Write plain prose, at most 150 words.
+"""),
+    ("human", """
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:
+""")
+])
+
+
+def format_messages(messages: List[ChatMessage]) -> str:
+    """Render messages as 'User: ...' / 'Assistant: ...' lines."""
+    return "\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in messages
+    )
+
+
+class ChatHistoryCompactor:
+    """Keeps session history under a token budget by summarizing older turns."""
+
+    def __init__(
+        self,
+        llm,
+        store: ChatSessionStore = chat_sessions,
+        token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+        min_recent: int = CHAT_HISTORY_MIN_RECENT_MESSAGES,
+        summary_max_tokens: int = CHAT_SUMMARY_MAX_TOKENS
+    ):
+        """
+        Initialize the compactor.
+
+        Args:
+            llm: Chat model used for summaries (and token counting)
+            store: Session store holding the summaries
+            token_budget: Maximum tokens of summary plus recent messages
+            min_recent: Most recent messages that are never summarized
+            summary_max_tokens: Output cap for a summarization call
+        """
+        self.llm = llm
+        self.summarizer = llm.bind(max_tokens=summary_max_tokens)
+        self.store = store
+        self.token_budget = token_budget
+        self.min_recent = min_recent
+
+    def _overflow(self, session: ChatSession) -> int:
+        """Number of oldest history messages that no longer fit the budget."""
+        history = session['history']
+        budget = self.token_budget - self.llm.get_num_tokens(session['summary'])
+
+        used, keep = 0, 0
+        for message in reversed(history):
+            cost = self.llm.get_num_tokens(message['content'])
+            if keep >= self.min_recent and used + cost > budget:
+                break
+            used += cost
+            keep += 1
+        return len(history) - keep
+
+    def _summary_messages(self, session: ChatSession, count: int) -> list:
+        """Prompt that folds the oldest `count` messages into the summary."""
+        return SUMMARY_PROMPT.format_messages(
+            cereal_name=session['cereal_name'],
+            summary=session['summary'] or "(none yet)",
+            messages=format_messages(session['history'][:count])
+        )
+
+    def compact(self, session: ChatSession) -> ChatSession:
+        """
+        Fold overflowing history into the session summary, if needed.
+
+        Args:
+            session: Chat session
+
+        Returns:
+            The same session, now within the token budget
+        """
+        count = self._overflow(session)
+        if count:
+            with metrics.timer('chat_summary_seconds'):
+                response = self.summarizer.invoke(self._summary_messages(session, count))
+            self._fold(session, response, count)
+        return session
+
+    async def acompact(self, session: ChatSession) -> ChatSession:
+        """Async variant of compact."""
+        count = self._overflow(session)
+        if count:
+            with metrics.timer('chat_summary_seconds'):
+                response = await self.summarizer.ainvoke(self._summary_messages(session, count))
+            self._fold(session, response, count)
+        return session
+
+    def _fold(self, session: ChatSession, response, count: int):
+        """Store the updated summary and drop the messages it covers."""
+        record_token_usage(response, 'chat_summary')
+        metrics.inc('chat_history_folded_messages_total', count)
+        self.store.fold(session, response.content.strip(), count)
@@ -0,0 +1,173 @@
+"""
+Server-side chat sessions.
+
+A session holds the analysis a conversation is about plus its rolling
+history, so chat requests only need to carry the session ID and the new
+question. Sessions live in memory with LRU and TTL eviction.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, TypedDict
+
+from backend.config import (
+    CHAT_SESSION_MAX_HISTORY,
+    CHAT_SESSION_MAX_SESSIONS,
+    CHAT_SESSION_TTL_SECONDS
+)
+from backend.metrics import metrics
+
+
+class ChatMessage(TypedDict):
+    """One conversation turn."""
+    role: str
+    content: str
+
+
+class ChatSession(TypedDict):
+    """Analysis and conversation state for one chat."""
+    session_id: str
+    cereal_name: str
+    ingredients: str
+    analysis: str
+    history: List[ChatMessage]
+    summary: str
+    created_at: float
+    accessed_at: float
+
+
+class ChatSessionStore:
+    """Bounded in-memory session store with LRU and TTL eviction."""
+
+    def __init__(
+        self,
+        max_sessions: int = CHAT_SESSION_MAX_SESSIONS,
+        ttl_seconds: int = CHAT_SESSION_TTL_SECONDS,
+        max_history: int = CHAT_SESSION_MAX_HISTORY
+    ):
+        """
+        Initialize the session store.
+
+        Args:
+            max_sessions: Sessions kept before the least recently used is evicted
+            ttl_seconds: Sessions idle for longer than this expire
+            max_history: Messages kept per session (oldest dropped first)
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def create(self, cereal_name: str, ingredients: str, analysis: str,
+               history: Optional[List[ChatMessage]] = None) -> ChatSession:
+        """
+        Start a session for an analysis.
+
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Ingredient list
+            analysis: The analysis the conversation is about
+            history: Optional conversation so far
+
+        Returns:
+            The new session
+        """
+        now = time.time()
+        session: ChatSession = {
+            'session_id': uuid.uuid4().hex,
+            'cereal_name': cereal_name or '',
+            'ingredients': ingredients or '',
+            'analysis': analysis or '',
+            'history': [
+                {'role': m.get('role', 'user'), 'content': m.get('content', '')}
+                for m in (history or [])
+            ][-self.max_history:],
+            'summary': '',
+            'created_at': now,
+            'accessed_at': now
+        }
+
+        with self._lock:
+            self._sessions[session['session_id']] = session
+            self._evict(now)
+        metrics.inc('chat_sessions_created_total')
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """
+        Look up a live session and mark it as recently used.
+
+        Args:
+            session_id: Session ID returned by create()
+
+        Returns:
+            The session, or None if it is unknown or expired
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or now - session['accessed_at'] > self.ttl_seconds:
+                self._sessions.pop(session_id, None)
+                metrics.inc('chat_session_lookups_total', result='miss')
+                return None
+
+            session['accessed_at'] = now
+            self._sessions.move_to_end(session_id)
+        metrics.inc('chat_session_lookups_total', result='hit')
+        return session
+
+    def append(self, session: ChatSession, question: str, answer: str):
+        """
+        Record a question/answer turn.
+
+        Args:
+            session: Session from create() or get()
+            question: User question
+            answer: Assistant answer
+        """
+        with self._lock:
+            history = session['history']
+            history.append({'role': 'user', 'content': question})
+            history.append({'role': 'assistant', 'content': answer})
+            del history[:-self.max_history]
+
+    def fold(self, session: ChatSession, summary: str, count: int):
+        """
+        Replace the oldest messages of a session with an updated summary.
+
+        Args:
+            session: Session from create() or get()
+            summary: Summary covering the earlier summary and the folded messages
+            count: Number of oldest history messages the summary now covers
+        """
+        with self._lock:
+            session['summary'] = summary
+            del session['history'][:count]
+
+    def _evict(self, now: float):
+        """Drop expired sessions, then the least recently used beyond max_sessions."""
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest['accessed_at'] <= self.ttl_seconds:
+                break
+            del self._sessions[oldest['session_id']]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Report the number of live sessions and the store limits."""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_seconds': self.ttl_seconds,
+                'max_history': self.max_history
+            }
+
+
+# Shared store used by the chat endpoints
+chat_sessions = ChatSessionStore()
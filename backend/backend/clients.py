@@ -0,0 +1,122 @@
+"""
+Shared, long-lived API clients.
+
+Model clients are created once per (model, temperature, api key) and all of
+them share one keep-alive HTTP connection pool (sync and async), so requests
+reuse open TLS connections instead of building a new client per call. The
+pool size caps the number of concurrent LLM requests per process; callers
+beyond the cap wait for a free connection. Plain HTTP APIs (D-ID) share a
+pooled requests.Session.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+import requests
+from langchain_openai import ChatOpenAI
+from requests.adapters import HTTPAdapter
+
+from backend.config import (
+    CHAT_MODEL,
+    HTTP_POOL_SIZE,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT_SECONDS
+)
+from backend.metrics import metrics
+
+
+class ClientRegistry:
+    """Creates API clients once and hands out the shared instances."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_keepalive: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY_SECONDS,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        http_pool_size: int = HTTP_POOL_SIZE
+    ):
+        """
+        Initialize the registry (clients are created lazily).
+
+        Args:
+            max_concurrency: Maximum open connections to the LLM provider
+            max_keepalive: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept
+            timeout: Request timeout in seconds (also the wait for a free connection)
+            http_pool_size: Connection pool size of the shared requests session
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http_pool_size = http_pool_size
+        self._lock = threading.Lock()
+        self._chat_models: Dict[Tuple[str, float, Optional[str]], ChatOpenAI] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._session: Optional[requests.Session] = None
+
+    def _http_clients(self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """Return the shared httpx clients, creating them on first use."""
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+            self._async_http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._http_client, self._async_http_client
+
+    def chat_model(self, model: str = CHAT_MODEL, temperature: float = 0.7,
+                   api_key: Optional[str] = None) -> ChatOpenAI:
+        """
+        Get the shared chat model client for a configuration.
+
+        Args:
+            model: OpenAI model name
+            temperature: Sampling temperature
+            api_key: OpenAI API key (None uses OPENAI_API_KEY)
+
+        Returns:
+            ChatOpenAI instance, reused across calls
+        """
+        key = (model, float(temperature), api_key)
+        with self._lock:
+            client = self._chat_models.get(key)
+            if client is None:
+                http_client, async_http_client = self._http_clients()
+                credentials = {'api_key': api_key} if api_key else {}
+                client = self._chat_models[key] = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                    max_retries=LLM_MAX_RETRIES,
+                    stream_usage=True,  # Report token usage on streamed responses too
+                    **credentials
+                )
+                metrics.inc('api_clients_created_total', client='chat_model')
+        return client
+
+    def http_session(self) -> requests.Session:
+        """
+        Get the shared requests session (keep-alive connection pool).
+
+        Returns:
+            requests.Session
+        """
+        with self._lock:
+            if self._session is None:
+                adapter = HTTPAdapter(pool_connections=self.http_pool_size, pool_maxsize=self.http_pool_size)
+                self._session = requests.Session()
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+                metrics.inc('api_clients_created_total', client='http_session')
+        return self._session
+
+
+# Shared registry used across the backend
+clients = ClientRegistry()
@@ -2,6 +2,7 @@
 Configuration file for the KidSafe Food Analyzer backend.
 """
 
+import os
 from pathlib import Path
 
 # Project structure
@@ -24,3 +25,123 @@ QDRANT_LOCATION = ":memory:"  # In-memory for simplicity, can change to persiste
 CHAT_MODEL = "gpt-4o-mini"
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+# Documents retrieved per analysis (part of the analysis cache version)
+RETRIEVAL_K = int(os.environ.get('RETRIEVAL_K', 5))
+
+# Analysis modes: "quick" returns only the verdict, summary and flagged
+# ingredients under a tight output cap; "full" is the complete report;
+# "structured" is the complete report as a typed AnalysisReport; "parallel"
+# is the complete report with its sections generated by concurrent LLM calls.
+# Requests default to "quick": the results card and its video/audio only use
+# the verdict and summary, and the frontend asks for "full" when expanded
+ANALYSIS_MODES = ("quick", "full", "structured", "parallel")
+DEFAULT_ANALYSIS_MODE = "quick"
+QUICK_ANALYSIS_MAX_TOKENS = 300
+
+# Model routing for full analyses: products the rule engine flags for
+# artificial or harmful ingredients get a concise report from the cheaper
+# ROUTER_FAST_MODEL under an output cap; everything else gets the full treatment
+MODEL_ROUTING = os.environ.get('MODEL_ROUTING', 'true').lower() == 'true'
+ROUTER_FAST_MODEL = os.environ.get('ROUTER_FAST_MODEL', "gpt-4.1-nano")
+# The cap has to fit the whole six-section report, including a breakdown line
+# for each of the 15-25 ingredients typical of a red-flagged cereal
+ROUTER_FAST_MAX_TOKENS = int(os.environ.get('ROUTER_FAST_MAX_TOKENS', 1600))
+
+# USD per million tokens (input, cached input, output) for cost estimates
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+
+# Vetted per-ingredient explanations for the ingredient breakdown
+INGREDIENT_FRAGMENTS_PATH = DATA_DIR / "ingredient_fragments.json"
+
+# Analysis result cache (SQLite)
+ANALYSIS_CACHE_PATH = Path(os.environ.get('ANALYSIS_CACHE_PATH', DATA_DIR / "analysis_cache.sqlite3"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 5000))
+ANALYSIS_CACHE_MAX_AGE_SECONDS = int(os.environ.get('ANALYSIS_CACHE_MAX_AGE_SECONDS', 7 * 24 * 3600))
+
+# Near-duplicate reuse: a cached analysis is reused for a product whose
+# ingredient list is nearly identical (MinHash/LSH over canonical names) and
+# gets the same rule-engine verdict and triggers
+NEAR_DUPLICATE_REUSE = os.environ.get('NEAR_DUPLICATE_REUSE', 'true').lower() == 'true'
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9))
+NEAR_DUPLICATE_MAX_CANDIDATES = int(os.environ.get('NEAR_DUPLICATE_MAX_CANDIDATES', 20))
+
+# Shared HTTP clients for LLM calls (see clients.py)
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 64))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_MAX_KEEPALIVE_CONNECTIONS', 32))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get('LLM_KEEPALIVE_EXPIRY_SECONDS', 120))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', 120))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+
+# Connection pool for other HTTP APIs (D-ID, ...)
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 16))
+
+# Worker pool that runs analyses for /api/analyze and /api/analyze/batch.
+# A batch keeps at most BATCH_MAX_IN_FLIGHT items in the pool at once so
+# online requests still find free workers
+ANALYSIS_MAX_WORKERS = int(os.environ.get('ANALYSIS_MAX_WORKERS', 8))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+BATCH_MAX_IN_FLIGHT = int(os.environ.get('BATCH_MAX_IN_FLIGHT', 4))
+
+# Background queue for video/audio generation (SQLite, survives restarts)
+MEDIA_JOBS_PATH = Path(os.environ.get('MEDIA_JOBS_PATH', DATA_DIR / "media_jobs.sqlite3"))
+MEDIA_JOB_WORKERS = int(os.environ.get('MEDIA_JOB_WORKERS', 4))
+MEDIA_JOB_RETENTION_SECONDS = int(os.environ.get('MEDIA_JOB_RETENTION_SECONDS', 24 * 3600))
+# A running job's owner renews its lease while it works; only jobs whose
+# lease has expired (their process died) are queued again
+MEDIA_JOB_LEASE_SECONDS = float(os.environ.get('MEDIA_JOB_LEASE_SECONDS', 60))
+
+# D-ID talks API. DID_API_URL can point at fake_did_server.py for local runs
+DID_API_URL = os.environ.get('DID_API_URL', 'https://api.d-id.com').rstrip('/')
+# One shared poller tracks all pending talks, backing off exponentially per talk
+DID_POLL_INITIAL_SECONDS = float(os.environ.get('DID_POLL_INITIAL_SECONDS', 1.0))
+DID_POLL_MAX_SECONDS = float(os.environ.get('DID_POLL_MAX_SECONDS', 8.0))
+DID_POLL_BACKOFF = float(os.environ.get('DID_POLL_BACKOFF', 2.0))
+DID_TALK_TIMEOUT_SECONDS = float(os.environ.get('DID_TALK_TIMEOUT_SECONDS', 90.0))
+# Public URL of /api/did/webhook; when set, D-ID reports finished talks there
+# and polling only remains as a slow fallback
+DID_WEBHOOK_URL = os.environ.get('DID_WEBHOOK_URL', '')
+DID_WEBHOOK_SECRET = os.environ.get('DID_WEBHOOK_SECRET', '')
+DID_WEBHOOK_FALLBACK_POLL_SECONDS = float(os.environ.get('DID_WEBHOOK_FALLBACK_POLL_SECONDS', 15.0))
+
+# Content-addressed media cache: D-ID result URLs (until they expire) and
+# generated audio files, keyed by sha256 of script, voice and presenter image
+MEDIA_CACHE_PATH = Path(os.environ.get('MEDIA_CACHE_PATH', DATA_DIR / "media_cache.sqlite3"))
+MEDIA_CACHE_DIR = Path(os.environ.get('MEDIA_CACHE_DIR', DATA_DIR / "media"))
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+# D-ID result URLs are signed for about a day; used when a URL has no Expires parameter
+DID_RESULT_URL_TTL_SECONDS = int(os.environ.get('DID_RESULT_URL_TTL_SECONDS', 23 * 3600))
+# Browser cache lifetime of /api/audio responses (content-addressed, so a year)
+AUDIO_MAX_AGE_SECONDS = int(os.environ.get('AUDIO_MAX_AGE_SECONDS', 365 * 24 * 3600))
+
+# Text-to-speech: 'gtts' (Google, free) or 'standin' (local silent MP3 with
+# simulated latency, for exercising the streaming path without network)
+TTS_ENGINE = os.environ.get('TTS_ENGINE', 'gtts')
+TTS_STANDIN_SECONDS_PER_CHAR = float(os.environ.get('TTS_STANDIN_SECONDS_PER_CHAR', 0.01))
+# Sentences synthesized at once by /api/audio/stream
+TTS_MAX_WORKERS = int(os.environ.get('TTS_MAX_WORKERS', 4))
+# How long an audio script issued with an analysis stays streamable by its key
+AUDIO_SCRIPT_TTL_SECONDS = int(os.environ.get('AUDIO_SCRIPT_TTL_SECONDS', 24 * 3600))
+
+# Server-side chat sessions (analysis + conversation per session ID)
+CHAT_SESSION_MAX_SESSIONS = int(os.environ.get('CHAT_SESSION_MAX_SESSIONS', 1000))
+CHAT_SESSION_TTL_SECONDS = int(os.environ.get('CHAT_SESSION_TTL_SECONDS', 3600))
+CHAT_SESSION_MAX_HISTORY = int(os.environ.get('CHAT_SESSION_MAX_HISTORY', 20))
+
+# Chat history compaction: older turns are folded into a per-session summary
+# so summary + recent messages stay under the token budget
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', 1200))
+CHAT_HISTORY_MIN_RECENT_MESSAGES = int(os.environ.get('CHAT_HISTORY_MIN_RECENT_MESSAGES', 2))
+CHAT_SUMMARY_MAX_TOKENS = int(os.environ.get('CHAT_SUMMARY_MAX_TOKENS', 250))
+
+# Semantic cache for chatbot answers (per product and analysis)
+CHAT_ANSWER_CACHE_THRESHOLD = float(os.environ.get('CHAT_ANSWER_CACHE_THRESHOLD', 0.92))
+CHAT_ANSWER_CACHE_MAX_PER_PRODUCT = int(os.environ.get('CHAT_ANSWER_CACHE_MAX_PER_PRODUCT', 64))
+CHAT_ANSWER_CACHE_MAX_PRODUCTS = int(os.environ.get('CHAT_ANSWER_CACHE_MAX_PRODUCTS', 500))
+CHAT_ANSWER_CACHE_AUDIT_RATE = float(os.environ.get('CHAT_ANSWER_CACHE_AUDIT_RATE', 0.05))
+CHAT_ANSWER_CACHE_AUDIT_AGREEMENT = float(os.environ.get('CHAT_ANSWER_CACHE_AUDIT_AGREEMENT', 0.85))
@@ -0,0 +1,224 @@
+"""
+Shared status poller for D-ID talks.
+
+Creating a D-ID video returns a talk ID that is ready 15-60 seconds later.
+Instead of every video request polling its own talk once a second, callers
+register the talk here and wait on a Future. One background thread polls all
+pending talks over the shared keep-alive session, backing off exponentially
+per talk (1s, 2s, 4s, ... up to DID_POLL_MAX_SECONDS), and resolves each
+Future when its talk is done or failed.
+
+When DID_WEBHOOK_URL is configured, D-ID posts finished talks to
+/api/did/webhook, which resolves the Future immediately; polling then only
+runs at a slow fallback interval in case a webhook is lost.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from backend.clients import clients
+from backend.config import (
+    DID_API_URL,
+    DID_POLL_BACKOFF,
+    DID_POLL_INITIAL_SECONDS,
+    DID_POLL_MAX_SECONDS,
+    DID_TALK_TIMEOUT_SECONDS,
+    DID_WEBHOOK_FALLBACK_POLL_SECONDS,
+    DID_WEBHOOK_SECRET,
+    DID_WEBHOOK_URL
+)
+from backend.metrics import metrics
+
+# Talk statuses that end polling
+FAILED_STATUSES = ('error', 'rejected')
+
+
+class TalkFailed(Exception):
+    """A D-ID talk failed, was rejected or didn't finish in time."""
+
+
+class _PendingTalk:
+    """Polling state of one talk."""
+
+    def __init__(self, talk_id: str, headers: Dict[str, str], delay: float, timeout: float):
+        now = time.monotonic()
+        self.talk_id = talk_id
+        self.headers = headers
+        self.future: Future = Future()
+        self.delay = delay
+        self.next_poll = now + delay
+        self.started = now
+        self.deadline = now + timeout
+
+
+def webhook_url() -> Optional[str]:
+    """URL D-ID should report finished talks to, or None if webhooks are off."""
+    if not DID_WEBHOOK_URL:
+        return None
+    if not DID_WEBHOOK_SECRET:
+        return DID_WEBHOOK_URL
+    separator = '&' if '?' in DID_WEBHOOK_URL else '?'
+    return f"{DID_WEBHOOK_URL}{separator}{urlencode({'token': DID_WEBHOOK_SECRET})}"
+
+
+class TalkPoller:
+    """Tracks pending D-ID talks and resolves a Future per talk."""
+
+    def __init__(
+        self,
+        api_url: str = DID_API_URL,
+        session: Optional[requests.Session] = None,
+        initial_delay: float = DID_POLL_INITIAL_SECONDS,
+        max_delay: float = DID_POLL_MAX_SECONDS,
+        backoff: float = DID_POLL_BACKOFF,
+        timeout: float = DID_TALK_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize the poller (the polling thread starts with the first talk).
+
+        Args:
+            api_url: D-ID API base URL
+            session: HTTP session to poll with (default: the shared pooled session)
+            initial_delay: Seconds before a talk's first poll
+            max_delay: Upper bound of the per-talk poll interval
+            backoff: Factor the poll interval grows by after each poll
+            timeout: Seconds after which a talk that isn't done fails
+        """
+        self.api_url = api_url.rstrip('/')
+        self.session = session
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: Dict[str, _PendingTalk] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, talk_id: str, headers: Dict[str, str]) -> Future:
+        """
+        Start tracking a talk.
+
+        Args:
+            talk_id: ID returned by POST /talks
+            headers: Request headers (authorization) for the status calls
+
+        Returns:
+            Future resolving to the talk's status JSON once it is done, or
+            failing with TalkFailed
+        """
+        # With webhooks the poll is only a fallback for lost callbacks
+        delay = DID_WEBHOOK_FALLBACK_POLL_SECONDS if webhook_url() else self.initial_delay
+        with self._changed:
+            pending = self._pending.get(talk_id)
+            if pending is None:
+                pending = self._pending[talk_id] = _PendingTalk(talk_id, headers, delay, self.timeout)
+                metrics.inc('did_talks_total', status='pending')
+            self._changed.notify_all()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="did-poller", daemon=True)
+                self._thread.start()
+        return pending.future
+
+    def resolve(self, talk_id: str, talk: Dict[str, Any]) -> bool:
+        """
+        Resolve a talk from a status payload (a poll response or a webhook).
+
+        Args:
+            talk_id: Talk ID
+            talk: Talk JSON as returned by GET /talks/<id>
+
+        Returns:
+            True if the talk was pending and is now resolved
+        """
+        status = talk.get('status')
+        if status != 'done' and status not in FAILED_STATUSES:
+            return False
+
+        with self._lock:
+            pending = self._pending.pop(talk_id, None)
+        if pending is None:
+            return False
+
+        metrics.observe('did_talk_seconds', time.monotonic() - pending.started)
+        metrics.inc('did_talks_total', status=status)
+        if status == 'done':
+            pending.future.set_result(talk)
+        else:
+            description = (talk.get('error') or {}).get('description', 'Unknown error')
+            pending.future.set_exception(TalkFailed(f"D-ID talk {status}: {description}"))
+        return True
+
+    def _poll(self, pending: _PendingTalk):
+        """Fetch one talk's status and resolve or reschedule it."""
+        try:
+            response = self.session.get(f"{self.api_url}/talks/{pending.talk_id}", headers=pending.headers, timeout=30)
+            response.raise_for_status()
+            talk = response.json()
+            metrics.inc('did_polls_total', result=talk.get('status', 'unknown'))
+            if self.resolve(pending.talk_id, talk):
+                return
+        except requests.exceptions.RequestException as e:
+            # Transient errors are retried on the normal backoff schedule
+            metrics.inc('did_polls_total', result='request_error')
+            print(f"   ⚠️  D-ID status check failed for {pending.talk_id}: {e}")
+
+        now = time.monotonic()
+        if now >= pending.deadline:
+            with self._lock:
+                timed_out = self._pending.pop(pending.talk_id, None) is not None
+            if timed_out:
+                metrics.inc('did_talks_total', status='timeout')
+                pending.future.set_exception(TalkFailed(f"D-ID talk timed out after {self.timeout:.0f}s"))
+            return
+
+        with self._lock:
+            pending.delay = min(pending.delay * self.backoff, self.max_delay)
+            pending.next_poll = min(now + pending.delay, pending.deadline)
+
+    def _fail(self, pending: _PendingTalk, error: Exception):
+        """Fail one talk whose status check raised unexpectedly."""
+        with self._lock:
+            failed = self._pending.pop(pending.talk_id, None) is not None
+        if failed:
+            metrics.inc('did_talks_total', status='poll_error')
+            pending.future.set_exception(TalkFailed(f"D-ID status check failed: {error}"))
+
+    def _due(self) -> List[_PendingTalk]:
+        """Wait until at least one talk is due for a poll and return the due talks."""
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                due = [p for p in self._pending.values() if p.next_poll <= now]
+                if due:
+                    return due
+                next_poll = min((p.next_poll for p in self._pending.values()), default=None)
+                self._changed.wait(None if next_poll is None else next_poll - now)
+
+    def _run(self):
+        """Polling loop shared by all pending talks."""
+        if self.session is None:
+            self.session = clients.http_session()
+        while True:
+            for pending in self._due():
+                try:
+                    self._poll(pending)
+                except Exception as e:
+                    # Anything but a request error (a malformed body, a bug) fails
+                    # only this talk; the thread keeps serving the others
+                    print(f"   ❌ D-ID status check crashed for {pending.talk_id}: {e}")
+                    self._fail(pending, e)
+
+    def stats(self) -> Dict[str, int]:
+        """Report the number of talks being tracked."""
+        with self._lock:
+            return {'pending_talks': len(self._pending)}
+
+
+# Shared poller used by VideoGenerator and the webhook endpoint
+talk_poller = TalkPoller()
@@ -97,7 +97,8 @@ def run_rag_evaluation(test_cases: List[Dict[str, str]]):
     vectorstore = vector_store_manager.load_and_index_documents()
     retriever = vector_store_manager.get_retriever(k=5)
     
-    ingredient_analyzer = IngredientAnalyzer(retriever, openai_key)
+    # Unrouted, so every full report comes from CHAT_MODEL
+    ingredient_analyzer = IngredientAnalyzer(retriever, openai_key, model_routing=False)
     
     # Collect samples for evaluation
     samples = []
@@ -120,7 +121,8 @@ def run_rag_evaluation(test_cases: List[Dict[str, str]]):
         # Get response
         response = ingredient_analyzer.analyze_ingredients(
             test_case['cereal_name'],
-            test_case['ingredients']
+            test_case['ingredients'],
+            mode="full"
         )
         
         print(f"Analysis generated ({len(response)} characters)")
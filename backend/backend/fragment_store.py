@@ -0,0 +1,145 @@
+"""
+Vetted per-ingredient explanation fragments.
+
+Section 4 of an analysis (the ingredient-by-ingredient breakdown) is mostly
+the same text for the same ingredient across products. Fragments for known
+canonical ingredients are stored here and stitched into the analysis, so the
+LLM only has to write entries for ingredients without a fragment.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backend.analysis_report import AnalysisReport
+from backend.config import INGREDIENT_FRAGMENTS_PATH
+from backend.ingredient_parser import ParsedIngredient, display_name
+
+# Heading of the ingredient breakdown section in the analysis markdown
+BREAKDOWN_HEADING = re.compile(r'^###\s*4\.[^\n]*$', re.MULTILINE)
+NEXT_SECTION_HEADING = re.compile(r'^###\s*5\.', re.MULTILINE)
+
+
+class FragmentStore:
+    """Loads and renders vetted explanations keyed by canonical ingredient."""
+
+    def __init__(self, path: Path = INGREDIENT_FRAGMENTS_PATH):
+        """
+        Initialize the fragment store.
+
+        Args:
+            path: JSON file mapping canonical ingredient -> {rating, explanation}
+        """
+        self.path = Path(path)
+        raw = self.path.read_bytes() if self.path.exists() else b'{}'
+        self.fragments: Dict[str, dict] = json.loads(raw)
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+
+    def get(self, base: Optional[str]) -> Optional[dict]:
+        """
+        Look up the fragment for a canonical ingredient.
+
+        Args:
+            base: Canonical vocabulary name (ParsedIngredient['base'])
+
+        Returns:
+            Fragment dict or None
+        """
+        return self.fragments.get(base) if base else None
+
+    def split(self, ingredients: List[ParsedIngredient]) -> Tuple[List[Tuple[ParsedIngredient, dict]], List[ParsedIngredient]]:
+        """
+        Separate ingredients with a stored fragment from those without.
+
+        Args:
+            ingredients: Top-level parsed ingredients
+
+        Returns:
+            (covered, uncovered) where covered pairs each ingredient with its fragment
+        """
+        covered, uncovered, seen = [], [], set()
+        for ingredient in ingredients:
+            if ingredient['name'] in seen:
+                continue
+            seen.add(ingredient['name'])
+
+            fragment = self.get(ingredient['base'])
+            if fragment:
+                covered.append((ingredient, fragment))
+            else:
+                uncovered.append(ingredient)
+        return covered, uncovered
+
+    @staticmethod
+    def render(covered: List[Tuple[ParsedIngredient, dict]]) -> str:
+        """
+        Render covered ingredients in the Section 4 markdown format.
+
+        Args:
+            covered: (ingredient, fragment) pairs from split()
+
+        Returns:
+            Markdown bullet list
+        """
+        lines = []
+        for ingredient, fragment in covered:
+            lines.append(f"- **{display_name(ingredient['name'])}**: {fragment['rating']}")
+            lines.append(f"  - {fragment['explanation']}")
+        return "\n".join(lines)
+
+    @classmethod
+    def assemble(cls, analysis: str, covered: List[Tuple[ParsedIngredient, dict]]) -> str:
+        """
+        Insert fragment entries into the breakdown section of an analysis.
+
+        Args:
+            analysis: LLM-generated analysis markdown
+            covered: (ingredient, fragment) pairs from split()
+
+        Returns:
+            Analysis with the complete ingredient breakdown
+        """
+        if not covered:
+            return analysis
+
+        block = cls.render(covered)
+        heading = BREAKDOWN_HEADING.search(analysis)
+        if heading is None:
+            return f"{analysis.rstrip()}\n\n### 4. Ingredient-by-Ingredient Breakdown\n{block}\n"
+
+        # Fragments go first, followed by whatever the LLM wrote for the rest
+        insert_at = heading.end()
+        next_section = NEXT_SECTION_HEADING.search(analysis, insert_at)
+        section_body = analysis[insert_at:next_section.start() if next_section else len(analysis)]
+        remainder = analysis[insert_at + len(section_body):]
+        body = "\n".join(part for part in (block, section_body.strip()) if part)
+        return f"{analysis[:insert_at]}\n{body}\n\n{remainder.lstrip()}".rstrip() + "\n"
+
+    @staticmethod
+    def merge_report(report: AnalysisReport, covered: List[Tuple[ParsedIngredient, dict]]) -> AnalysisReport:
+        """
+        Add fragment entries to the breakdown of a structured report.
+
+        Args:
+            report: LLM-generated structured analysis
+            covered: (ingredient, fragment) pairs from split()
+
+        Returns:
+            Report with the complete ingredient breakdown
+        """
+        if not covered:
+            return report
+
+        entries = [
+            {
+                'name': display_name(ingredient['name']),
+                'rating': fragment['rating'],
+                'explanation': fragment['explanation']
+            }
+            for ingredient, fragment in covered
+        ]
+        sections = dict(report['sections'])
+        sections['ingredient_breakdown'] = entries + list(sections['ingredient_breakdown'])
+        return {**report, 'sections': sections}
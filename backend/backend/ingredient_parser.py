@@ -0,0 +1,480 @@
+"""
+Ingredient list parsing and fuzzy canonicalization.
+
+Parses label text (nested parentheses, "contains 2% or less of" clauses,
+category headers such as "Vitamins and Minerals:") into ingredients and maps
+each one onto a known vocabulary through a trigram index, so typos like
+"Coconute Sugar" or "Roboflavin Niacinamide" resolve to the same canonical
+ingredients as correctly spelled labels.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TypedDict
+
+
+class ParsedIngredient(TypedDict):
+    """A single ingredient parsed from a label."""
+    raw: str
+    name: str
+    base: Optional[str]
+    known: bool
+    position: int
+    minor: bool
+    preservative: bool
+    sub_ingredients: List['ParsedIngredient']
+
+
+# Canonical ingredient vocabulary (lowercase)
+KNOWN_INGREDIENTS = (
+    # Grains and flours
+    'corn', 'corn meal', 'whole grain corn', 'corn flour', 'rice', 'brown rice', 'red rice',
+    'rice flour', 'whole grain rice', 'wheat', 'whole grain wheat', 'wheat flour', 'wheat bran',
+    'whole wheat flour', 'wheat starch', 'oats', 'whole grain oats', 'whole grain oat',
+    'whole grain rolled oats', 'oat flour', 'whole grain oat flour', 'oat bran', 'barley',
+    'barley flakes', 'rye', 'rye flakes', 'sorghum', 'sorghum flakes', 'whole grain sorghum',
+    'quinoa', 'red quinoa', 'amaranth', 'millet', 'buckwheat', 'buckwheat kernels', 'spelt',
+    'corn starch', 'modified corn starch', 'tapioca starch', 'potato starch',
+    # Nuts, seeds and legumes
+    'almonds', 'peanuts', 'cashews', 'pecans', 'walnuts', 'hazelnuts', 'coconut',
+    'chia seeds', 'hemp seeds', 'hulled hemp seeds', 'flax seeds', 'sunflower seeds',
+    'pumpkin seeds', 'pea protein', 'soy protein isolate', 'peanut butter', 'almond butter',
+    # Fruit and vegetables
+    'banana puree', 'dried bananas', 'raspberry puree', 'apple puree', 'raisins',
+    'cranberries', 'dried cranberries', 'blueberries', 'strawberries', 'dates',
+    'vegetable juice concentrate', 'fruit juice concentrate', 'apple juice concentrate',
+    # Sugars and sweeteners
+    'sugar', 'cane sugar', 'brown sugar', 'coconut sugar', 'brown sugar syrup', 'corn syrup',
+    'corn syrup solids', 'high fructose corn syrup', 'honey', 'molasses', 'maple syrup',
+    'brown rice syrup', 'tapioca syrup', 'agave syrup', 'dextrose', 'fructose', 'glucose syrup',
+    'invert sugar', 'evaporated cane juice', 'barley malt extract', 'malt syrup', 'maltodextrin',
+    'aspartame', 'sucralose', 'acesulfame potassium', 'stevia',
+    # Fats and oils
+    'canola oil', 'sunflower oil', 'vegetable oil', 'palm oil', 'palm kernel oil', 'coconut oil',
+    'soybean oil', 'partially hydrogenated soybean oil', 'partially hydrogenated cottonseed oil',
+    # Flavors, colors and additives
+    'salt', 'sea salt', 'cinnamon', 'cocoa', 'chocolate', 'vanilla', 'rosemary', 'rosemary extract',
+    'natural flavor', 'natural flavors', 'artificial flavor', 'malt flavor', 'caramel color',
+    'annatto extract', 'turmeric extract', 'red 40', 'yellow 5', 'yellow 6', 'blue 1', 'blue 2',
+    'red 3', 'red 40 lake', 'yellow 5 lake', 'yellow 6 lake', 'blue 1 lake', 'blue 2 lake', 'bht', 'bha', 'tbhq', 'mixed tocopherols', 'tocopherols', 'sodium benzoate',
+    'citric acid', 'soy lecithin', 'sunflower lecithin', 'gelatin', 'trisodium phosphate',
+    'calcium carbonate', 'baking soda', 'yeast', 'alpha amylase',
+    # Vitamins and minerals
+    'vitamin a palmitate', 'vitamin b1', 'vitamin b2', 'vitamin b3', 'vitamin b5', 'vitamin b6',
+    'vitamin b12', 'vitamin c', 'vitamin d', 'vitamin d3', 'vitamin e', 'ascorbic acid',
+    'thiamin', 'thiamine mononitrate', 'thiamin mononitrate', 'thiamin hydrochloride',
+    'riboflavin', 'niacin', 'niacinamide', 'pyridoxine hydrochloride', 'calcium pantothenate', 'folic acid',
+    'reduced iron', 'electrolytic iron', 'ferrous fumarate', 'ferric orthophosphate',
+    'zinc oxide', 'potassium chloride', 'tricalcium phosphate',
+)
+
+# Leading words that refine an ingredient without changing what it is
+QUALIFIERS = (
+    'organic', 'dried', 'enriched', 'toasted', 'roasted', 'unsweetened', 'non-gmo', 'freeze-dried', 'fd&c'
+)
+
+# "Contains 2% or less of", "Contains less than 2% of", ...
+_MINOR_CLAUSE = re.compile(
+    r'^contains\s+(?:less than\s+)?\d+(?:\.\d+)?%\s*(?:or less\s+)?of\s*(?:each of\s+)?(?:the following\s*)?:?\s*'
+)
+# Category headers such as "Vitamins and Minerals:"
+_HEADER = re.compile(r'^[^:()]*:\s*')
+# Preservative notes such as "BHT Added to Preserve Freshness"
+_PRESERVATIVE_NOTE = re.compile(
+    r'\s*(?:\(?\s*(?:added\s+)?(?:to|for)\s+(?:preserve|protect|maintain)?\s*freshness\s*\)?'
+    r'|\(?\s*(?:a\s+)?preservative\s*\)?)\s*$'
+)
+# Numbered color notation: "Yellow No. 5", "Red #40" and "Blue Nr. 1" all become "Yellow 5" etc.
+_COLOR_NUMBER = re.compile(r'\b(?:no|nr)\b\.?\s*#?\s*(?=\d)|#\s*(?=\d)', re.IGNORECASE)
+# Brackets and top-level separators; a period only separates before whitespace or the end
+_TOKEN = re.compile(r'([()\[\],;]|\.(?=\s|$))')
+_NON_WORD = re.compile(r'[^a-z0-9%&\- ]+')
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a padded string."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _singular(word: str) -> str:
+    """Crude singular form, enough to tell inflections of a word from typos."""
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    return word[:-1] if word.endswith('s') and not word.endswith('ss') else word
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between a and b, stopping early once above limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Inverted trigram index for fast fuzzy lookup over a fixed vocabulary."""
+
+    def __init__(self, entries: Iterable[str]):
+        """
+        Build the index.
+
+        Args:
+            entries: Vocabulary strings
+        """
+        self.entries = sorted(set(entries))
+        self._grams = [_trigrams(entry) for entry in self.entries]
+        self._postings: Dict[str, List[int]] = {}
+        for entry_id, grams in enumerate(self._grams):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(entry_id)
+
+    def candidates(self, query: str, min_similarity: float = 0.5) -> List[Tuple[str, float]]:
+        """
+        Find every sufficiently similar vocabulary entry.
+
+        Args:
+            query: String to look up
+            min_similarity: Minimum Dice coefficient over trigrams
+
+        Returns:
+            (entry, similarity) pairs, most similar first
+        """
+        query_grams = _trigrams(query)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        matches = []
+        for entry_id, count in shared.items():
+            similarity = 2.0 * count / (len(query_grams) + len(self._grams[entry_id]))
+            if similarity >= min_similarity:
+                matches.append((self.entries[entry_id], similarity))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def search(self, query: str, min_similarity: float = 0.5) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar vocabulary entry.
+
+        Args:
+            query: String to look up
+            min_similarity: Minimum Dice coefficient over trigrams
+
+        Returns:
+            (entry, similarity) for the best match, or None
+        """
+        matches = self.candidates(query, min_similarity)
+        return matches[0] if matches else None
+
+
+class IngredientCanonicalizer:
+    """Maps free-text ingredient names onto a canonical vocabulary."""
+
+    def __init__(self, vocabulary: Iterable[str] = KNOWN_INGREDIENTS, qualifiers: Iterable[str] = QUALIFIERS):
+        """
+        Initialize the canonicalizer.
+
+        Args:
+            vocabulary: Canonical ingredient names (lowercase)
+            qualifiers: Leading words that may prefix a vocabulary entry
+        """
+        self.vocabulary = frozenset(vocabulary)
+        self.qualifiers = frozenset(qualifiers)
+        self.words = frozenset(word for entry in self.vocabulary for word in entry.split()) | self.qualifiers
+        self._word_index = TrigramIndex(self.words)
+        self._phrase_index = TrigramIndex(self.vocabulary)
+        self._longest_entry = max(len(entry.split()) for entry in self.vocabulary)
+        self.canonicalize = lru_cache(maxsize=8192)(self._canonicalize)
+
+    def _correct_word(self, word: str) -> str:
+        """
+        Fix a misspelled word against the vocabulary's words.
+
+        Only words missing from the vocabulary are corrected, and only when a
+        single vocabulary word is strictly closest; plural and singular forms
+        of a vocabulary word ("peas", "kernel") are real words, not typos.
+        """
+        if word in self.words or len(word) < 4 or not word.isalpha():
+            return word
+        limit = 1 if len(word) <= 5 else 2
+        distances = sorted(
+            (_edit_distance(word, candidate, limit), candidate)
+            for candidate, _ in self._word_index.candidates(word, min_similarity=0.5)
+        )
+        close = [(distance, candidate) for distance, candidate in distances if distance <= limit]
+        if not close or (len(close) > 1 and close[1][0] == close[0][0]):
+            return word
+        candidate = close[0][1]
+        return word if _singular(candidate) == _singular(word) else candidate
+
+    def _split_qualifiers(self, words: List[str]) -> Tuple[List[str], List[str]]:
+        """Split leading qualifier words from the rest of the name."""
+        i = 0
+        while i < len(words) - 1 and words[i] in self.qualifiers:
+            i += 1
+        return words[:i], words[i:]
+
+    def _segment(self, words: List[str]) -> Optional[List[str]]:
+        """Split run-together ingredients (missing commas) into vocabulary entries."""
+        segments, i = [], 0
+        while i < len(words):
+            for size in range(min(self._longest_entry, len(words) - i), 0, -1):
+                candidate = ' '.join(words[i:i + size])
+                if candidate in self.vocabulary:
+                    segments.append(candidate)
+                    i += size
+                    break
+            else:
+                return None
+        return segments if len(segments) > 1 else None
+
+    def _canonicalize(self, text: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+        """
+        Canonicalize one ingredient name.
+
+        Args:
+            text: Ingredient name without parenthesized parts
+
+        Returns:
+            Tuple of (canonical name, vocabulary base or None) pairs; more than
+            one pair when the text contained several run-together ingredients
+        """
+        normalized = re.sub(r'\s+', ' ', _NON_WORD.sub(' ', text.lower())).strip()
+        if not normalized:
+            return ()
+
+        words = [self._correct_word(word) for word in normalized.split()]
+        phrase = ' '.join(words)
+        if phrase in self.vocabulary:
+            return ((phrase, phrase),)
+
+        qualifiers, rest = self._split_qualifiers(words)
+        base = ' '.join(rest)
+        if base in self.vocabulary:
+            return ((phrase, base),)
+
+        segments = self._segment(rest)
+        if segments:
+            prefix = ' '.join(qualifiers)
+            return tuple(((f'{prefix} {segment}' if prefix else segment), segment) for segment in segments)
+
+        # A fuzzy phrase match may fix spelling but must not drop words ("chocolate chips")
+        match = self._phrase_index.search(base, min_similarity=0.75)
+        if match and len(match[0].split()) == len(rest):
+            return ((' '.join(qualifiers + [match[0]]), match[0]),)
+
+        return ((phrase, None),)
+
+
+_default_canonicalizer: Optional[IngredientCanonicalizer] = None
+
+
+def get_canonicalizer() -> IngredientCanonicalizer:
+    """Return the shared canonicalizer built from KNOWN_INGREDIENTS."""
+    global _default_canonicalizer
+    if _default_canonicalizer is None:
+        _default_canonicalizer = IngredientCanonicalizer()
+    return _default_canonicalizer
+
+
+def _tokenize(text: str) -> List:
+    """
+    Turn label text into a nested list structure.
+
+    Each ingredient becomes [text, children] where children is the same
+    structure for any parenthesized part.
+    """
+    stack = [[]]
+    # Drop "No." before splitting so its period is not taken for a separator
+    for token in _TOKEN.split(_COLOR_NUMBER.sub('', text)):
+        if not token:
+            continue
+        if token in ('(', '['):
+            stack.append([])
+        elif token in (')', ']'):
+            if len(stack) > 1:  # Ignore unbalanced closing brackets
+                group = stack.pop()
+                stack[-1].append(('group', group))
+        elif token in (',', ';', '.'):
+            stack[-1].append(('sep',))
+        else:
+            stack[-1].append(token)
+
+    # Close any unbalanced opening brackets
+    while len(stack) > 1:
+        group = stack.pop()
+        stack[-1].append(('group', group))
+    return _group(stack[0])
+
+
+def _group(items: List) -> List:
+    """Combine text and bracket groups between separators into ingredients."""
+    ingredients, name, children = [], '', []
+    for item in items + [('sep',)]:
+        if isinstance(item, tuple) and item[0] == 'sep':
+            if name.strip() or children:
+                ingredients.append([name.strip(), children])
+            name, children = '', []
+        elif isinstance(item, tuple):
+            children.extend(_group(item[1]))
+        else:
+            name += ' ' + item
+    return ingredients
+
+
+def _build(nodes: List, canonicalizer: IngredientCanonicalizer, state: dict, parent_position: Optional[int] = None) -> List[ParsedIngredient]:
+    """
+    Canonicalize tokenized ingredients, splitting run-together names.
+
+    Args:
+        nodes: Output of _tokenize()
+        canonicalizer: Canonicalizer to use
+        state: Running 'position' counter and 'minor' clause flag
+        parent_position: Label position of the enclosing ingredient, if nested
+
+    Returns:
+        Parsed ingredients
+    """
+    parsed: List[ParsedIngredient] = []
+    for raw, children in nodes:
+        text = ' '.join(raw.split())
+        lowered = text.lower()
+
+        clause = _MINOR_CLAUSE.match(lowered)
+        if clause:
+            state['minor'] = True
+            text = text[clause.end():]
+        else:
+            header = _HEADER.match(lowered)
+            if header:
+                text = text[header.end():]
+
+        note = _PRESERVATIVE_NOTE.search(text.lower())
+        if note:
+            text = text[:note.start()]
+
+        names = canonicalizer.canonicalize(text.strip()) if text.strip() else ()
+        if not names:
+            # A bare group such as "(Wheat Flour, Niacin)" after a header
+            parsed.extend(_build(children, canonicalizer, state, parent_position))
+            continue
+
+        for index, (name, base) in enumerate(names):
+            if parent_position is None:
+                state['position'] += 1
+            position = parent_position or state['position']
+
+            sub_ingredients = []
+            if children and index == len(names) - 1:
+                sub_state = {'position': 0, 'minor': state['minor']}
+                sub_ingredients = _build(children, canonicalizer, sub_state, position)
+
+            parsed.append({
+                'raw': ' '.join(raw.split()),
+                'name': name,
+                'base': base,
+                'known': base is not None,
+                'position': position,
+                'minor': state['minor'],
+                'preservative': bool(note),
+                'sub_ingredients': sub_ingredients
+            })
+    return parsed
+
+
+def parse_ingredients(text: str, canonicalizer: Optional[IngredientCanonicalizer] = None) -> List[ParsedIngredient]:
+    """
+    Parse an ingredient label into canonical ingredients.
+
+    Args:
+        text: Raw ingredient list
+        canonicalizer: Canonicalizer to use (defaults to the shared one)
+
+    Returns:
+        Top-level ingredients in label order, with nested sub-ingredients
+    """
+    state = {'position': 0, 'minor': False}
+    return _build(_tokenize(text), canonicalizer or get_canonicalizer(), state)
+
+
+def display_name(name: str) -> str:
+    """
+    Title-case a canonical name for display, keeping acronyms upper case.
+
+    Args:
+        name: Canonical ingredient name
+
+    Returns:
+        Name such as "BHT" or "Vitamin B12"
+    """
+    return ' '.join(
+        word.upper() if len(word) <= 4 and not re.search(r'[aeiouy]', word) else word.capitalize()
+        for word in name.split()
+    )
+
+
+def flatten_ingredients(ingredients: List[ParsedIngredient]) -> List[ParsedIngredient]:
+    """
+    Flatten parsed ingredients depth-first, including sub-ingredients.
+
+    Args:
+        ingredients: Output of parse_ingredients()
+
+    Returns:
+        Every ingredient and sub-ingredient in label order
+    """
+    flat = []
+    for ingredient in ingredients:
+        flat.append(ingredient)
+        flat.extend(flatten_ingredients(ingredient['sub_ingredients']))
+    return flat
+
+
+def canonical_ingredient_names(text: str) -> List[str]:
+    """
+    Canonical names of the top-level ingredients in label order.
+
+    Args:
+        text: Raw ingredient list
+
+    Returns:
+        List of canonical ingredient names
+    """
+    return [ingredient['name'] for ingredient in parse_ingredients(text)]
+
+
+def _key_names(ingredients: List[ParsedIngredient]) -> str:
+    """Comma-separated canonical names, with sub-ingredients in parentheses."""
+    return ', '.join(
+        f"{ingredient['name']} ({_key_names(ingredient['sub_ingredients'])})"
+        if ingredient['sub_ingredients'] else ingredient['name']
+        for ingredient in ingredients
+    )
+
+
+@lru_cache(maxsize=4096)
+def canonical_ingredient_key(text: str) -> str:
+    """
+    Canonical form of an ingredient list for cache and index keys.
+
+    Nested ingredients are part of the key, so two labels that differ only
+    inside a sub-ingredient list (a dye in "Chocolate Chips (...)") never
+    share cached analyses.
+
+    Args:
+        text: Raw ingredient list
+
+    Returns:
+        Comma-separated canonical ingredient names, sub-ingredients in parentheses
+    """
+    return _key_names(parse_ingredients(text))
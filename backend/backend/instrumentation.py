@@ -0,0 +1,179 @@
+"""
+Stage-level timing for the analysis pipeline.
+
+LangChain callbacks report the start and end of every graph node, retriever
+and LLM call in a run. PipelineInstrumentation turns those into histograms in
+the shared metrics registry, so stage latencies (and LLM tokens per node) are
+available without LangSmith tracing. Embedding calls and reranking don't emit
+callbacks, so they are timed by the TimedEmbeddings and TimedCompressor
+wrappers instead.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_core.embeddings import Embeddings
+
+from backend.metrics import metrics
+
+
+class PipelineInstrumentation(BaseCallbackHandler):
+    """Callback handler that records per-node, per-retriever and per-LLM timings."""
+
+    # Record on the calling thread/event loop so timings aren't skewed
+    run_inline = True
+
+    def __init__(self):
+        """Initialize the handler."""
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, Tuple[str, str, float]] = {}
+
+    def _start(self, run_id: UUID, metric: str, label: str):
+        """Remember when a run started."""
+        with self._lock:
+            self._runs[run_id] = (metric, label, time.perf_counter())
+
+    def _finish(self, run_id: UUID, error: bool = False) -> Optional[str]:
+        """Record the duration of a finished run; returns its label."""
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+
+        metric, label, started = run
+        label_name = 'retriever' if metric == 'pipeline_retriever_seconds' else 'node'
+        metrics.observe(metric, time.perf_counter() - started, **{label_name: label})
+        if error:
+            metrics.inc('pipeline_errors_total', **{label_name: label})
+        return label
+
+    @staticmethod
+    def _node(metadata: Optional[Dict[str, Any]]) -> str:
+        """Graph node a run belongs to (metadata is inherited by child runs)."""
+        return (metadata or {}).get('langgraph_node', 'none')
+
+    # Graph nodes
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        """Start timing a graph node (other chains are ignored)."""
+        node = self._node(metadata)
+        if kwargs.get('name') == node:
+            self._start(run_id, 'pipeline_node_seconds', node)
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any):
+        """Record a graph node's duration."""
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        """Record a failed graph node."""
+        self._finish(run_id, error=True)
+
+    # Retrievers (the ensemble and each of its members get their own run)
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID, **kwargs: Any):
+        """Start timing a retriever."""
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'retriever'
+        self._start(run_id, 'pipeline_retriever_seconds', name)
+
+    def on_retriever_end(self, documents: Sequence[Document], *, run_id: UUID, **kwargs: Any):
+        """Record a retriever's duration."""
+        self._finish(run_id)
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        """Record a failed retriever."""
+        self._finish(run_id, error=True)
+
+    # LLM calls
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        """Start timing a chat model call."""
+        self._start(run_id, 'pipeline_llm_seconds', self._node(metadata))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        """Start timing a completion model call."""
+        self._start(run_id, 'pipeline_llm_seconds', self._node(metadata))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        """Record an LLM call's duration and token usage."""
+        node = self._finish(run_id)
+        if node is None:
+            return
+
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+                if usage:
+                    metrics.inc('pipeline_llm_tokens_total', usage.get('input_tokens', 0),
+                                node=node, direction='input')
+                    metrics.inc('pipeline_llm_tokens_total', usage.get('output_tokens', 0),
+                                node=node, direction='output')
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        """Record a failed LLM call."""
+        self._finish(run_id, error=True)
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper that records embedding latency."""
+
+    def __init__(self, embeddings: Embeddings, stage: str = "retrieval"):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: Embeddings model to delegate to
+            stage: Label separating retrieval embeddings from other uses of
+                the same model (e.g. 'answer_cache' for chat questions)
+        """
+        self.embeddings = embeddings
+        self.stage = stage
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents (timed)."""
+        with metrics.timer('pipeline_embedding_seconds', operation='documents', stage=self.stage):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query (timed)."""
+        with metrics.timer('pipeline_embedding_seconds', operation='query', stage=self.stage):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of embed_documents."""
+        with metrics.timer('pipeline_embedding_seconds', operation='documents', stage=self.stage):
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async variant of embed_query."""
+        with metrics.timer('pipeline_embedding_seconds', operation='query', stage=self.stage):
+            return await self.embeddings.aembed_query(text)
+
+
+class TimedCompressor(BaseDocumentCompressor):
+    """Document compressor wrapper (e.g. Cohere rerank) that records latency."""
+
+    compressor: BaseDocumentCompressor
+    name: str = "rerank"
+
+    def compress_documents(self, documents: Sequence[Document], query: str,
+                           callbacks: Callbacks = None) -> Sequence[Document]:
+        """Compress documents (timed)."""
+        with metrics.timer('pipeline_rerank_seconds', compressor=self.name):
+            return self.compressor.compress_documents(documents, query, callbacks=callbacks)
+
+    async def acompress_documents(self, documents: Sequence[Document], query: str,
+                                  callbacks: Callbacks = None) -> Sequence[Document]:
+        """Async variant of compress_documents."""
+        with metrics.timer('pipeline_rerank_seconds', compressor=self.name):
+            return await self.compressor.acompress_documents(documents, query, callbacks=callbacks)
+
+
+# Shared handler attached to the analysis graph
+pipeline_instrumentation = PipelineInstrumentation()
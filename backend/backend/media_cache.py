@@ -0,0 +1,276 @@
+"""
+Content-addressed cache for generated media.
+
+Video and audio scripts are templated from the verdict and product name, so
+the same few scripts come up again and again. Media is cached under the
+sha256 of everything that determines it (kind, script, voice, presenter
+image): D-ID videos as their result URL until the URL's signature expires,
+gTTS audio as MP3 files on disk, served by /api/audio/<key>. Repeat products
+get their media instantly without another D-ID or TTS call.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from backend.config import (
+    AUDIO_SCRIPT_TTL_SECONDS,
+    DID_RESULT_URL_TTL_SECONDS,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MAX_BYTES,
+    MEDIA_CACHE_PATH
+)
+from backend.metrics import metrics
+
+# Cached URLs this close to expiry are treated as expired, so a client has
+# time to load the video
+URL_EXPIRY_MARGIN_SECONDS = 600
+
+
+def media_key(kind: str, script: str, voice: str, image: str = "") -> str:
+    """
+    Content address of a piece of generated media.
+
+    Args:
+        kind: 'video' or 'audio'
+        script: Spoken text
+        voice: Voice identifier (provider and voice ID, or TTS language)
+        image: Presenter image URL (videos only)
+
+    Returns:
+        sha256 hex digest
+    """
+    return hashlib.sha256("\x1f".join([kind, script.strip(), voice, image]).encode('utf-8')).hexdigest()
+
+
+def url_expiry(url: str, default_ttl: int = DID_RESULT_URL_TTL_SECONDS) -> float:
+    """
+    When a signed result URL stops working.
+
+    Args:
+        url: Result URL (S3-style signed URLs carry an Expires parameter)
+        default_ttl: Seconds from now to assume when the URL has none
+
+    Returns:
+        Expiry as a Unix timestamp
+    """
+    expires = parse_qs(urlparse(url).query).get('Expires')
+    if expires and expires[0].isdigit():
+        return float(expires[0])
+    return time.time() + default_ttl
+
+
+class MediaCache:
+    """SQLite index of cached media URLs and files, with size-bounded file eviction."""
+
+    def __init__(
+        self,
+        path: Path = MEDIA_CACHE_PATH,
+        blob_dir: Path = MEDIA_CACHE_DIR,
+        max_bytes: int = MEDIA_CACHE_MAX_BYTES
+    ):
+        """
+        Initialize the media cache.
+
+        Args:
+            path: SQLite database file (':memory:' for a throwaway index)
+            blob_dir: Directory holding cached media files
+            max_bytes: Total size of cached files before the least recently used are deleted
+        """
+        self.path = str(path)
+        self.blob_dir = Path(blob_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                url TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                expires_at REAL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_media_accessed ON media (accessed_at)")
+        # Scripts the server issued for streaming, so clients stream by key, never by text
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scripts (
+                key TEXT PRIMARY KEY,
+                script TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def blob_path(self, key: str, suffix: str = '.mp3') -> Path:
+        """File a cached media blob is stored in."""
+        return self.blob_dir / f"{key}{suffix}"
+
+    def get_url(self, key: str) -> Optional[str]:
+        """
+        Look up a cached media URL that is still valid.
+
+        Args:
+            key: media_key() of the media
+
+        Returns:
+            URL, or None on a miss or when it (nearly) expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT url, expires_at FROM media WHERE key = ?", (key,)).fetchone()
+            if row and row[0] and (row[1] is None or row[1] - URL_EXPIRY_MARGIN_SECONDS > now):
+                self._conn.execute("UPDATE media SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                metrics.inc('media_cache_requests_total', store='url', result='hit')
+                return row[0]
+            if row and row[0]:
+                self._conn.execute("DELETE FROM media WHERE key = ?", (key,))
+                self._conn.commit()
+
+        metrics.inc('media_cache_requests_total', store='url', result='expired' if row else 'miss')
+        return None
+
+    def put_url(self, key: str, kind: str, url: str, expires_at: Optional[float] = None):
+        """
+        Cache a media URL.
+
+        Args:
+            key: media_key() of the media
+            kind: 'video' or 'audio'
+            url: Result URL
+            expires_at: Unix time the URL stops working (default: from the URL)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (key, kind, url, expires_at if expires_at is not None else url_expiry(url), now, now)
+            )
+            self._conn.commit()
+
+    def get_path(self, key: str, suffix: str = '.mp3') -> Optional[Path]:
+        """
+        Look up a cached media file.
+
+        Args:
+            key: media_key() of the media
+            suffix: File extension
+
+        Returns:
+            Path of the file, or None on a miss
+        """
+        path = self.blob_path(key, suffix)
+        if not path.is_file():
+            metrics.inc('media_cache_requests_total', store='file', result='miss')
+            return None
+
+        with self._lock:
+            self._conn.execute("UPDATE media SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        metrics.inc('media_cache_requests_total', store='file', result='hit')
+        return path
+
+    def put_bytes(self, key: str, kind: str, data: bytes, suffix: str = '.mp3') -> Path:
+        """
+        Store media bytes and evict the least recently used files beyond max_bytes.
+
+        Args:
+            key: media_key() of the media
+            kind: 'video' or 'audio'
+            data: File contents
+            suffix: File extension
+
+        Returns:
+            Path of the stored file
+        """
+        path = self.blob_path(key, suffix)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        partial = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        partial.write_bytes(data)
+        partial.replace(path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, NULL, ?, NULL, ?, ?)",
+                (key, kind, len(data), now, now)
+            )
+            self._evict_files(suffix)
+            self._conn.commit()
+        return path
+
+    def _evict_files(self, suffix: str):
+        """Delete the least recently used files while the total exceeds max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM media").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM media WHERE size > 0 ORDER BY accessed_at"
+        ).fetchall():
+            self.blob_path(key, suffix).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM media WHERE key = ?", (key,))
+            metrics.inc('media_cache_evictions_total')
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def put_script(self, key: str, script: str, ttl: int = AUDIO_SCRIPT_TTL_SECONDS):
+        """
+        Remember a script under its media key, dropping scripts older than ttl.
+
+        Args:
+            key: media_key() of the media the script produces
+            script: Spoken text
+            ttl: Seconds a script stays retrievable
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM scripts WHERE created_at < ?", (now - ttl,))
+            self._conn.execute("INSERT OR REPLACE INTO scripts VALUES (?, ?, ?)", (key, script, now))
+            self._conn.commit()
+
+    def get_script(self, key: str, ttl: int = AUDIO_SCRIPT_TTL_SECONDS) -> Optional[str]:
+        """
+        Look up a script issued with put_script().
+
+        Args:
+            key: media_key() of the media
+            ttl: Seconds a script stays retrievable
+
+        Returns:
+            Script text, or None if it was never issued or has expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT script FROM scripts WHERE key = ? AND created_at >= ?", (key, time.time() - ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """Report the number of cached URLs and files and the bytes on disk."""
+        with self._lock:
+            urls, files, size = self._conn.execute(
+                "SELECT COUNT(url), SUM(size > 0), COALESCE(SUM(size), 0) FROM media"
+            ).fetchone()
+        return {
+            'urls': urls,
+            'files': files or 0,
+            'bytes': size,
+            'max_bytes': self.max_bytes
+        }
+
+
+# Shared cache used by the video and audio generators
+media_cache = MediaCache()
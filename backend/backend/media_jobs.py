@@ -0,0 +1,345 @@
+"""
+Background job queue for video and audio generation.
+
+Generating a D-ID video takes 15-60 seconds, far longer than the analysis
+itself. /api/analyze now enqueues media generation here and returns a job ID;
+clients pick the result up from the job status endpoint or its SSE channel.
+
+Jobs are stored in SQLite so queued work survives a restart. Several
+processes may share the database: a claimed job records its owner and a
+lease that the owner renews while it runs, and only running jobs whose lease
+has expired (their process stopped) are queued again. A small pool of worker
+threads runs the handler registered for each job kind.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+from backend.config import (
+    MEDIA_JOB_LEASE_SECONDS,
+    MEDIA_JOB_RETENTION_SECONDS,
+    MEDIA_JOB_WORKERS,
+    MEDIA_JOBS_PATH
+)
+from backend.metrics import metrics
+
+# Job states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# How often idle workers check for jobs queued by another process
+POLL_INTERVAL_SECONDS = 5.0
+
+
+class MediaJob(TypedDict):
+    """A media generation job as reported to clients."""
+    job_id: str
+    kind: str
+    status: str
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+
+class MediaJobQueue:
+    """SQLite-backed job queue with a pool of worker threads."""
+
+    def __init__(
+        self,
+        path: Path = MEDIA_JOBS_PATH,
+        workers: int = MEDIA_JOB_WORKERS,
+        retention_seconds: int = MEDIA_JOB_RETENTION_SECONDS,
+        lease_seconds: float = MEDIA_JOB_LEASE_SECONDS
+    ):
+        """
+        Initialize the queue (worker threads start once a handler is registered).
+
+        Args:
+            path: SQLite database file (':memory:' for a throwaway queue)
+            workers: Jobs processed at once
+            retention_seconds: Finished jobs older than this are deleted
+            lease_seconds: How long a running job stays claimed without a renewal
+        """
+        self.path = str(path)
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        # Identifies this queue's claims among processes sharing the database
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS media_jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_until REAL
+            )
+        """)
+        # Databases created before leases existed get the new columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(media_jobs)")}
+        for column, column_type in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE media_jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_media_jobs_status ON media_jobs (status, created_at)")
+        self._conn.commit()
+        with self._lock:
+            self._recover_expired()
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        """
+        Register the function that runs jobs of a kind.
+
+        Args:
+            kind: Job kind, e.g. 'video'
+            handler: Called with the job payload; returns the job result.
+                Raising marks the job failed.
+        """
+        with self._changed:
+            self._handlers[kind] = handler
+            self._changed.notify_all()
+        # Jobs recovered from a previous run can start right away
+        self._start_workers()
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """
+        Enqueue a job.
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable handler input
+
+        Returns:
+            Job ID
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for media job kind '{kind}'")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._changed:
+            self._conn.execute(
+                "INSERT INTO media_jobs (job_id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), now, now)
+            )
+            self._conn.execute(
+                f"DELETE FROM media_jobs WHERE status IN ({', '.join('?' * len(FINAL_STATES))}) AND updated_at < ?",
+                (*FINAL_STATES, now - self.retention_seconds)
+            )
+            self._conn.commit()
+            self._changed.notify_all()
+        metrics.inc('media_jobs_total', kind=kind, status=QUEUED)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[MediaJob]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: ID returned by submit()
+
+        Returns:
+            The job, or None if it is unknown (or was cleaned up)
+        """
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id: str) -> Optional[MediaJob]:
+        """get() with the lock already held."""
+        row = self._conn.execute(
+            "SELECT job_id, kind, status, result, error, created_at, updated_at FROM media_jobs WHERE job_id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'result': json.loads(row[3]) if row[3] else None,
+            'error': row[4],
+            'created_at': row[5],
+            'updated_at': row[6]
+        }
+
+    def wait(self, job_id: str, timeout: float, last_status: Optional[str] = None) -> Optional[MediaJob]:
+        """
+        Wait until a job's status differs from last_status (or the timeout passes).
+
+        Args:
+            job_id: ID returned by submit()
+            timeout: Maximum seconds to wait
+            last_status: Status the caller has already seen
+
+        Returns:
+            The job as of the change or timeout, or None if it is unknown
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job['status'] != last_status or remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that hasn't finished.
+
+        A running job can't be interrupted, but its result is discarded.
+
+        Args:
+            job_id: ID returned by submit()
+
+        Returns:
+            True if the job was cancelled, False if unknown or already final
+        """
+        with self._changed:
+            cursor = self._conn.execute(
+                "UPDATE media_jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+            self._conn.commit()
+            self._changed.notify_all()
+            job = self._get(job_id) if cursor.rowcount else None
+        if job is not None:
+            metrics.inc('media_jobs_total', kind=job['kind'], status=CANCELLED)
+        return job is not None
+
+    def _start_workers(self):
+        """Start the worker threads and the lease keeper once."""
+        with self._lock:
+            if self._threads:
+                return
+            targets = [(self._work, f"media-job-{i}") for i in range(self.workers)]
+            targets.append((self._keep_leases, "media-job-leases"))
+            for target, name in targets:
+                thread = threading.Thread(target=target, name=name, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _recover_expired(self) -> int:
+        """Queue again running jobs whose owner stopped renewing their lease (lock held)."""
+        now = time.time()
+        recovered = self._conn.execute(
+            """
+            UPDATE media_jobs SET status = ?, owner = NULL, lease_until = NULL, updated_at = ?
+            WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)
+            """,
+            (QUEUED, now, RUNNING, now)
+        ).rowcount
+        self._conn.commit()
+        if recovered:
+            self._changed.notify_all()
+            print(f"♻️  Re-queued {recovered} media jobs whose worker stopped")
+            metrics.inc('media_jobs_recovered_total', recovered)
+        return recovered
+
+    def _keep_leases(self):
+        """Lease keeper loop: renew this queue's running jobs and recover expired ones."""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._changed:
+                self._conn.execute(
+                    "UPDATE media_jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+                    (time.time() + self.lease_seconds, self.owner, RUNNING)
+                )
+                self._recover_expired()
+
+    def _claim(self) -> tuple:
+        """Take the oldest queued job of a registered kind, waiting until there is one."""
+        with self._changed:
+            while True:
+                kinds = list(self._handlers)
+                row = self._conn.execute(
+                    f"""
+                    SELECT job_id, kind, payload, created_at FROM media_jobs
+                    WHERE status = ? AND kind IN ({', '.join('?' * len(kinds))})
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (QUEUED, *kinds)
+                ).fetchone()
+                if row is not None:
+                    # Conditional so two processes sharing the database can't both claim it
+                    now = time.time()
+                    claimed = self._conn.execute(
+                        """
+                        UPDATE media_jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ?
+                        WHERE job_id = ? AND status = ?
+                        """,
+                        (RUNNING, self.owner, now + self.lease_seconds, now, row[0], QUEUED)
+                    ).rowcount
+                    self._conn.commit()
+                    if claimed:
+                        self._changed.notify_all()
+                        return row
+                    continue
+                # Woken by submit() in this process; the timeout picks up jobs queued by others
+                self._changed.wait(POLL_INTERVAL_SECONDS)
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        """Record a job's outcome unless it was cancelled (or its lease lost) meanwhile."""
+        with self._changed:
+            self._conn.execute(
+                """
+                UPDATE media_jobs SET status = ?, result = ?, error = ?, updated_at = ?
+                WHERE job_id = ? AND status = ? AND owner = ?
+                """,
+                (status, json.dumps(result) if result is not None else None, error, time.time(),
+                 job_id, RUNNING, self.owner)
+            )
+            self._conn.commit()
+            self._changed.notify_all()
+
+    def _work(self):
+        """Worker loop: run queued jobs one at a time."""
+        while True:
+            job_id, kind, payload, created_at = self._claim()
+            metrics.observe('media_job_wait_seconds', time.time() - created_at, kind=kind)
+            started = time.perf_counter()
+            try:
+                result = self._handlers[kind](json.loads(payload))
+                self._finish(job_id, DONE, result=result)
+                metrics.inc('media_jobs_total', kind=kind, status=DONE)
+            except Exception as e:
+                print(f"❌ Media job {job_id} ({kind}) failed: {e}")
+                self._finish(job_id, FAILED, error=str(e))
+                metrics.inc('media_jobs_total', kind=kind, status=FAILED)
+            finally:
+                metrics.observe('media_job_seconds', time.perf_counter() - started, kind=kind)
+
+    def stats(self) -> Dict[str, int]:
+        """Report the number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM media_jobs GROUP BY status").fetchall()
+        return {'workers': self.workers, **{status: count for status, count in rows}}
+
+
+# Shared queue used by the analysis endpoints
+media_jobs = MediaJobQueue()
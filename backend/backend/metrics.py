@@ -0,0 +1,301 @@
+"""
+Lightweight in-process metrics for the KidSafe Food Analyzer backend.
+
+Counters and histograms are kept in memory and exported through
+/api/metrics as JSON or in the Prometheus text format.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from backend.config import MODEL_PRICES
+
+# Histogram bucket upper bounds (seconds for latencies)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Bucket bounds for payload sizes (bytes) and token counts
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Number of recent samples kept per histogram for percentile estimates
+RESERVOIR_SIZE = 1024
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    """Turn a labels dict into a hashable, order-independent key."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    """Render a label key in Prometheus syntax."""
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Bucketed histogram that also keeps recent samples for percentiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Sorted bucket upper bounds
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        """Record a single observation."""
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile from recent samples.
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Estimated value, or 0.0 if nothing was observed
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        """Return a JSON-friendly summary of the histogram."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled counters and histograms."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Increment a counter.
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            **labels: Metric labels
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        """
+        Record an observation in a histogram.
+
+        Args:
+            name: Metric name
+            value: Observed value
+            buckets: Bucket bounds, used when the series is first created
+            **labels: Metric labels
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        Time a block of code and record the duration in seconds.
+
+        Args:
+            name: Histogram name
+            **labels: Metric labels
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Return the current value of a counter (0 if unset)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram_snapshot(self, name: str, **labels) -> dict:
+        """Return the summary of a histogram (all zeros if unset)."""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.snapshot() if histogram is not None else Histogram().snapshot()
+
+    def counter_series(self, name: str) -> list:
+        """
+        Return every labelled value of a counter.
+
+        Args:
+            name: Metric name
+
+        Returns:
+            List of (labels dict, value) pairs
+        """
+        with self._lock:
+            return [(dict(key), value) for key, value in self._counters.get(name, {}).items()]
+
+    def snapshot(self) -> dict:
+        """
+        Return all metrics as a JSON-friendly dict.
+
+        Returns:
+            Dict with 'counters' and 'histograms' keyed by metric name
+        """
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [{"labels": dict(key), **hist.snapshot()} for key, hist in series.items()]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.bucket_counts):
+                        cumulative += count
+                        bucket_labels = _format_labels(key, 'le="%s"' % bound)
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    inf_labels = _format_labels(key, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{inf_labels} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Shared registry used across the backend
+metrics = MetricsRegistry()
+
+
+def record_token_usage(message, operation: str, prompt_version: str = "", model: str = "") -> float:
+    """
+    Record the token usage reported on an LLM response.
+
+    Cached input tokens are the part of the prompt the provider served from
+    its prompt cache (OpenAI reports them for prompts of 1024+ tokens).
+
+    Args:
+        message: AIMessage (or final chunk) carrying usage_metadata
+        operation: What the call was for (analysis, chat, ...)
+        prompt_version: Version of the prompt template used
+        model: Model that served the call; when it is in MODEL_PRICES the
+            estimated cost is recorded too
+
+    Returns:
+        Estimated cost in USD (0.0 if unknown)
+    """
+    labels = {'operation': operation, 'prompt_version': prompt_version}
+    metrics.inc('llm_calls_total', **labels)
+
+    usage = getattr(message, 'usage_metadata', None)
+    if not usage:
+        return 0.0
+
+    details = usage.get('input_token_details') or {}
+    input_tokens = usage.get('input_tokens', 0)
+    cached_tokens = details.get('cache_read', 0) or 0
+    output_tokens = usage.get('output_tokens', 0)
+    metrics.inc('llm_input_tokens_total', input_tokens, **labels)
+    metrics.inc('llm_cached_input_tokens_total', cached_tokens, **labels)
+    metrics.inc('llm_output_tokens_total', output_tokens, **labels)
+
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cost = ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + output_tokens * output_price) / 1_000_000
+    metrics.inc('llm_cost_usd_total', cost, **labels)
+    return cost
+
+
+def token_usage_summary() -> list:
+    """
+    Summarize recorded token usage per operation and prompt version.
+
+    Returns:
+        List of dicts with call and token totals plus the prompt cache hit ratio
+    """
+    fields = {
+        'llm_calls_total': 'calls',
+        'llm_input_tokens_total': 'input_tokens',
+        'llm_cached_input_tokens_total': 'cached_input_tokens',
+        'llm_output_tokens_total': 'output_tokens',
+        'llm_cost_usd_total': 'cost_usd',
+    }
+    rows: Dict[tuple, dict] = {}
+    for metric, field in fields.items():
+        for labels, value in metrics.counter_series(metric):
+            key = (labels.get('operation', ''), labels.get('prompt_version', ''))
+            row = rows.setdefault(key, {
+                'operation': key[0],
+                'prompt_version': key[1],
+                **{f: 0 for f in fields.values()}
+            })
+            row[field] += value
+
+    for row in rows.values():
+        row['cache_hit_ratio'] = (
+            round(row['cached_input_tokens'] / row['input_tokens'], 4) if row['input_tokens'] else 0.0
+        )
+        row['cost_usd'] = round(row['cost_usd'], 6)
+    return sorted(rows.values(), key=lambda r: (r['operation'], r['prompt_version']))
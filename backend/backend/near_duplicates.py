@@ -0,0 +1,195 @@
+"""
+Near-duplicate analysis reuse.
+
+Store-brand products often have an ingredient list nearly identical to a
+name brand's, differing only in order or a trace ingredient. Each cached
+analysis is indexed by a MinHash signature of its canonical ingredient names,
+split into LSH bands stored (and indexed) in the analysis cache, so a lookup
+is a handful of indexed band matches rather than a scan, even at 100k cached
+products. Candidates are then checked with exact Jaccard similarity.
+
+Reuse is deliberately strict: besides the similarity threshold, both lists
+must get the same rule-engine verdict and the same triggering ingredients at
+the same positions, so a reused analysis never changes the verdict or the
+flagged ingredients. The reused analysis is rewritten for the new product
+name.
+"""
+
+import hashlib
+import json
+import re
+import struct
+from typing import FrozenSet, List, Optional, Tuple, TypedDict
+
+from backend.analysis_cache import AnalysisCache, make_version
+from backend.config import NEAR_DUPLICATE_MAX_CANDIDATES, NEAR_DUPLICATE_THRESHOLD
+from backend.ingredient_parser import flatten_ingredients, parse_ingredients
+from backend.metrics import metrics
+from backend.rule_engine import classify_ingredients
+
+# MinHash signature length and LSH banding (BANDS * ROWS_PER_BAND == NUM_PERMUTATIONS).
+# With 16 bands of 4 rows, lists at Jaccard 0.9 share a band with probability
+# ~1.0 and lists at 0.3 with ~0.12
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# Universal hashing (a * x + b) mod p over a Mersenne prime
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_COEFFICIENTS = [
+    struct.unpack('<QQ', hashlib.sha256(f'minhash-{i}'.encode()).digest()[:16])
+    for i in range(NUM_PERMUTATIONS)
+]
+
+# Histogram buckets for the Jaccard similarity of reused analyses
+SIMILARITY_BUCKETS = (0.9, 0.92, 0.94, 0.96, 0.98, 1.0)
+
+
+class IngredientFingerprint(TypedDict):
+    """What the near-duplicate index stores and looks up for an ingredient list."""
+    names: FrozenSet[str]
+    bands: List[int]
+    rule_key: str
+
+
+class NearDuplicate(TypedDict):
+    """A cached analysis of a nearly identical ingredient list."""
+    cereal_name: str
+    ingredients: str
+    analysis: str
+    similarity: float
+
+
+def ingredient_names(ingredients: str) -> FrozenSet[str]:
+    """Canonical names of all ingredients and sub-ingredients on a label."""
+    return frozenset(ingredient['name'] for ingredient in flatten_ingredients(parse_ingredients(ingredients)))
+
+
+def minhash(names: FrozenSet[str]) -> List[int]:
+    """MinHash signature of a set of ingredient names."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=4).digest(), 'little')
+        for name in names
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _COEFFICIENTS]
+
+
+def lsh_bands(signature: List[int]) -> List[int]:
+    """Hash each band of a signature to a signed 64-bit integer (SQLite INTEGER)."""
+    bands = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'<{1 + ROWS_PER_BAND}I', band, *rows), digest_size=8).digest()
+        bands.append(struct.unpack('<q', digest)[0])
+    return bands
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def rule_key(ingredients: str) -> str:
+    """Fingerprint of the rule-engine verdict and its triggers (rule, ingredient, position)."""
+    result = classify_ingredients(ingredients)
+    triggers = sorted((t['rule'], t['ingredient'], t['position']) for t in result['triggers'])
+    return make_version(result['verdict'], json.dumps(triggers))
+
+
+def rename_product(text: str, old_name: str, new_name: str, escape_json: bool = False) -> str:
+    """
+    Replace a product name in an analysis (case-insensitive).
+
+    Args:
+        text: Analysis markdown, or a JSON-encoded report
+        old_name: Product name the analysis was written for
+        new_name: Product name to use instead
+        escape_json: Names are escaped as JSON string content (for encoded reports)
+
+    Returns:
+        The rewritten text
+    """
+    old_name, new_name = old_name.strip(), new_name.strip()
+    if not old_name or old_name.lower() == new_name.lower():
+        return text
+    if escape_json:
+        old_name, new_name = json.dumps(old_name)[1:-1], json.dumps(new_name)[1:-1]
+    return re.sub(re.escape(old_name), lambda _: new_name, text, flags=re.IGNORECASE)
+
+
+class NearDuplicateFinder:
+    """Finds cached analyses of nearly identical ingredient lists."""
+
+    def __init__(
+        self,
+        cache: AnalysisCache,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        max_candidates: int = NEAR_DUPLICATE_MAX_CANDIDATES
+    ):
+        """
+        Initialize the finder.
+
+        Args:
+            cache: Analysis cache holding the analyses and their LSH bands
+            threshold: Minimum Jaccard similarity of canonical ingredient names
+            max_candidates: LSH candidates checked per lookup
+        """
+        self.cache = cache
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+
+    @staticmethod
+    def fingerprint(ingredients: str) -> IngredientFingerprint:
+        """
+        Compute the index entry for an ingredient list.
+
+        Args:
+            ingredients: Ingredient list
+
+        Returns:
+            IngredientFingerprint with canonical names, LSH bands and rule key
+        """
+        names = ingredient_names(ingredients)
+        return {'names': names, 'bands': lsh_bands(minhash(names)), 'rule_key': rule_key(ingredients)}
+
+    def find(self, ingredients: str, version: str) -> Optional[NearDuplicate]:
+        """
+        Find the most similar cached analysis above the threshold.
+
+        Args:
+            ingredients: Ingredient list to analyze
+            version: Configuration version the analysis must have been made with
+
+        Returns:
+            NearDuplicate, or None if no cached list is similar enough
+        """
+        with metrics.timer('near_duplicate_lookup_seconds'):
+            fingerprint = self.fingerprint(ingredients)
+            candidates = self.cache.similar(
+                version, fingerprint['bands'], fingerprint['rule_key'], self.max_candidates
+            )
+
+            best: Optional[Tuple[float, tuple]] = None
+            for candidate in candidates:
+                similarity = jaccard(fingerprint['names'], ingredient_names(candidate[1]))
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, candidate)
+
+        if best is None:
+            metrics.inc('near_duplicate_requests_total', result='miss')
+            return None
+
+        similarity, (cereal_name, source_ingredients, analysis, _) = best
+        metrics.inc('near_duplicate_requests_total', result='hit')
+        metrics.observe('near_duplicate_similarity', similarity, buckets=SIMILARITY_BUCKETS)
+        return {
+            'cereal_name': cereal_name,
+            'ingredients': source_ingredients,
+            'analysis': analysis,
+            'similarity': similarity
+        }
@@ -2,13 +2,178 @@
 LangGraph-based RAG engine for ingredient analysis.
 """
 
-from typing import List, TypedDict
+import json
+import re
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, TypedDict
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import START, StateGraph
 
-from backend.config import CHAT_MODEL
+from backend.analysis_cache import AnalysisCache, canonical_text, make_version
+from backend.analysis_report import REPORT_SCHEMA_VERSION, AnalysisReport, render_markdown
+from backend.clients import clients
+from backend.config import (
+    ANALYSIS_MODES,
+    CHAT_MODEL,
+    DEFAULT_ANALYSIS_MODE,
+    EMBEDDING_MODEL,
+    MODEL_ROUTING,
+    NEAR_DUPLICATE_REUSE,
+    QUICK_ANALYSIS_MAX_TOKENS,
+    RETRIEVAL_K,
+    ROUTER_FAST_MAX_TOKENS,
+    ROUTER_FAST_MODEL
+)
+from backend.fragment_store import FragmentStore
+from backend.ingredient_parser import canonical_ingredient_key, display_name, parse_ingredients
+from backend.instrumentation import pipeline_instrumentation
+from backend.metrics import metrics, record_token_usage
+from backend.near_duplicates import NearDuplicateFinder, rename_product
+from backend.rule_engine import classify_ingredients, has_artificial_red_flags
+from backend.single_flight import SingleFlight
+
+# Section 4 instructions when the LLM writes the whole breakdown itself
+FULL_BREAKDOWN_INSTRUCTIONS = "For each ingredient or category of ingredients:"
+
+# Sections of the detailed analysis, as headed in the analysis prompt;
+# parallel mode generates each with its own LLM call
+DETAILED_SECTIONS = (
+    "### 1. Overall Assessment",
+    "### 2. Red Flag Ingredients (Check First!)",
+    "### 3. Added Sugar Analysis",
+    "### 4. Ingredient-by-Ingredient Breakdown",
+    "### 5. Key Concerns (Prioritized)",
+    "### 6. Positive Aspects"
+)
+
+# Matches the verdict heading at the top of an analysis
+VERDICT_PATTERN = re.compile(r'##\s*VERDICT:\s*\[?\s*(GOOD|MODERATE|BAD)', re.IGNORECASE)
+
+
+# Routes of a full analysis (see route_analysis)
+ROUTES = ("fast", "full")
+# Bump when route_analysis sends different products down each route
+ROUTING_POLICY_VERSION = "2"
+
+
+def route_analysis(ingredients: str) -> Tuple[str, str]:
+    """
+    Decide how much generation a product needs, from the local rule engine.
+    
+    Only products with artificial or harmful red flags take the fast route:
+    a matched red flag is positive evidence of BAD. Nothing flagged is not
+    evidence of GOOD, since an ingredient the screen does not recognize may
+    still be one, so GOOD, MODERATE and sugar-position BAD products all take
+    the full route.
+    
+    Args:
+        ingredients: Comma-separated list of ingredients
+        
+    Returns:
+        (route, rule verdict) where route is 'fast' or 'full'
+    """
+    rule_verdict = classify_ingredients(ingredients)
+    return ("fast" if has_artificial_red_flags(rule_verdict) else "full"), rule_verdict['verdict']
+
+
+def route_stats() -> List[dict]:
+    """
+    Summarize routed full analyses.
+    
+    Returns:
+        Per route: analyses, latency of the LLM call, estimated cost and
+        reports cut off by the output cap
+    """
+    decisions = metrics.counter_series('analysis_routes_total')
+    stats = []
+    for route in ROUTES:
+        latency = metrics.histogram_snapshot('analysis_route_seconds', route=route)
+        cost = metrics.counter_value('analysis_route_cost_usd_total', route=route)
+        stats.append({
+            'route': route,
+            'analyses': int(sum(value for labels, value in decisions if labels.get('route') == route)),
+            'latency_seconds': latency,
+            'cost_usd': round(cost, 6),
+            'avg_cost_usd': round(cost / latency['count'], 6) if latency['count'] else 0.0,
+            'truncated': int(metrics.counter_value('analysis_route_truncated_total', route=route))
+        })
+    return stats
+
+
+def extract_verdict(text: str) -> Optional[str]:
+    """
+    Extract the verdict from (possibly partial) analysis markdown.
+    
+    Args:
+        text: Analysis text generated so far
+        
+    Returns:
+        'GOOD', 'MODERATE' or 'BAD', or None if no verdict line yet
+    """
+    match = VERDICT_PATTERN.search(text)
+    return match.group(1).upper() if match else None
+
+
+class _AnalysisStream:
+    """Turns LangGraph stream chunks into analysis stream events."""
+    
+    def __init__(self):
+        """Initialize an empty stream."""
+        self.generated = ""
+        self.verdict = None
+        self.analysis = ""
+        self.report = None
+    
+    def feed(self, mode: str, payload) -> List[dict]:
+        """
+        Process one (mode, payload) item from graph.stream / graph.astream.
+        
+        Args:
+            mode: 'messages' or 'values'
+            payload: Stream payload for that mode
+            
+        Returns:
+            Events to emit (possibly empty)
+        """
+        if mode == "values":
+            self.analysis = payload.get("analysis", self.analysis)
+            self.report = payload.get("report", self.report)
+            return []
+        
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") != "analyze" or not chunk.content:
+            return []
+        
+        self.generated += chunk.content
+        events = [{"type": "token", "content": chunk.content}]
+        
+        if self.verdict is None:
+            self.verdict = extract_verdict(self.generated)
+            if self.verdict:
+                events.append({"type": "verdict", "verdict": self.verdict})
+        return events
+    
+    def final_analysis(self) -> str:
+        """Return the complete analysis once the stream is exhausted."""
+        return self.analysis or self.generated
+    
+    def result(self) -> dict:
+        """Return the analysis and (structured mode) report for caching."""
+        return {"analysis": self.final_analysis(), "report": self.report}
+    
+    def done_event(self) -> dict:
+        """Build the closing event."""
+        analysis = self.final_analysis()
+        event = {
+            "type": "done",
+            "verdict": self.verdict or extract_verdict(analysis),
+            "analysis": analysis
+        }
+        if self.report is not None:
+            event["report"] = self.report
+        return event
 
 
 class IngredientAnalysisState(TypedDict):
@@ -18,12 +183,25 @@ class IngredientAnalysisState(TypedDict):
     question: str
     context: List[Document]
     analysis: str
+    mode: str
+    route: str
+    report: Optional[AnalysisReport]
 
 
 class IngredientAnalyzer:
     """LangGraph-based ingredient analyzer using RAG."""
     
-    def __init__(self, retriever, openai_api_key: str, retrieval_strategy: str = "naive"):
+    def __init__(
+        self,
+        retriever,
+        openai_api_key: str,
+        retrieval_strategy: str = "naive",
+        cache: Optional[AnalysisCache] = None,
+        corpus_version: str = "",
+        fragment_store: Optional[FragmentStore] = None,
+        model_routing: bool = MODEL_ROUTING,
+        retrieval_k: int = RETRIEVAL_K
+    ):
         """
         Initialize the ingredient analyzer.
         
@@ -31,28 +209,39 @@ class IngredientAnalyzer:
             retriever: Vector store retriever
             openai_api_key: OpenAI API key
             retrieval_strategy: Name of the retrieval strategy being used
+            cache: Optional persistent analysis cache
+            corpus_version: Fingerprint of the indexed knowledge base
+            fragment_store: Optional vetted explanations for the ingredient breakdown
+            model_routing: Route full analyses (see route_analysis); offline
+                evaluation and precompute runs turn this off so every report
+                comes from CHAT_MODEL
+            retrieval_k: Documents the retriever returns per analysis
         """
         self.retriever = retriever
         self.retrieval_strategy = retrieval_strategy
-        self.llm = ChatOpenAI(
-            model=CHAT_MODEL,
-            api_key=openai_api_key,
-            temperature=0.3  # Slightly lower for more consistent analysis
-        )
+        self.retrieval_k = retrieval_k
+        self.cache = cache
+        self.corpus_version = corpus_version
+        self.fragment_store = fragment_store
+        self.model_routing = model_routing
+        # Reuse analyses of nearly identical ingredient lists (needs the cache)
+        self.near_duplicates = NearDuplicateFinder(cache) if cache is not None and NEAR_DUPLICATE_REUSE else None
+        self.single_flight = SingleFlight("analyze")
+        # Slightly lower temperature for more consistent analysis
+        self.llm = clients.chat_model(CHAT_MODEL, temperature=0.3, api_key=openai_api_key)
         
-        # Create the analysis prompt
-        self.analysis_prompt = ChatPromptTemplate.from_template("""
+        # Create the analysis prompt. Every prompt starts with the same system
+        # message (rules, report format and worked examples, over the
+        # 1024-token minimum for provider prompt caching), then any fixed
+        # mode instructions as a second system message; everything that varies
+        # per request - retrieved context, product, breakdown instructions -
+        # goes in the trailing human message, so the cacheable prefix ends
+        # only where the request-specific text begins.
+        self.analysis_prompt = ChatPromptTemplate.from_messages([
+            ("system", """
 You are a pediatric nutrition expert helping parents understand food ingredients for their children.
 
-You have access to FDA food labeling guidelines and nutritional information. Use this context to provide accurate, evidence-based analysis.
-
-Cereal Product: {cereal_name}
-Ingredients List: {ingredients}
-
-Question: {question}
-
-Relevant Guidelines and Information:
-{context}
+You have access to FDA food labeling guidelines and nutritional information. Use the guidelines provided with each request to give accurate, evidence-based analysis.
 
 IMPORTANT: Structure your response in the following format:
 
@@ -118,7 +307,7 @@ If no red flags above, then check sugars:
 - American Heart Association: Children ages 2-18 should have <25g added sugar/day
 
 ### 4. Ingredient-by-Ingredient Breakdown
-For each ingredient or category of ingredients:
+Follow the breakdown instructions given with the request, using this format:
 - **Ingredient Name**: Good/Concerning/Harmful
   - Explanation based on nutritional science and FDA guidelines
   - Flag if it's a red flag ingredient (artificial colors, HFCS, etc.)
@@ -137,13 +326,194 @@ For each ingredient or category of ingredients:
 - Whole grains, fiber, protein, vitamins
 - What makes this product have any redeeming qualities (if applicable)
 
+---
+
+## Worked Examples
+These products are fictional. Follow their reasoning and format, never their content, and do not include the "Reasoning:" lines in your answer.
+
+**Example A: "Rainbow Puffs"**
+Ingredients: Corn Flour, Sugar, Corn Syrup, Canola Oil, Salt, Red 40, Yellow 5, Blue 1, BHT for Freshness
+
+## VERDICT: BAD ❌
+
+**Quick Summary:** Rainbow Puffs contains three artificial colors and the preservative BHT, and sugar is its second ingredient. These are red flags, so it is not a good choice for children.
+
+Reasoning: The red flag check finds Red 40, Yellow 5, Blue 1 and BHT, so the verdict is BAD before sugars are even considered. The breakdown still covers every ingredient, for example:
+- **Red 40**: Harmful
+  - Synthetic dye linked to hyperactivity in some children; it adds color and nothing else
+- **Corn Flour**: Concerning
+  - Refined grain with most of its fiber removed
+
+**Example B: "Honey Oat Rounds"**
+Ingredients: Whole Grain Oats, Whole Grain Wheat, Honey, Canola Oil, Salt, Natural Flavor, Vitamin E
+
+## VERDICT: MODERATE ⚠️
+
+**Quick Summary:** Honey Oat Rounds is built on whole grains and has nothing artificial, but honey is an added sugar. It is fine occasionally, not as an everyday breakfast.
+
+Reasoning: No red flags. Honey is an added sugar, but it is the 3rd ingredient and the only sugar in the first five, so the verdict is MODERATE rather than BAD.
+
+**Example C: "Plain Puffed Millet"**
+Ingredients: Organic Whole Grain Millet
+
+## VERDICT: GOOD ✅
+
+**Quick Summary:** Plain Puffed Millet is a single whole grain with no added sugar or additives. It is a great everyday choice for kids.
+
+Reasoning: No red flags, no added sugars and no processed ingredients, so the verdict is GOOD.
+
+**Common mistakes to avoid:**
+- Natural flavors or caramel color alone do not make a product BAD; they point to MODERATE.
+- Vitamin E (mixed tocopherols) added to preserve freshness is a safe preservative, unlike BHT, BHA or TBHQ.
+- Dried fruit such as raisins or bananas is not an added sugar.
+- Red flags count anywhere on the label, including inside parentheses, but sugar position is judged by the top-level ingredient order.
+- Numbered dyes appear in many spellings ("Red 40", "Red No. 40", "FD&C Red #40", "Red 40 Lake"); all are artificial colors.
+
 Be honest, clear, and evidence-based. Use BAD ❌ for truly harmful products with red flag ingredients. Use MODERATE ⚠️ for processed foods with added sugars but no dangerous ingredients. Reserve GOOD ✅ for genuinely healthy products.
 
 Remember: Start with the clear VERDICT (GOOD ✅, MODERATE ⚠️, or BAD ❌) and quick summary at the top!
+"""),
+            ("human", """
+Relevant Guidelines and Information:
+{context}
+
+Cereal Product: {cereal_name}
+Ingredients List: {ingredients}
+
+Breakdown Instructions: {breakdown_instructions}
+
+Question: {question}
+""")
+        ])
+        
+        # Quick mode shares the system prefix but asks only for the verdict,
+        # summary and flagged ingredients
+        self.quick_prompt = ChatPromptTemplate.from_messages([
+            self.analysis_prompt.messages[0],
+            ("system", """
+QUICK MODE: Apply the verdict classification rules, but do NOT write the Detailed Analysis. Respond with exactly this and nothing else:
+
+## VERDICT: [GOOD ✅ or MODERATE ⚠️ or BAD ❌]
+
+**Quick Summary:** [1-2 sentences explaining the verdict]
+
+**Flagged Ingredients:**
+- **Ingredient Name**: [red flag or added sugar, and why it matters for children]
+(Write "- None" if nothing is flagged.)
+"""),
+            ("human", """
+Relevant Guidelines and Information:
+{context}
+
+Cereal Product: {cereal_name}
+Ingredients List: {ingredients}
+""")
+        ])
+        # Structured mode asks for the full analysis as an AnalysisReport
+        self.structured_prompt = ChatPromptTemplate.from_messages([
+            self.analysis_prompt.messages[0],
+            ("system", "Return the analysis as structured data. Section texts are markdown without their headings; "
+                       f"the verdict and summary fields replace the VERDICT heading. Schema version {REPORT_SCHEMA_VERSION}."),
+            self.analysis_prompt.messages[1]
+        ])
+        # Parallel mode asks for the verdict and summary first, then for each
+        # detailed section separately given that verdict
+        self.verdict_prompt = ChatPromptTemplate.from_messages([
+            self.analysis_prompt.messages[0],
+            ("system", """
+VERDICT ONLY: Apply the verdict classification rules. Respond with exactly this and nothing else:
+
+## VERDICT: [GOOD ✅ or MODERATE ⚠️ or BAD ❌]
+
+**Quick Summary:** [1-2 sentences explaining the verdict]
+"""),
+            ("human", """
+Relevant Guidelines and Information:
+{context}
+
+Cereal Product: {cereal_name}
+Ingredients List: {ingredients}
+""")
+        ])
+        self.section_prompt = ChatPromptTemplate.from_messages([
+            self.analysis_prompt.messages[0],
+            ("system", """
+SINGLE SECTION: The verdict has already been given. Write ONLY the requested section of the Detailed Analysis, consistent with that verdict. Start with the section's heading exactly as given and write nothing after the section. Breakdown instructions apply to section 4 only.
+"""),
+            ("human", """
+Relevant Guidelines and Information:
+{context}
+
+Cereal Product: {cereal_name}
+Ingredients List: {ingredients}
+
+Verdict:
+{verdict}
+
+Section to write:
+{section}
+
+Breakdown Instructions: {breakdown_instructions}
 """)
+        ])
+        # Clear-cut products (see route_analysis) get the same report, kept short
+        self.fast_prompt = ChatPromptTemplate.from_messages([
+            self.analysis_prompt.messages[0],
+            ("system", "This product is clear-cut. Keep the report concise: at most three short bullet points "
+                       "per Detailed Analysis section, and one line per ingredient in the breakdown."),
+            self.analysis_prompt.messages[1]
+        ])
+        self.prompts = {"full": self.analysis_prompt, "quick": self.quick_prompt, "structured": self.structured_prompt}
+        self.llms = {
+            "full": self.llm,
+            "quick": self.llm.bind(max_tokens=QUICK_ANALYSIS_MAX_TOKENS),
+            # The verdict call of parallel mode; its sections use self.llm
+            "parallel": self.llm.bind(max_tokens=QUICK_ANALYSIS_MAX_TOKENS),
+            # include_raw keeps the AIMessage so token usage can still be recorded
+            "structured": self.llm.with_structured_output(AnalysisReport, include_raw=True)
+        }
+        self.fast_llm = clients.chat_model(ROUTER_FAST_MODEL, temperature=0.3, api_key=openai_api_key).bind(
+            max_tokens=ROUTER_FAST_MAX_TOKENS
+        )
         
         # Build the LangGraph workflow
         self.graph = self._build_graph()
+        
+        # Tagged on every analysis call so token usage can be compared per prompt
+        self.prompt_versions = {
+            mode: make_version(*(m.prompt.template for m in prompt.messages))
+            for mode, prompt in self.prompts.items()
+        }
+        self.prompt_versions["parallel"] = make_version(
+            *(m.prompt.template for prompt in (self.verdict_prompt, self.section_prompt) for m in prompt.messages)
+        )
+        self.fast_prompt_version = make_version(*(m.prompt.template for m in self.fast_prompt.messages))
+        # Routed full analyses are cached under a version covering the fast route
+        self.router_version = (
+            make_version(
+                self.fast_prompt_version, ROUTER_FAST_MODEL, str(ROUTER_FAST_MAX_TOKENS), ROUTING_POLICY_VERSION
+            )
+            if model_routing else ""
+        )
+        
+        # Anything that changes the generated analysis must change this version
+        self.cache_versions = {
+            mode: make_version(
+                prompt_version,
+                CHAT_MODEL,
+                EMBEDDING_MODEL,
+                self.retrieval_strategy,
+                str(retrieval_k),
+                self.corpus_version,
+                self.fragment_store.version if self.fragment_store and mode != "quick" else "",
+                self.router_version if mode == "full" else ""
+            )
+            for mode, prompt_version in self.prompt_versions.items()
+        }
+        if self.cache is not None:
+            purged = self.cache.purge_stale_versions(*self.cache_versions.values())
+            if purged:
+                print(f"🧹 Purged {purged} cached analyses from older prompt/model/corpus versions")
     
     def _retrieve(self, state: IngredientAnalysisState) -> dict:
         """
@@ -158,32 +528,267 @@ Remember: Start with the clear VERDICT (GOOD ✅, MODERATE ⚠️, or BAD ❌) a
         retrieved_docs = self.retriever.invoke(state["question"])
         return {"context": retrieved_docs}
     
-    def _generate_analysis(self, state: IngredientAnalysisState) -> dict:
+    async def _aretrieve(self, state: IngredientAnalysisState) -> dict:
+        """Async variant of _retrieve, used when the graph runs via ainvoke/astream."""
+        retrieved_docs = await self.retriever.ainvoke(state["question"])
+        return {"context": retrieved_docs}
+    
+    def _prepare_analysis(self, state: IngredientAnalysisState) -> Tuple[list, list]:
         """
-        Generate ingredient analysis using LLM.
+        Format the analysis prompt for the current state.
         
         Args:
             state: Current workflow state
             
         Returns:
-            Updated state with analysis
+            (messages, covered) where covered are the fragment-backed ingredients
+            to stitch into the generated analysis (always empty in quick mode)
         """
-        # Format context from retrieved documents
-        context_text = "\n\n".join([
-            f"Source {i+1}:\n{doc.page_content}"
-            for i, doc in enumerate(state["context"])
-        ])
+        context_text = self._format_context(state)
+        
+        if state["mode"] == "quick":
+            messages = self.quick_prompt.format_messages(
+                cereal_name=state["cereal_name"],
+                ingredients=state["ingredients"],
+                context=context_text
+            )
+            return messages, []
         
-        # Generate analysis
-        messages = self.analysis_prompt.format_messages(
+        breakdown_instructions, covered = self._breakdown(state)
+        prompt = self.fast_prompt if state["route"] == "fast" else self.prompts[state["mode"]]
+        messages = prompt.format_messages(
             cereal_name=state["cereal_name"],
             ingredients=state["ingredients"],
             question=state["question"],
-            context=context_text
+            context=context_text,
+            breakdown_instructions=breakdown_instructions
         )
+        return messages, covered
+    
+    @staticmethod
+    def _format_context(state: IngredientAnalysisState) -> str:
+        """Format the retrieved documents for the prompt."""
+        return "\n\n".join([
+            f"Source {i+1}:\n{doc.page_content}"
+            for i, doc in enumerate(state["context"])
+        ])
+    
+    def _breakdown(self, state: IngredientAnalysisState) -> Tuple[str, list]:
+        """
+        Section 4 instructions and the fragment-backed ingredients.
+        
+        Stored fragments cover known ingredients; the LLM only writes the rest.
         
-        response = self.llm.invoke(messages)
-        return {"analysis": response.content}
+        Returns:
+            (breakdown instructions, covered ingredients)
+        """
+        if self.fragment_store is None:
+            return FULL_BREAKDOWN_INSTRUCTIONS, []
+        covered, uncovered = self.fragment_store.split(parse_ingredients(state["ingredients"]))
+        return self._partial_breakdown_instructions(uncovered), covered
+    
+    def _prepare_fan_out(self, state: IngredientAnalysisState) -> Tuple[list, dict, list]:
+        """
+        Format the verdict prompt of a parallel analysis.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            (verdict messages, section prompt inputs, covered ingredients);
+            section prompts are formatted once the verdict is known
+        """
+        breakdown_instructions, covered = self._breakdown(state)
+        inputs = {
+            "cereal_name": state["cereal_name"],
+            "ingredients": state["ingredients"],
+            "context": self._format_context(state),
+            "breakdown_instructions": breakdown_instructions
+        }
+        messages = self.verdict_prompt.format_messages(
+            cereal_name=inputs["cereal_name"],
+            ingredients=inputs["ingredients"],
+            context=inputs["context"]
+        )
+        return messages, inputs, covered
+    
+    def _section_messages(self, inputs: dict, verdict: str) -> List[list]:
+        """Format one prompt per detailed section, given the generated verdict and summary."""
+        return [
+            self.section_prompt.format_messages(verdict=verdict.strip(), section=section, **inputs)
+            for section in DETAILED_SECTIONS
+        ]
+    
+    def _section_config(self) -> dict:
+        """
+        Run config of the section calls.
+        
+        They are kept out of the token stream ("nostream"), since concurrent
+        sections would interleave; the stitched analysis arrives with 'done'.
+        """
+        config = self._llm_config("parallel")
+        return {**config, "tags": [*config["tags"], "nostream", "analysis_section"]}
+    
+    def _generate_analysis(self, state: IngredientAnalysisState) -> dict:
+        """
+        Generate ingredient analysis using LLM.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated state with analysis
+        """
+        mode, route = state["mode"], state["route"]
+        with metrics.timer('analysis_generate_seconds', mode=mode):
+            if mode == "parallel":
+                return self._generate_fan_out(state)
+            with metrics.timer('pipeline_prepare_seconds'):
+                messages, covered = self._prepare_analysis(state)
+            started = time.perf_counter()
+            response = self._route_llm(mode, route).invoke(messages, config=self._llm_config(mode, route))
+            return self._finish_analysis(mode, response, covered, route, time.perf_counter() - started)
+    
+    async def _agenerate_analysis(self, state: IngredientAnalysisState) -> dict:
+        """Async variant of _generate_analysis."""
+        mode, route = state["mode"], state["route"]
+        with metrics.timer('analysis_generate_seconds', mode=mode):
+            if mode == "parallel":
+                return await self._agenerate_fan_out(state)
+            with metrics.timer('pipeline_prepare_seconds'):
+                messages, covered = self._prepare_analysis(state)
+            started = time.perf_counter()
+            response = await self._route_llm(mode, route).ainvoke(messages, config=self._llm_config(mode, route))
+            return self._finish_analysis(mode, response, covered, route, time.perf_counter() - started)
+    
+    def _generate_fan_out(self, state: IngredientAnalysisState) -> dict:
+        """
+        Generate a full analysis as a verdict call followed by concurrent section calls.
+        
+        All calls share the retrieved context and the system prompt prefix.
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Updated state with the stitched analysis
+        """
+        with metrics.timer('pipeline_prepare_seconds'):
+            messages, inputs, covered = self._prepare_fan_out(state)
+        verdict = self.llms["parallel"].invoke(messages, config=self._llm_config("parallel"))
+        sections = self.llm.batch(self._section_messages(inputs, verdict.content), config=self._section_config())
+        return self._finish_fan_out(verdict, sections, covered)
+    
+    async def _agenerate_fan_out(self, state: IngredientAnalysisState) -> dict:
+        """Async variant of _generate_fan_out."""
+        with metrics.timer('pipeline_prepare_seconds'):
+            messages, inputs, covered = self._prepare_fan_out(state)
+        verdict = await self.llms["parallel"].ainvoke(messages, config=self._llm_config("parallel"))
+        sections = await self.llm.abatch(self._section_messages(inputs, verdict.content), config=self._section_config())
+        return self._finish_fan_out(verdict, sections, covered)
+    
+    def _finish_fan_out(self, verdict, sections: list, covered: list) -> dict:
+        """
+        Stitch the verdict and section responses into the analysis state update.
+        
+        Args:
+            verdict: AIMessage with the verdict and quick summary
+            sections: AIMessages in DETAILED_SECTIONS order
+            covered: Fragment-backed ingredients to add to the breakdown
+            
+        Returns:
+            State update with the analysis markdown
+        """
+        record_token_usage(verdict, 'analysis_parallel', self.prompt_versions["parallel"], CHAT_MODEL)
+        parts = [verdict.content.strip(), "---", "## Detailed Analysis"]
+        for heading, response in zip(DETAILED_SECTIONS, sections):
+            record_token_usage(response, 'analysis_parallel', self.prompt_versions["parallel"], CHAT_MODEL)
+            content = response.content.strip()
+            parts.append(content if content.startswith("###") else f"{heading}\n{content}")
+        return {"analysis": FragmentStore.assemble("\n\n".join(parts), covered)}
+    
+    def _finish_analysis(self, mode: str, response, covered: list, route: str = "", elapsed: float = 0.0) -> dict:
+        """
+        Turn an LLM response into the analysis state update.
+        
+        Args:
+            mode: Analysis mode
+            response: AIMessage, or {"raw", "parsed", "parsing_error"} in structured mode
+            covered: Fragment-backed ingredients to add to the breakdown
+            route: Route the analysis took ('' if it wasn't routed)
+            elapsed: Seconds the LLM call took
+            
+        Returns:
+            State update with the analysis markdown (and report in structured mode)
+        """
+        if mode != "structured":
+            if route == "fast":
+                cost = record_token_usage(response, 'analysis_full_fast', self.fast_prompt_version, ROUTER_FAST_MODEL)
+            else:
+                cost = record_token_usage(response, f'analysis_{mode}', self.prompt_versions[mode], CHAT_MODEL)
+            if route:
+                metrics.observe('analysis_route_seconds', elapsed, route=route)
+                metrics.inc('analysis_route_cost_usd_total', cost, route=route)
+                if response.response_metadata.get('finish_reason') == 'length':
+                    metrics.inc('analysis_route_truncated_total', route=route)
+                    print(f"⚠️ {route} route report hit its output cap")
+            return {"analysis": FragmentStore.assemble(response.content, covered)}
+        
+        record_token_usage(response["raw"], f'analysis_{mode}', self.prompt_versions[mode], CHAT_MODEL)
+        if response.get("parsing_error") is not None:
+            raise ValueError(f"Structured analysis could not be parsed: {response['parsing_error']}")
+        
+        report = FragmentStore.merge_report(response["parsed"], covered)
+        return {"analysis": render_markdown(report), "report": report}
+    
+    def _llm_config(self, mode: str, route: str = "") -> dict:
+        """Run config tagging an analysis LLM call with its mode, route and prompt version."""
+        prompt_version = self.fast_prompt_version if route == "fast" else self.prompt_versions[mode]
+        config = {
+            "tags": [f"prompt_version:{prompt_version}", f"analysis_mode:{mode}"],
+            "metadata": {"prompt_version": prompt_version, "analysis_mode": mode}
+        }
+        if route:
+            config["tags"].append(f"analysis_route:{route}")
+            config["metadata"]["analysis_route"] = route
+        return config
+    
+    def _route_llm(self, mode: str, route: str):
+        """LLM for an analysis call: the capped fast model on the fast route."""
+        return self.fast_llm if route == "fast" else self.llms[mode]
+    
+    def _route(self, mode: str, ingredients: str) -> str:
+        """
+        Route a full analysis and record the decision.
+        
+        Returns:
+            'fast' or 'full', or '' for modes (and configurations) that aren't routed
+        """
+        if mode != "full" or not self.model_routing:
+            return ""
+        route, rule_verdict = route_analysis(ingredients)
+        metrics.inc('analysis_routes_total', route=route, rule_verdict=rule_verdict)
+        print(f"🔀 Rule engine says {rule_verdict}: {route} route")
+        return route
+    
+    @staticmethod
+    def _partial_breakdown_instructions(uncovered: List) -> str:
+        """
+        Section 4 instructions when stored fragments cover some ingredients.
+        
+        Args:
+            uncovered: Parsed ingredients without a stored fragment
+            
+        Returns:
+            Instructions naming only the ingredients the LLM must explain
+        """
+        if not uncovered:
+            return ("Vetted explanations for every ingredient are added automatically. "
+                    "Leave this section empty (write only the heading).")
+        
+        names = ", ".join(display_name(ingredient['name']) for ingredient in uncovered)
+        return ("Vetted explanations for the other ingredients are added automatically. "
+                f"ONLY cover these ingredients: {names}. For each one:")
     
     def _build_graph(self) -> StateGraph:
         """
@@ -195,33 +800,34 @@ Remember: Start with the clear VERDICT (GOOD ✅, MODERATE ⚠️, or BAD ❌) a
         # Create graph
         graph_builder = StateGraph(IngredientAnalysisState)
         
-        # Add nodes
-        graph_builder.add_node("retrieve", self._retrieve)
-        graph_builder.add_node("analyze", self._generate_analysis)
+        # Add nodes (sync for invoke/stream, async for ainvoke/astream)
+        graph_builder.add_node("retrieve", RunnableLambda(self._retrieve, afunc=self._aretrieve))
+        graph_builder.add_node("analyze", RunnableLambda(self._generate_analysis, afunc=self._agenerate_analysis))
         
         # Add edges
         graph_builder.add_edge(START, "retrieve")
         graph_builder.add_edge("retrieve", "analyze")
         
-        # Compile and return
-        return graph_builder.compile()
+        # Compile and return; stage timings are recorded via callbacks so they
+        # don't depend on LangSmith tracing being enabled
+        return graph_builder.compile().with_config(callbacks=[pipeline_instrumentation])
     
-    def analyze_ingredients(self, cereal_name: str, ingredients: str) -> str:
+    def _initial_state(self, cereal_name: str, ingredients: str, mode: str) -> IngredientAnalysisState:
         """
-        Analyze ingredients for a cereal product.
+        Build the initial workflow state for an analysis.
         
         Args:
             cereal_name: Name of the cereal product
             ingredients: Comma-separated list of ingredients
+            mode: Analysis mode
             
         Returns:
-            Detailed ingredient analysis
+            Initial graph state
         """
-        print(f"Using retrieval strategy: {self.retrieval_strategy}")
-        
-        # Create the question for retrieval
+        # Create the question for retrieval (canonical names, so label typos
+        # don't change what gets retrieved)
         question = f"""
-        Analyze these food ingredients for a children's cereal product: {ingredients}
+        Analyze these food ingredients for a children's cereal product: {canonical_ingredient_key(ingredients)}
         
         Consider:
         - Are these ingredients safe for children?
@@ -231,17 +837,264 @@ Remember: Start with the clear VERDICT (GOOD ✅, MODERATE ⚠️, or BAD ❌) a
         - What are the nutritional benefits or concerns?
         """
         
-        # Initial state
-        initial_state = {
+        return {
             "cereal_name": cereal_name,
             "ingredients": ingredients,
             "question": question,
             "context": [],
-            "analysis": ""
+            "analysis": "",
+            "mode": mode,
+            "route": self._route(mode, ingredients),
+            "report": None
         }
+    
+    @staticmethod
+    def _check_mode(mode: str):
+        """Reject unknown analysis modes."""
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode '{mode}'. Use one of: {', '.join(ANALYSIS_MODES)}")
+    
+    def _cached_result(self, cereal_name: str, ingredients: str, mode: str) -> Optional[dict]:
+        """
+        Return a cached analysis, if caching is enabled and it's a hit.
+        
+        Structured mode caches the compact report as JSON and renders the
+        markdown on the way out. On an exact miss, the analysis of a nearly
+        identical ingredient list is reused (see near_duplicates).
+        
+        Returns:
+            {"analysis": markdown, "report": report or None}, or None on a miss
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get(cereal_name, ingredients, self.cache_versions[mode])
+        if cached is None:
+            cached = self._near_duplicate(cereal_name, ingredients, mode)
+            if cached is None:
+                return None
+        else:
+            print(f"⚡ Cache hit for: {cereal_name} ({mode})")
+        
+        if mode == "structured":
+            report = json.loads(cached)
+            return {"analysis": render_markdown(report), "report": report}
+        return {"analysis": cached, "report": None}
+    
+    def _near_duplicate(self, cereal_name: str, ingredients: str, mode: str) -> Optional[str]:
+        """
+        Reuse the cached analysis of a nearly identical ingredient list.
+        
+        The reused analysis is rewritten for the new product name and cached
+        under it, but not indexed itself, so reuse never chains.
+        
+        Returns:
+            Cached value (markdown, or report JSON in structured mode), or None
+        """
+        if self.near_duplicates is None:
+            return None
+        version = self.cache_versions[mode]
+        match = self.near_duplicates.find(ingredients, version)
+        if match is None:
+            return None
+        
+        print(f"♻️  Reusing analysis of {match['cereal_name']} for {cereal_name} "
+              f"({mode}, similarity {match['similarity']:.2f})")
+        value = rename_product(match['analysis'], match['cereal_name'], cereal_name, escape_json=mode == "structured")
+        self.cache.put(cereal_name, ingredients, version, value)
+        return value
+    
+    def _store_result(self, cereal_name: str, ingredients: str, mode: str, result: dict):
+        """Store a freshly generated analysis (and index it for near-duplicates), if caching is enabled."""
+        if self.cache is None:
+            return
+        value = json.dumps(result["report"]) if mode == "structured" else result["analysis"]
+        index = {}
+        if self.near_duplicates is not None:
+            fingerprint = self.near_duplicates.fingerprint(ingredients)
+            index = {"bands": fingerprint["bands"], "rule_key": fingerprint["rule_key"]}
+        self.cache.put(cereal_name, ingredients, self.cache_versions[mode], value, **index)
+    
+    @staticmethod
+    def _cached_events(result: dict) -> List[dict]:
+        """Stream events that replay a cached analysis."""
+        analysis = result["analysis"]
+        verdict = extract_verdict(analysis)
+        events = [{"type": "verdict", "verdict": verdict}] if verdict else []
+        done = {"type": "done", "verdict": verdict, "analysis": analysis, "cached": True}
+        if result["report"] is not None:
+            done["report"] = result["report"]
+        events.append(done)
+        return events
+    
+    def _flight_key(self, cereal_name: str, ingredients: str, mode: str) -> tuple:
+        """Identity of an analysis request for coalescing concurrent duplicates."""
+        return (canonical_text(cereal_name), canonical_ingredient_key(ingredients), self.retrieval_strategy, mode)
+    
+    def analyze_ingredients(self, cereal_name: str, ingredients: str, mode: str = DEFAULT_ANALYSIS_MODE) -> str:
+        """
+        Analyze ingredients for a cereal product.
+        
+        Concurrent requests for the same canonical product, ingredients,
+        retrieval strategy and mode share a single retrieval and generation.
+        
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Comma-separated list of ingredients
+            mode: "quick" for only the verdict, summary and flagged
+                ingredients, "full" for the complete report, "structured"
+                for the complete report rendered from an AnalysisReport,
+                "parallel" for the complete report with its sections
+                generated concurrently
+            
+        Returns:
+            Ingredient analysis markdown
+        """
+        return self._analyze(cereal_name, ingredients, mode)["analysis"]
+    
+    def analyze_report(self, cereal_name: str, ingredients: str) -> AnalysisReport:
+        """
+        Analyze ingredients and return the structured report.
+        
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Comma-separated list of ingredients
+            
+        Returns:
+            AnalysisReport (verdict, summary, red flags, sugar positions, sections)
+        """
+        return self._analyze(cereal_name, ingredients, "structured")["report"]
+    
+    def _analyze(self, cereal_name: str, ingredients: str, mode: str) -> dict:
+        """Serve an analysis from the cache or a (coalesced) graph run."""
+        self._check_mode(mode)
+        cached = self._cached_result(cereal_name, ingredients, mode)
+        if cached is not None:
+            return cached
+        
+        return self.single_flight.do(
+            self._flight_key(cereal_name, ingredients, mode),
+            self._run_analysis,
+            cereal_name,
+            ingredients,
+            mode
+        )
+    
+    def _run_analysis(self, cereal_name: str, ingredients: str, mode: str) -> dict:
+        """Run the graph for one analysis and cache the result."""
+        print(f"Using retrieval strategy: {self.retrieval_strategy} ({mode} analysis)")
         
         # Run the graph
-        result = self.graph.invoke(initial_state)
+        state = self.graph.invoke(self._initial_state(cereal_name, ingredients, mode))
         
-        return result["analysis"]
-
+        result = {"analysis": state["analysis"], "report": state.get("report")}
+        self._store_result(cereal_name, ingredients, mode, result)
+        return result
+    
+    async def aanalyze_ingredients(self, cereal_name: str, ingredients: str, mode: str = DEFAULT_ANALYSIS_MODE) -> str:
+        """
+        Async variant of analyze_ingredients using async retrievers and LLM calls.
+        
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Comma-separated list of ingredients
+            mode: "quick", "full", "structured" or "parallel"
+            
+        Returns:
+            Ingredient analysis markdown
+        """
+        return (await self._aanalyze(cereal_name, ingredients, mode))["analysis"]
+    
+    async def aanalyze_report(self, cereal_name: str, ingredients: str) -> AnalysisReport:
+        """Async variant of analyze_report."""
+        return (await self._aanalyze(cereal_name, ingredients, "structured"))["report"]
+    
+    async def _aanalyze(self, cereal_name: str, ingredients: str, mode: str) -> dict:
+        """Async variant of _analyze."""
+        self._check_mode(mode)
+        cached = self._cached_result(cereal_name, ingredients, mode)
+        if cached is not None:
+            return cached
+        
+        return await self.single_flight.ado(
+            self._flight_key(cereal_name, ingredients, mode),
+            self._arun_analysis,
+            cereal_name,
+            ingredients,
+            mode
+        )
+    
+    async def _arun_analysis(self, cereal_name: str, ingredients: str, mode: str) -> dict:
+        """Async variant of _run_analysis."""
+        state = await self.graph.ainvoke(self._initial_state(cereal_name, ingredients, mode))
+        
+        result = {"analysis": state["analysis"], "report": state.get("report")}
+        self._store_result(cereal_name, ingredients, mode, result)
+        return result
+    
+    def stream_analysis(self, cereal_name: str, ingredients: str, mode: str = DEFAULT_ANALYSIS_MODE) -> Iterator[dict]:
+        """
+        Stream an analysis as it is generated.
+        
+        LLM tokens from the analyze node are forwarded as they arrive, and a
+        separate verdict event is emitted as soon as the verdict line has
+        been generated. Stored ingredient fragments are only part of the
+        final analysis in the 'done' event. Structured mode produces no
+        token events; its report arrives with the 'done' event.
+        
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Comma-separated list of ingredients
+            mode: "quick", "full", "structured" or "parallel"
+            
+        Yields:
+            Event dicts of type 'token', 'verdict' and finally 'done'
+        """
+        self._check_mode(mode)
+        cached = self._cached_result(cereal_name, ingredients, mode)
+        if cached is not None:
+            yield from self._cached_events(cached)
+            return
+        
+        print(f"Streaming analysis with retrieval strategy: {self.retrieval_strategy}")
+        
+        collector = _AnalysisStream()
+        stream = self.graph.stream(
+            self._initial_state(cereal_name, ingredients, mode),
+            stream_mode=["messages", "values"]
+        )
+        for stream_mode, payload in stream:
+            yield from collector.feed(stream_mode, payload)
+        
+        self._store_result(cereal_name, ingredients, mode, collector.result())
+        yield collector.done_event()
+    
+    async def astream_analysis(self, cereal_name: str, ingredients: str, mode: str = DEFAULT_ANALYSIS_MODE) -> AsyncIterator[dict]:
+        """
+        Async variant of stream_analysis.
+        
+        Args:
+            cereal_name: Name of the cereal product
+            ingredients: Comma-separated list of ingredients
+            mode: "quick", "full", "structured" or "parallel"
+            
+        Yields:
+            Event dicts of type 'token', 'verdict' and finally 'done'
+        """
+        self._check_mode(mode)
+        cached = self._cached_result(cereal_name, ingredients, mode)
+        if cached is not None:
+            for event in self._cached_events(cached):
+                yield event
+            return
+        
+        collector = _AnalysisStream()
+        stream = self.graph.astream(
+            self._initial_state(cereal_name, ingredients, mode),
+            stream_mode=["messages", "values"]
+        )
+        async for stream_mode, payload in stream:
+            for event in collector.feed(stream_mode, payload):
+                yield event
+        
+        self._store_result(cereal_name, ingredients, mode, collector.result())
+        yield collector.done_event()
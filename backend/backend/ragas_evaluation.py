@@ -163,10 +163,12 @@ def run_ragas_evaluation(retrieval_strategy: str = "ensemble"):
         use_compression = bool(cohere_key)
         retriever = advanced_retrieval_manager.get_ensemble_retriever(k=5, use_compression=use_compression)
     
+    # Unrouted, so every full report comes from CHAT_MODEL
     ingredient_analyzer = IngredientAnalyzer(
         retriever, 
         openai_key,
-        retrieval_strategy=retrieval_strategy
+        retrieval_strategy=retrieval_strategy,
+        model_routing=False
     )
     
     # Create golden test dataset
@@ -194,7 +196,8 @@ def run_ragas_evaluation(retrieval_strategy: str = "ensemble"):
         # Get response
         response = ingredient_analyzer.analyze_ingredients(
             test_case['cereal_name'],
-            test_case['ingredients']
+            test_case['ingredients'],
+            mode="full"
         )
         
         print(f"Analysis generated ({len(response)} characters)")
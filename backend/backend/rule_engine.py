@@ -0,0 +1,187 @@
+"""
+Deterministic verdict rules for ingredient lists.
+
+Implements the BAD / MODERATE / GOOD classification rules from the analysis
+prompt locally, so a verdict and the ingredients that triggered it are
+available in microseconds without an LLM call.
+"""
+
+import re
+from typing import Dict, List, TypedDict
+
+from backend.ingredient_parser import flatten_ingredients, parse_ingredients
+
+
+class RuleTrigger(TypedDict):
+    """An ingredient that triggered a classification rule."""
+    rule: str
+    ingredient: str
+    position: int
+
+
+class RuleVerdict(TypedDict):
+    """Result of classifying an ingredient list."""
+    verdict: str
+    triggers: List[RuleTrigger]
+    ingredients: List[str]
+
+
+# BAD red flags: rule name -> pattern matched against each lowercased ingredient
+RED_FLAG_RULES = {
+    'artificial_color': (
+        r'\b(?:red|yellow|blue|green)\s*(?:(?:no\.?|#)\s*)?(?:3|5|6|40|1|2)\b(?:\s*lake)?'
+        r'|\bfd\s*&\s*c\b|\bartificial colou?rs?\b|\bcolou?r added\b'
+    ),
+    'artificial_flavor': r'\bartificial(?:ly)? flavou?r',
+    'artificial_sweetener': (
+        r'\b(?:aspartame|sucralose|acesulfame(?: potassium| k)?|saccharin|neotame|advantame)\b'
+    ),
+    'harmful_preservative': r'\b(?:bht|bha|tbhq)\b|butylated hydroxy',
+    'hfcs': r'\bhigh[\s-]fructose corn syrup\b|\bhfcs\b',
+    'trans_fat': r'\bpartially hydrogenated\b',
+}
+# All red flags in one pass; the matching named group identifies the rule
+RED_FLAG_PATTERN = re.compile('|'.join(f'(?P<{rule}>{pattern})' for rule, pattern in RED_FLAG_RULES.items()))
+
+# BAD rules about sugar position rather than artificial or harmful ingredients
+SUGAR_RULES = ('sugar_first_or_second', 'multiple_sugars_in_first_five')
+
+# Sodium benzoate is only flagged when vitamin C is also present
+SODIUM_BENZOATE_PATTERN = re.compile(r'\bsodium benzoate\b')
+VITAMIN_C_PATTERN = re.compile(r'\bascorbic acid\b|\bvitamin c\b')
+
+ADDED_SUGAR_PATTERN = re.compile(
+    r'\b(?:sugar|sugars|syrup|honey|molasses|dextrose|sucrose|fructose|glucose|maltose'
+    r'|evaporated cane juice|cane juice|agave|treacle|invert sugar)\b'
+)
+# Ingredients that mention sugar words without being an added sugar, including
+# non-sweetener forms of sugar crops such as sugar cane fiber or beet pulp
+NOT_SUGAR_PATTERN = re.compile(
+    r'\b(?:no|without|free|less)\s+(?:added\s+)?sugar|\bsugar[\s-]free\b'
+    r'|\bfib(?:er|re)s?\b|\bpulp\b'
+)
+
+# MODERATE signals: processed but not artificial or harmful
+PROCESSED_PATTERN = re.compile(r'\bnatural flavou?rs?\b|\bmalt flavou?r\b|\bcaramel colou?r\b')
+
+def classify_ingredients(ingredients: str) -> RuleVerdict:
+    """
+    Classify an ingredient list using the verdict rules.
+
+    Rules are applied in the same order as the analysis prompt: any red flag
+    means BAD, otherwise added sugars or processed ingredients mean MODERATE,
+    otherwise GOOD. Sugar position rules use the top-level order; added sugars
+    and processed ingredients inside sub-ingredient lists count as MODERATE.
+    An empty list can't be judged GOOD and is MODERATE.
+
+    Args:
+        ingredients: Comma-separated ingredient list
+
+    Returns:
+        RuleVerdict with the verdict and the triggering ingredients
+    """
+    parsed = parse_ingredients(ingredients)
+    if not parsed:
+        return {
+            'verdict': 'MODERATE',
+            'triggers': [{'rule': 'no_ingredients', 'ingredient': ingredients.strip(), 'position': 0}],
+            'ingredients': []
+        }
+
+    red_flags: List[RuleTrigger] = []
+    moderate: List[RuleTrigger] = []
+    sugar_positions = []
+    nested_sugars: List[RuleTrigger] = []
+
+    everything = flatten_ingredients(parsed)
+    has_vitamin_c = any(VITAMIN_C_PATTERN.search(ingredient['name']) for ingredient in everything)
+
+    # Red flags count anywhere on the label, including inside sub-ingredient lists
+    for ingredient in everything:
+        item, position = ingredient['name'], ingredient['position']
+        for rule in {match.lastgroup for match in RED_FLAG_PATTERN.finditer(item)}:
+            red_flags.append({'rule': rule, 'ingredient': item, 'position': position})
+
+        if has_vitamin_c and SODIUM_BENZOATE_PATTERN.search(item):
+            red_flags.append({'rule': 'benzoate_with_vitamin_c', 'ingredient': item, 'position': position})
+
+    # Sugar position and processing rules apply to the top-level ingredient order
+    for ingredient in parsed:
+        item, position = ingredient['name'], ingredient['position']
+        if ADDED_SUGAR_PATTERN.search(item) and not NOT_SUGAR_PATTERN.search(item):
+            sugar_positions.append((position, item))
+        elif ingredient['preservative'] or PROCESSED_PATTERN.search(item):
+            moderate.append({'rule': 'processed', 'ingredient': item, 'position': position})
+
+        # Sub-ingredients (e.g. the sugar in chocolate chips) are added at their parent's position
+        for sub_ingredient in flatten_ingredients(ingredient['sub_ingredients']):
+            item = sub_ingredient['name']
+            if ADDED_SUGAR_PATTERN.search(item) and not NOT_SUGAR_PATTERN.search(item):
+                nested_sugars.append({'rule': 'added_sugar', 'ingredient': item, 'position': position})
+            elif sub_ingredient['preservative'] or PROCESSED_PATTERN.search(item):
+                moderate.append({'rule': 'processed', 'ingredient': item, 'position': position})
+
+    # Sugar position rules
+    for position, item in sugar_positions:
+        if position <= 2:
+            red_flags.append({'rule': 'sugar_first_or_second', 'ingredient': item, 'position': position})
+
+    early_sugars = [(p, i) for p, i in sugar_positions if p <= 5]
+    if len(early_sugars) > 1:
+        for position, item in early_sugars:
+            red_flags.append({'rule': 'multiple_sugars_in_first_five', 'ingredient': item, 'position': position})
+
+    if red_flags:
+        verdict = 'BAD'
+        triggers = red_flags
+    elif sugar_positions or nested_sugars or moderate:
+        verdict = 'MODERATE'
+        triggers = [
+            {'rule': 'added_sugar', 'ingredient': item, 'position': position}
+            for position, item in sugar_positions
+        ] + nested_sugars + moderate
+    else:
+        verdict = 'GOOD'
+        triggers = []
+
+    return {
+        'verdict': verdict,
+        'triggers': sorted(triggers, key=lambda t: t['position']),
+        'ingredients': [ingredient['name'] for ingredient in parsed]
+    }
+
+
+def score_catalog(cereals: List[Dict[str, str]]) -> List[Dict]:
+    """
+    Classify every product in a catalog.
+
+    Args:
+        cereals: Dicts with 'brand' and 'ingredients' keys (as from cereal.csv)
+
+    Returns:
+        One dict per product with brand, verdict and triggers
+    """
+    results = []
+    for cereal in cereals:
+        rule_verdict = classify_ingredients(cereal.get('ingredients', ''))
+        results.append({
+            'brand': cereal.get('brand', ''),
+            'verdict': rule_verdict['verdict'],
+            'triggers': rule_verdict['triggers']
+        })
+    return results
+
+
+def has_artificial_red_flags(rule_verdict: RuleVerdict) -> bool:
+    """
+    Whether a verdict is BAD because of artificial or harmful ingredients.
+    
+    Args:
+        rule_verdict: Output of classify_ingredients()
+        
+    Returns:
+        True when a red flag other than sugar position triggered BAD
+    """
+    return rule_verdict['verdict'] == 'BAD' and any(
+        trigger['rule'] not in SUGAR_RULES for trigger in rule_verdict['triggers']
+    )
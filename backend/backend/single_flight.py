@@ -0,0 +1,94 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at the same time, only the first
+one runs the work; the others wait for and share its result (or exception).
+Thread-based callers (Flask) and asyncio callers (ASGI) are coalesced
+separately.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from backend.metrics import metrics
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self, name: str):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Label used for the coalescing metrics
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(*args) unless a call with the same key is already in flight.
+
+        Args:
+            key: Identity of the work
+            fn: Function to run
+            *args: Arguments for fn
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            metrics.inc('singleflight_coalesced_total', operation=self.name)
+            return future.result()
+
+        metrics.inc('singleflight_executions_total', operation=self.name)
+        try:
+            result = fn(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Async variant of do() for coroutine functions.
+
+        The shared work runs in its own task, so a cancelled caller doesn't
+        cancel it for the others that are waiting.
+
+        Args:
+            key: Identity of the work
+            fn: Coroutine function to run
+            *args: Arguments for fn
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            metrics.inc('singleflight_executions_total', operation=self.name)
+            task = self._tasks[key] = asyncio.ensure_future(fn(*args))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            metrics.inc('singleflight_coalesced_total', operation=self.name)
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being computed."""
+        return len(self._calls) + len(self._tasks)
@@ -2,6 +2,7 @@
 Vector store setup and management using Qdrant.
 """
 
+import hashlib
 from typing import Optional
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -18,6 +19,7 @@ from backend.config import (
     DEFAULT_CHUNK_OVERLAP,
     EMBEDDING_MODEL
 )
+from backend.instrumentation import TimedEmbeddings
 
 
 class VectorStoreManager:
@@ -31,10 +33,10 @@ class VectorStoreManager:
             openai_api_key: OpenAI API key for embeddings
         """
         self.openai_api_key = openai_api_key
-        self.embeddings = OpenAIEmbeddings(
+        self.embeddings = TimedEmbeddings(OpenAIEmbeddings(
             model=EMBEDDING_MODEL,
             api_key=openai_api_key
-        )
+        ))
         self.vectorstore: Optional[QdrantVectorStore] = None
         self.client: Optional[QdrantClient] = None
         self.chunks = []  # Store chunks for advanced retrieval
@@ -86,6 +88,22 @@ class VectorStoreManager:
         """
         return self.chunks
     
+    def get_corpus_version(self) -> str:
+        """
+        Get a fingerprint of the indexed corpus.
+        
+        Changes whenever the source documents or chunking settings change,
+        so caches built on top of retrieval can be invalidated.
+        
+        Returns:
+            Hex digest of the chunk contents
+        """
+        digest = hashlib.sha256()
+        for chunk in self.chunks:
+            digest.update(chunk.page_content.encode('utf-8'))
+            digest.update(b"\x1e")
+        return digest.hexdigest()[:16]
+    
     def get_retriever(self, k: int = 5):
         """
         Get a retriever from the vector store.
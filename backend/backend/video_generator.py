@@ -4,10 +4,15 @@ Video generation using D-ID API for realistic animated character explanations.
 
 import os
 import re
-import time
 import requests
 from typing import Dict, Optional
 
+from backend.clients import clients
+from backend.config import DID_API_URL
+from backend.did_poller import TalkFailed, talk_poller, webhook_url
+from backend.media_cache import media_cache, media_key
+from backend.rule_engine import has_artificial_red_flags
+
 
 class VideoGenerator:
     """Generate animated character videos using D-ID API."""
@@ -27,33 +32,67 @@ class VideoGenerator:
         # 1. Emma - friendly woman with warm voice
         # 2. Upload your own human character image
         self.character_image_url = "https://create-images-results.d-id.com/DefaultPresenters/Emma_f/image.jpeg"
+        self.voice_id = "en-US-JennyNeural"
+        
+        # Shared keep-alive session, so repeated D-ID calls reuse connections
+        self.session = clients.http_session()
         
-    def create_short_script(self, analysis: str, product_name: str) -> str:
+    def create_short_script(
+        self,
+        analysis: str,
+        product_name: str,
+        report: Optional[dict] = None,
+        rule_verdict: Optional[dict] = None
+    ) -> str:
         """
         Create a SHORT script (verdict + 1 sentence).
         
+        The verdict comes from the analysis. Whether a BAD product has
+        artificial red flags comes from the rule engine when rule_verdict is
+        given, exactly as for speculative videos, so both derive the same
+        script; the markdown has no reliable marker for it.
+        
         Args:
             analysis: Full analysis text
             product_name: Name of the product
+            report: Structured analysis (AnalysisReport); read directly instead
+                of scanning the markdown when given
+            rule_verdict: classify_ingredients() result for the product
             
         Returns:
             Short script for video
         """
-        # Extract verdict
-        verdict_match = re.search(r'VERDICT:\s*\[?(GOOD|MODERATE|BAD)[^\]]*\]?', analysis, re.IGNORECASE)
-        verdict = verdict_match.group(1).upper() if verdict_match else 'MODERATE'
+        if report is not None:
+            verdict = report['verdict']
+        else:
+            # Extract verdict
+            verdict_match = re.search(r'VERDICT:\s*\[?(GOOD|MODERATE|BAD)[^\]]*\]?', analysis, re.IGNORECASE)
+            verdict = verdict_match.group(1).upper() if verdict_match else 'MODERATE'
+        
+        if rule_verdict is not None:
+            has_red_flags = has_artificial_red_flags(rule_verdict)
+        else:
+            has_red_flags = bool(report and report['red_flags'])
         
-        # Extract the most important concern or benefit (first line of detailed analysis)
-        # Look for red flags or key points
-        red_flag_match = re.search(r'\*\*Red Flag Ingredients:\*\*\s*([^\n]+)', analysis)
-        sugar_match = re.search(r'sugar.*?(\d+)g', analysis.lower())
+        return self.verdict_script(verdict, product_name, has_red_flags)
+    
+    def verdict_script(self, verdict: str, product_name: str, has_red_flags: bool) -> str:
+        """
+        Build the short script for a verdict.
         
+        Args:
+            verdict: 'GOOD', 'MODERATE' or 'BAD'
+            product_name: Name of the product
+            has_red_flags: Whether the product has red flag ingredients (BAD only)
+            
+        Returns:
+            Short script for video
+        """
         # Create SHORT scripts based on verdict
         if verdict == 'GOOD':
             script = f"{product_name} is a GOOD choice! It has healthy, natural ingredients that are great for kids."
         elif verdict == 'BAD':
-            if red_flag_match:
-                reason = red_flag_match.group(1).strip()[:100]  # First 100 chars
+            if has_red_flags:
                 script = f"{product_name} is BAD for kids. It contains artificial ingredients and chemicals you should avoid."
             else:
                 script = f"{product_name} is BAD for kids. It has too much added sugar and unhealthy ingredients."
@@ -62,6 +101,22 @@ class VideoGenerator:
         
         return script
     
+    def cache_key(self, script: str) -> str:
+        """Media cache key of the video for a script with this presenter and voice."""
+        return media_key('video', script, f"microsoft:{self.voice_id}", self.character_image_url)
+    
+    def cached_video(self, script: str) -> Optional[str]:
+        """
+        Look up a previously rendered video for a script.
+        
+        Args:
+            script: Short script text
+            
+        Returns:
+            Video URL, or None if there is no unexpired one
+        """
+        return media_cache.get_url(self.cache_key(script))
+    
     def generate_video(self, script: str) -> Optional[str]:
         """
         Generate video using D-ID API.
@@ -77,10 +132,16 @@ class VideoGenerator:
             print("   Set DID_API_KEY in .env file to enable video generation")
             return None
         
+        # The same script, voice and presenter always render the same video
+        cached_url = self.cached_video(script)
+        if cached_url:
+            print(f"🎬 Reusing cached video: {cached_url}")
+            return cached_url
+        
         print("🎬 Creating animated video with D-ID...")
         print(f"   Script: {script}")
         
-        url = "https://api.d-id.com/talks"
+        url = f"{DID_API_URL}/talks"
         
         # FIXED: D-ID uses the API key directly in Authorization header
         headers = {
@@ -96,7 +157,7 @@ class VideoGenerator:
                 "input": script,
                 "provider": {
                     "type": "microsoft",
-                    "voice_id": "en-US-JennyNeural"
+                    "voice_id": self.voice_id
                 }
             },
             "config": {
@@ -105,10 +166,15 @@ class VideoGenerator:
             }
         }
         
+        # Let D-ID report the finished talk instead of waiting for a poll
+        callback_url = webhook_url()
+        if callback_url:
+            payload["webhook"] = callback_url
+        
         try:
             # Create video
             print("   📤 Sending request to D-ID...")
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload, headers=headers, timeout=30)
             
             # Debug response
             print(f"   Response status: {response.status_code}")
@@ -131,35 +197,18 @@ class VideoGenerator:
             print(f"   ✅ Video ID: {talk_id}")
             print("   ⏳ Processing video (15-30 seconds)...")
             
-            # Poll for video status
-            status_url = f"{url}/{talk_id}"
-            max_polls = 60  # 60 seconds max
-            
-            for i in range(max_polls):
-                time.sleep(1)
-                
-                status_response = requests.get(status_url, headers=headers)
-                status_response.raise_for_status()
-                status_data = status_response.json()
-                
-                status = status_data.get('status')
-                
-                if status == 'done':
-                    video_url = status_data.get('result_url')
-                    print(f"   ✅ Video ready! {video_url}")
-                    return video_url
-                    
-                elif status == 'error' or status == 'rejected':
-                    error_msg = status_data.get('error', {}).get('description', 'Unknown error')
-                    print(f"   ❌ Video generation failed: {error_msg}")
-                    return None
-                
-                # Show progress
-                if (i + 1) % 10 == 0:
-                    print(f"   ⏳ Still processing... ({i + 1}s)")
-            
-            print("   ⚠️  Video generation timed out")
-            return None
+            # The shared poller (or the webhook) resolves this once the talk finishes
+            try:
+                status_data = talk_poller.watch(talk_id, headers).result()
+            except TalkFailed as e:
+                print(f"   ❌ Video generation failed: {e}")
+                return None
+            
+            video_url = status_data.get('result_url')
+            print(f"   ✅ Video ready! {video_url}")
+            if video_url:
+                media_cache.put_url(self.cache_key(script), 'video', video_url)
+            return video_url
             
         except requests.exceptions.RequestException as e:
             print(f"   ❌ Error: {str(e)}")
@@ -178,7 +227,9 @@ class VideoGenerator:
     def create_explanation_video(
         self,
         analysis: str,
-        product_name: str
+        product_name: str,
+        report: Optional[dict] = None,
+        rule_verdict: Optional[dict] = None
     ) -> Dict[str, any]:
         """
         Create full explanation video from analysis.
@@ -186,13 +237,15 @@ class VideoGenerator:
         Args:
             analysis: Full analysis text
             product_name: Name of the product
+            report: Optional structured analysis (AnalysisReport)
+            rule_verdict: Optional classify_ingredients() result
             
         Returns:
             Dict with video_url, script, and status
         """
         try:
             # Create SHORT script
-            script = self.create_short_script(analysis, product_name)
+            script = self.create_short_script(analysis, product_name, report, rule_verdict)
             print(f"\n📝 Script: {script}")
             
             # Generate video
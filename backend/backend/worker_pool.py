@@ -0,0 +1,219 @@
+"""
+Bounded worker pool for analyses.
+
+Online /api/analyze requests and /api/analyze/batch items run their analyses
+on the same fixed-size thread pool, so a large batch can't start more LLM
+pipelines than the pool allows. Batches additionally cap their own items in
+flight (see imap_unordered), leaving workers free for online requests.
+
+Async /api/analyze requests (asgi.py) don't take a thread: they await their
+analysis on the event loop, admitted by an asyncio semaphore of
+LLM_MAX_CONCURRENCY slots (see arun), and are counted in the same queued and
+running totals as the threaded work.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from backend.config import ANALYSIS_MAX_WORKERS, BATCH_MAX_IN_FLIGHT, LLM_MAX_CONCURRENCY
+from backend.metrics import metrics
+
+
+class AnalysisWorkerPool:
+    """Fixed-size thread pool with queue and utilization metrics."""
+
+    def __init__(
+        self,
+        max_workers: int = ANALYSIS_MAX_WORKERS,
+        name: str = "analysis",
+        max_async: int = LLM_MAX_CONCURRENCY
+    ):
+        """
+        Initialize the pool (threads start on first use).
+
+        Args:
+            max_workers: Maximum threaded analyses running at once
+            name: Label used for the pool metrics and thread names
+            max_async: Maximum async analyses running at once (see arun)
+        """
+        self.max_workers = max_workers
+        self.max_async = max_async
+        self.name = name
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._streaming = 0
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        """
+        Queue fn(*args) on the pool.
+
+        Args:
+            fn: Function to run
+            *args: Arguments for fn
+
+        Returns:
+            Future for the result
+        """
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            metrics.observe('worker_pool_wait_seconds', time.perf_counter() - submitted, pool=self.name)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        future = self._executor.submit(run)
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget_cancelled(self, future: Future):
+        """Stop counting a job that was cancelled before it started."""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(*args) on the pool and wait for the result.
+
+        Args:
+            fn: Function to run
+            *args: Arguments for fn
+
+        Returns:
+            The result of fn
+        """
+        return self.submit(fn, *args).result()
+
+    async def arun(self, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Await fn(*args) on the event loop once an async slot is free.
+
+        The coroutine runs on the caller's loop rather than on a worker
+        thread, so waiting on the LLM doesn't hold a thread. It is counted in
+        the pool's queued and running totals and wait metric like submit().
+
+        Args:
+            fn: Coroutine function to run
+            *args: Arguments for fn
+
+        Returns:
+            The result of fn
+        """
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_async)
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+        try:
+            await self._async_slots.acquire()
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+        try:
+            with self._lock:
+                self._running += 1
+            metrics.observe('worker_pool_wait_seconds', time.perf_counter() - submitted, pool=self.name)
+            return await fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._async_slots.release()
+
+    def imap_unordered(
+        self,
+        fn: Callable[..., Any],
+        jobs: Iterable[Tuple[Any, tuple]],
+        max_in_flight: int = BATCH_MAX_IN_FLIGHT
+    ) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """
+        Run fn over many jobs, yielding each outcome as soon as it completes.
+
+        At most max_in_flight jobs are queued or running at any time; the
+        next one is submitted as each finishes.
+
+        Args:
+            fn: Function to run
+            jobs: (job ID, args tuple) pairs
+            max_in_flight: Maximum jobs of this call in the pool at once
+
+        Yields:
+            (job ID, result, None) on success or (job ID, None, exception) on failure
+        """
+        jobs = iter(jobs)
+        pending: Dict[Future, Any] = {}
+
+        def fill():
+            while len(pending) < max(1, max_in_flight):
+                job = next(jobs, None)
+                if job is None:
+                    return
+                job_id, args = job
+                pending[self.submit(fn, *args)] = job_id
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = pending.pop(future)
+                    error = future.exception()
+                    yield job_id, None if error else future.result(), error
+                fill()
+        finally:
+            # The consumer went away (e.g. client disconnected): drop queued jobs
+            for future in pending:
+                future.cancel()
+
+    @contextmanager
+    def streaming(self, route: str) -> Iterator[None]:
+        """
+        Account for an analysis streamed outside the pool.
+
+        Streamed analyses run on their client's connection, not on a worker,
+        because their events must reach the client as they are generated. They
+        are not admitted by the pool; this only counts them, in stats() and
+        in worker_pool_unpooled_total, so the bypass stays visible.
+
+        Args:
+            route: Label for the metric, e.g. 'stream' or 'astream'
+        """
+        metrics.inc('worker_pool_unpooled_total', pool=self.name, route=route)
+        with self._lock:
+            self._streaming += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._streaming -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Report the pool sizes, the analyses queued and running, and streams outside it."""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_async': self.max_async,
+                'queued': self._queued,
+                'running': self._running,
+                'streaming': self._streaming
+            }
+
+
+# Shared pool used by the analysis endpoints
+analysis_pool = AnalysisWorkerPool()
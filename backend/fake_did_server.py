@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local Stand-in for the D-ID Talks API
+
+Implements the two calls VideoGenerator makes - POST /talks and
+GET /talks/<id> - so video generation, the shared poller and the webhook
+path can be exercised without D-ID credits. A talk goes created -> started
+-> done after --render-seconds and points at a placeholder video URL. If
+the create request has a "webhook", the finished talk is POSTed there, as
+D-ID does. Scripts containing "FAIL" end in status "error".
+
+Only the standard library is used.
+
+Examples:
+    python fake_did_server.py --port 5055 --render-seconds 5
+    DID_API_URL=http://localhost:5055 DID_API_KEY=fake python main.py
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLACEHOLDER_VIDEO_URL = "https://interactive-examples.mdn.mozilla.net/media/cc0-videos/flower.mp4"
+
+
+class FakeDID:
+    """In-memory talk store with time-based status progression."""
+
+    def __init__(self, render_seconds: float):
+        self.render_seconds = render_seconds
+        self.lock = threading.Lock()
+        self.talks = {}
+        self.status_calls = 0
+
+    def create(self, payload: dict) -> dict:
+        """Register a talk and schedule its webhook, if any."""
+        talk_id = f"tlk_{uuid.uuid4().hex[:12]}"
+        script = (payload.get('script') or {}).get('input', '')
+        with self.lock:
+            self.talks[talk_id] = {
+                'created': time.time(),
+                'fail': 'FAIL' in script,
+                'webhook': payload.get('webhook')
+            }
+        if payload.get('webhook'):
+            threading.Timer(self.render_seconds, self.send_webhook, args=(talk_id,)).start()
+        return {'id': talk_id, 'status': 'created', 'object': 'talk'}
+
+    def status(self, talk_id: str):
+        """Current talk JSON, or None for an unknown ID."""
+        with self.lock:
+            self.status_calls += 1
+            talk = self.talks.get(talk_id)
+        if talk is None:
+            return None
+
+        elapsed = time.time() - talk['created']
+        body = {'id': talk_id, 'object': 'talk'}
+        if elapsed < self.render_seconds / 2:
+            body['status'] = 'created'
+        elif elapsed < self.render_seconds:
+            body['status'] = 'started'
+        elif talk['fail']:
+            body.update(status='error', error={'kind': 'FakeError', 'description': 'Script asked to fail'})
+        else:
+            body.update(status='done', result_url=f"{PLACEHOLDER_VIDEO_URL}?talk={talk_id}", duration=4.2)
+        return body
+
+    def send_webhook(self, talk_id: str):
+        """POST the finished talk to its webhook URL."""
+        url = self.talks[talk_id]['webhook']
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(self.status(talk_id)).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except OSError as e:
+            print(f"webhook to {url} failed: {e}")
+
+
+def make_handler(did: FakeDID):
+    """Request handler bound to a FakeDID instance."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def authorized(self) -> bool:
+            if self.headers.get('Authorization', '').startswith('Basic '):
+                return True
+            self.send_json(401, {'kind': 'AuthorizationError', 'description': 'Missing Basic authorization'})
+            return False
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/talks':
+                return self.send_json(404, {'kind': 'NotFoundError'})
+            if not self.authorized():
+                return None
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            return self.send_json(201, did.create(payload))
+
+        def do_GET(self):
+            if self.path == '/stats':
+                return self.send_json(200, {'talks': len(did.talks), 'status_calls': did.status_calls})
+            if not self.path.startswith('/talks/'):
+                return self.send_json(404, {'kind': 'NotFoundError'})
+            if not self.authorized():
+                return None
+            body = did.status(self.path[len('/talks/'):])
+            if body is None:
+                return self.send_json(404, {'kind': 'NotFoundError', 'description': 'talk not found'})
+            return self.send_json(200, body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--render-seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeDID(args.render_seconds)))
+    print(f"Fake D-ID API on http://{args.host}:{args.port} (talks finish after {args.render_seconds}s)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,7 @@ def initialize_system():
     from backend.vector_store import VectorStoreManager
     from backend.rag_engine import IngredientAnalyzer
     from backend.advanced_retrieval import AdvancedRetrievalManager
+    from backend.config import RETRIEVAL_K
     
     print("📚 Loading vector store...")
     vector_store_manager = VectorStoreManager(os.environ['OPENAI_API_KEY'])
@@ -55,13 +56,15 @@ def initialize_system():
     
     print("⚙️  Setting up ensemble retrieval...")
     use_compression = bool(os.environ.get('COHERE_API_KEY'))
-    retriever = advanced_retrieval_manager.get_ensemble_retriever(k=5, use_compression=use_compression)
+    retriever = advanced_retrieval_manager.get_ensemble_retriever(k=RETRIEVAL_K, use_compression=use_compression)
     
     print("🤖 Initializing ingredient analyzer...")
+    # Unrouted, so the committed analyses are all CHAT_MODEL reports
     ingredient_analyzer = IngredientAnalyzer(
         retriever, 
         os.environ['OPENAI_API_KEY'],
-        retrieval_strategy='ensemble'
+        retrieval_strategy='ensemble',
+        model_routing=False
     )
     
     print("✅ System initialized!\n")
@@ -98,7 +101,7 @@ def analyze_all_cereals(ingredient_analyzer):
         
         try:
             # Perform analysis
-            analysis = ingredient_analyzer.analyze_ingredients(cereal_name, ingredients)
+            analysis = ingredient_analyzer.analyze_ingredients(cereal_name, ingredients, mode="full")
             
             # Store result
             results[cereal_name] = {
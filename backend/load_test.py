@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Load Test for the KidSafe Analyzer API
+
+Fires concurrent POST requests at an analysis endpoint and reports throughput
+and latency percentiles. Run it against the Flask server (python main.py) and
+the ASGI server (uvicorn asgi:app) with the same settings to compare them.
+
+To compare the single-call report against concurrent section generation,
+start the server with the analysis cache and model routing off
+(ANALYSIS_CACHE_MAX_AGE_SECONDS=-1 MODEL_ROUTING=false) and run the same
+load once with --mode full and once with --mode parallel; /api/metrics
+also records analysis_generate_seconds per mode. This comparison has not
+been measured yet, so no speedup for parallel mode is claimed.
+
+Examples:
+    python load_test.py --url http://localhost:5001 --concurrency 50 --requests 500
+    python load_test.py --endpoint /api/chat --concurrency 100 --requests 1000
+    python load_test.py --mode full --concurrency 1 --requests 20
+    python load_test.py --mode parallel --concurrency 1 --requests 20
+"""
+
+import argparse
+import asyncio
+import csv
+import time
+from pathlib import Path
+
+import httpx
+
+
+def load_payloads(endpoint: str, mode: str):
+    """Build request bodies from the cereal catalog."""
+    data_file = Path(__file__).parent / 'Data' / 'cereal.csv'
+    with open(data_file, 'r', encoding='utf-8') as f:
+        cereals = [row for row in csv.DictReader(f) if row.get('Brand_Name')]
+
+    payloads = []
+    for row in cereals:
+        if endpoint == '/api/chat':
+            payloads.append({
+                'cereal_name': row['Brand_Name'],
+                'ingredients': row['Ingredients'],
+                'question': 'Is this okay for my child to eat every day?',
+                'chat_history': []
+            })
+        else:
+            payloads.append({
+                'cereal_name': row['Brand_Name'],
+                'ingredients': row['Ingredients'],
+                'mode': mode,
+                'generate_video': False
+            })
+    return payloads
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of floats."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+async def run(url: str, endpoint: str, mode: str, concurrency: int, total: int, timeout: float):
+    """Send `total` requests with at most `concurrency` in flight."""
+    payloads = load_payloads(endpoint, mode)
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(payloads[i % len(payloads)])
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.post(endpoint, json=payload)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print("=" * 70)
+    print(f"🎯 {url}{endpoint} ({mode})")
+    print(f"   Requests: {total}  Concurrency: {concurrency}  Errors: {errors}")
+    print(f"   Wall time: {elapsed:.2f}s  Throughput: {len(latencies) / elapsed:.2f} req/s")
+    print(f"   Latency p50: {percentile(latencies, 50):.3f}s  "
+          f"p95: {percentile(latencies, 95):.3f}s  p99: {percentile(latencies, 99):.3f}s")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--endpoint', default='/api/analyze')
+    parser.add_argument('--mode', default='full', help='Analysis mode (quick, full, structured, parallel)')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.endpoint, args.mode, args.concurrency, args.requests, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
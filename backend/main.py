@@ -1,10 +1,40 @@
 import os
 import csv
+import hmac
+import json
+import re
+import time
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, redirect, request, send_file, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from backend.analysis_cache import canonical_text, make_version
+from backend.analysis_report import render_markdown
+from backend.chat_history import ChatHistoryCompactor, format_messages
+from backend.chat_sessions import chat_sessions
+from backend.clients import clients
+from backend.config import (
+    ANALYSIS_MODES,
+    AUDIO_MAX_AGE_SECONDS,
+    BATCH_MAX_IN_FLIGHT,
+    BATCH_MAX_ITEMS,
+    CHAT_MODEL,
+    DEFAULT_ANALYSIS_MODE,
+    DID_WEBHOOK_SECRET,
+    MODEL_ROUTING,
+    RETRIEVAL_K,
+    ROUTER_FAST_MAX_TOKENS,
+    ROUTER_FAST_MODEL
+)
+from backend.did_poller import talk_poller
+from backend.ingredient_parser import canonical_ingredient_key
+from backend.media_cache import media_cache
+from backend.media_jobs import FINAL_STATES, media_jobs
+from backend.metrics import SIZE_BUCKETS, TOKEN_BUCKETS, metrics, record_token_usage, token_usage_summary
+from backend.rule_engine import classify_ingredients, has_artificial_red_flags, score_catalog
+from backend.worker_pool import analysis_pool
+
 # Load environment variables from .env file (for local development)
 # In production (Render/Vercel), environment variables are set via platform
 env_path = Path(__file__).parent / '.env'
@@ -27,6 +57,8 @@ CORS(app, origins=[
 vector_store_manager = None
 ingredient_analyzer = None
 advanced_retrieval_manager = None
+analysis_cache = None
+answer_cache = None
 api_keys = {}
 current_retrieval_strategy = "ensemble"  # Default to ensemble
 system_initialized = False
@@ -53,7 +85,7 @@ def load_api_keys_from_env():
 
 def initialize_system():
     """Initialize the RAG system with environment variables."""
-    global vector_store_manager, ingredient_analyzer, advanced_retrieval_manager, api_keys, current_retrieval_strategy, system_initialized
+    global vector_store_manager, ingredient_analyzer, advanced_retrieval_manager, analysis_cache, answer_cache, api_keys, current_retrieval_strategy, system_initialized
     
     if system_initialized:
         return True
@@ -83,6 +115,10 @@ def initialize_system():
         from backend.vector_store import VectorStoreManager
         from backend.rag_engine import IngredientAnalyzer
         from backend.advanced_retrieval import AdvancedRetrievalManager
+        from backend.analysis_cache import AnalysisCache
+        from backend.answer_cache import SemanticAnswerCache
+        from backend.fragment_store import FragmentStore
+        from backend.instrumentation import TimedEmbeddings
         
         print("🚀 Initializing KidSafe Analyzer...")
         print("📚 Loading vector store...")
@@ -101,13 +137,22 @@ def initialize_system():
         # Use ensemble retrieval strategy
         print(f"⚙️  Setting up {current_retrieval_strategy} retrieval...")
         use_compression = bool(api_keys['cohere_api_key'])
-        retriever = advanced_retrieval_manager.get_ensemble_retriever(k=5, use_compression=use_compression)
+        retriever = advanced_retrieval_manager.get_ensemble_retriever(k=RETRIEVAL_K, use_compression=use_compression)
+        
+        print("💾 Opening analysis cache...")
+        analysis_cache = AnalysisCache()
+        # Chat-question embeddings are timed separately from retrieval
+        answer_cache = SemanticAnswerCache(TimedEmbeddings(vector_store_manager.embeddings.embeddings, stage='answer_cache'))
         
         print("🤖 Initializing ingredient analyzer...")
         ingredient_analyzer = IngredientAnalyzer(
             retriever, 
             api_keys['openai_api_key'],
-            retrieval_strategy=current_retrieval_strategy
+            retrieval_strategy=current_retrieval_strategy,
+            cache=analysis_cache,
+            corpus_version=vector_store_manager.get_corpus_version(),
+            fragment_store=FragmentStore(),
+            retrieval_k=RETRIEVAL_K
         )
         
         system_initialized = True
@@ -138,6 +183,286 @@ def load_cereals():
     
     return cereals
 
+# Static chat instructions, sent first so they form a cacheable prompt prefix
+CHAT_SYSTEM_PROMPT = """
+You are a helpful AI assistant specializing in food ingredients and nutrition for children. 
+
+Provide a helpful, clear, and concise answer based on the analysis and your knowledge of food ingredients. 
+Be friendly and conversational. If the question is about something not covered in the analysis, 
+use your knowledge about food ingredients to provide accurate information.
+
+Keep your response focused and under 200 words unless more detail is specifically requested.
+"""
+
+# Per-conversation material; the conversation history and question come last
+CHAT_PROMPT_TEMPLATE = """
+You have already analyzed this product:
+Product: {cereal_name}
+Ingredients: {ingredients}
+
+Previous Analysis:
+{previous_analysis}
+{history}
+
+User Question: {question}
+"""
+
+CHAT_PROMPT_VERSION = make_version(CHAT_SYSTEM_PROMPT, CHAT_PROMPT_TEMPLATE)
+
+def create_chat_llm():
+    """Get the (shared, pooled) LLM used for chatbot answers."""
+    return clients.chat_model(CHAT_MODEL, temperature=0.7, api_key=api_keys['openai_api_key'])
+
+def create_history_compactor():
+    """Get the compactor that keeps chat history under its token budget."""
+    return ChatHistoryCompactor(clients.chat_model("gpt-4o-mini", temperature=0, api_key=api_keys['openai_api_key']))
+
+def build_chat_messages(cereal_name, ingredients, question, previous_analysis, chat_history, summary=''):
+    """Build the chatbot prompt messages for a question about an analyzed product."""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    # Build conversation context (already within the token budget, see chat_history.py)
+    history_text = ""
+    if summary:
+        history_text += f"\n\nSummary of the earlier conversation:\n{summary}\n"
+    if chat_history:
+        history_text += f"\n\nPrevious conversation:\n{format_messages(chat_history)}\n"
+    
+    chat_prompt = ChatPromptTemplate.from_messages([
+        ("system", CHAT_SYSTEM_PROMPT),
+        ("human", CHAT_PROMPT_TEMPLATE)
+    ])
+    return chat_prompt.format_messages(
+        cereal_name=cereal_name,
+        ingredients=ingredients,
+        previous_analysis=previous_analysis,
+        history=history_text,
+        question=question
+    )
+
+# Returned when a chat names a session that has expired and the request
+# doesn't carry the analysis needed to start a new one
+SESSION_EXPIRED_ERROR = {
+    'success': False,
+    'error': 'Chat session expired or unknown. Resend the analysis to start a new session.',
+    'error_code': 'session_expired'
+}
+
+def open_chat_session(data):
+    """
+    Find the chat session for a request, or start one from the request body.
+    
+    Returns (session, chat_mode) where chat_mode is 'session' when the client
+    only sent a session ID and 'stateless' when it sent the analysis and
+    history along, or (None, None) for an expired session that can't be rebuilt.
+    """
+    session_id = data.get('session_id')
+    if session_id:
+        session = chat_sessions.get(session_id)
+        if session is not None:
+            return session, 'session'
+        if not data.get('previous_analysis'):
+            return None, None
+    
+    # Stateless clients (and clients recovering from an expired session)
+    history = data.get('chat_history', [])
+    if history and history[0].get('role') == 'assistant':
+        history = history[1:]  # Drop the initial greeting
+    session = chat_sessions.create(
+        data.get('cereal_name'),
+        data.get('ingredients'),
+        data.get('previous_analysis', ''),
+        history
+    )
+    return session, 'stateless'
+
+def build_session_messages(session, question):
+    """Build the chatbot prompt messages for a question within a session."""
+    return build_chat_messages(
+        session['cereal_name'],
+        session['ingredients'],
+        question,
+        session['analysis'],
+        session['history'],
+        session['summary']
+    )
+
+def lookup_cached_answer(session, question):
+    """
+    Look up a semantically cached answer for a chat question.
+    
+    Only opening questions are cached: follow-ups depend on the conversation,
+    so a session with history or a summary returns None (no lookup).
+    """
+    if answer_cache is None or session['history'] or session['summary']:
+        return None
+    bucket = answer_cache.bucket_key(
+        session['cereal_name'], session['ingredients'], session['analysis'], CHAT_PROMPT_VERSION
+    )
+    return answer_cache.lookup(bucket, question)
+
+def record_chat_turn(response, chat_mode, request_bytes):
+    """Record payload size, prompt tokens and estimated cost of a chat turn, by chat mode."""
+    record_token_usage(response, 'chat', CHAT_PROMPT_VERSION, CHAT_MODEL)
+    metrics.observe('chat_request_bytes', request_bytes, buckets=SIZE_BUCKETS, mode=chat_mode)
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        metrics.observe('chat_prompt_tokens', usage.get('input_tokens', 0), buckets=TOKEN_BUCKETS, mode=chat_mode)
+
+def invalid_mode_error(mode):
+    """Error body for an unknown analysis mode."""
+    return {
+        'success': False,
+        'error': f"Invalid mode '{mode}'. Use one of: {', '.join(ANALYSIS_MODES)}"
+    }
+
+def run_analysis(cereal_name, ingredients, mode):
+    """
+    Run one analysis (called on the shared analysis worker pool).
+    
+    Returns (analysis markdown, report) where report is only set in structured mode.
+    """
+    if mode == 'structured':
+        report = ingredient_analyzer.analyze_report(cereal_name, ingredients)
+        return render_markdown(report), report
+    return ingredient_analyzer.analyze_ingredients(cereal_name, ingredients, mode), None
+
+def run_video_job(payload):
+    """Media job handler: render the D-ID video for a script."""
+    from backend.video_generator import VideoGenerator
+    video_url = VideoGenerator().generate_video(payload['script'])
+    if video_url is None:
+        raise RuntimeError('D-ID video generation failed')
+    return {'video_url': video_url}
+
+def run_audio_job(payload):
+    """Media job handler: synthesize the audio explanation for a script."""
+    from backend.audio_generator import AudioGenerator
+    audio_url = AudioGenerator().generate_audio(payload['script'])
+    if audio_url is None:
+        raise RuntimeError('Audio generation failed')
+    return {'audio_url': audio_url}
+
+media_jobs.register('video', run_video_job)
+media_jobs.register('audio', run_audio_job)
+
+def media_job_fields(job_id):
+    """Job ID and the URLs a client uses to follow a queued media job."""
+    return {
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/media/jobs/{job_id}',
+        'events_url': f'/api/media/jobs/{job_id}/events'
+    }
+
+def queue_video(analysis, cereal_name, report=None, script=None, rule_verdict=None):
+    """
+    Queue D-ID video generation for an analysis.
+    
+    Returns the video result without a video_url yet; it carries the job ID
+    to follow (or has_api False when D-ID isn't configured). A video already
+    rendered for the same script is returned right away, without a job.
+    A script given directly is used instead of deriving it from the analysis
+    (and the product's rule verdict, see VideoGenerator.create_short_script).
+    """
+    try:
+        from backend.video_generator import VideoGenerator
+        video_gen = VideoGenerator()
+        if script is None:
+            script = video_gen.create_short_script(analysis, cereal_name, report, rule_verdict)
+        result = {
+            'success': False,
+            'video_url': None,
+            'script': script,
+            'type': 'video',
+            'has_api': bool(video_gen.did_api_key)
+        }
+        if not video_gen.did_api_key:
+            return result
+        cached_url = video_gen.cached_video(script)
+        if cached_url:
+            result.update(success=True, video_url=cached_url, cached=True)
+        else:
+            result.update(media_job_fields(media_jobs.submit('video', {'script': script})))
+        return result
+    except Exception as e:
+        print(f"⚠️  Could not queue video generation: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'script': '',
+            'type': 'video'
+        }
+
+def queue_speculative_video(verdict, cereal_name, rule_verdict):
+    """
+    Queue the video as soon as the streamed verdict is known.
+    
+    The short script depends only on the verdict, the product name and (for
+    BAD) whether the rule engine found artificial red flags;
+    confirm_speculative_video() checks it against the final analysis.
+    """
+    from backend.video_generator import VideoGenerator
+    script = VideoGenerator().verdict_script(verdict, cereal_name, has_artificial_red_flags(rule_verdict))
+    metrics.inc('speculative_video_total', result='started')
+    return queue_video(None, cereal_name, script=script)
+
+def cancel_speculative_video(video):
+    """Cancel a speculative video's job if it hasn't finished."""
+    if video.get('job_id') and media_jobs.cancel(video['job_id']):
+        metrics.inc('speculative_video_total', result='cancelled')
+
+def confirm_speculative_video(video, analysis, cereal_name, report=None, rule_verdict=None):
+    """
+    Settle the video for a finished streamed analysis.
+    
+    Keeps the speculative video when its script matches the one the final
+    analysis calls for; otherwise cancels it and queues the right one.
+    """
+    if video is not None:
+        from backend.video_generator import VideoGenerator
+        if VideoGenerator().create_short_script(analysis, cereal_name, report, rule_verdict) == video['script']:
+            metrics.inc('speculative_video_total', result='kept')
+            return video
+        cancel_speculative_video(video)
+    return queue_video(analysis, cereal_name, report, rule_verdict=rule_verdict)
+
+def queue_audio(analysis, cereal_name, report=None):
+    """Queue gTTS audio generation for an analysis (see queue_video)."""
+    try:
+        from backend.audio_generator import AudioGenerator, audio_stream_url
+        audio_gen = AudioGenerator()
+        script = audio_gen.extract_key_points(analysis, cereal_name, report)
+        cached_url = audio_gen.cached_audio(script)
+        if cached_url is not None:
+            return {
+                'success': True,
+                'audio_url': cached_url,
+                'script': script,
+                'type': 'audio',
+                'cached': True
+            }
+        # Playable right away, sentence by sentence, while the job runs;
+        # clients stream by key, so only scripts issued here get synthesized
+        key = audio_gen.cache_key(script)
+        media_cache.put_script(key, script)
+        return {
+            'success': False,
+            'audio_url': None,
+            'script': script,
+            'type': 'audio',
+            'stream_url': audio_stream_url(key),
+            **media_job_fields(media_jobs.submit('audio', {'script': script}))
+        }
+    except Exception as e:
+        print(f"⚠️  Could not queue audio generation: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'script': '',
+            'type': 'audio'
+        }
+
 @app.route('/')
 def index():
     """API root - health check endpoint."""
@@ -150,7 +475,22 @@ def index():
             'cereals': '/api/cereals',
             'configure': '/api/configure (POST)',
             'analyze': '/api/analyze (POST)',
-            'chat': '/api/chat (POST)'
+            'analyze_stream': '/api/analyze/stream (POST, NDJSON)',
+            'analyze_batch': '/api/analyze/batch (POST, NDJSON)',
+            'analysis_pool': '/api/analyze/pool',
+            'analysis_routes': '/api/analyze/routes',
+            'media_job': '/api/media/jobs/<job_id> (GET, DELETE)',
+            'media_job_events': '/api/media/jobs/<job_id>/events (SSE)',
+            'audio': '/api/audio/<key> (MP3, range requests)',
+            'audio_stream': '/api/audio/stream/<key> (chunked MP3)',
+            'verdict': '/api/verdict (POST, rule-based)',
+            'verdicts': '/api/verdicts (rule-based, whole catalog)',
+            'chat': '/api/chat (POST)',
+            'chat_sessions': '/api/chat/sessions',
+            'chat_answer_cache': '/api/chat/answer-cache',
+            'metrics': '/api/metrics',
+            'token_metrics': '/api/metrics/tokens',
+            'cache_stats': '/api/cache/stats'
         }
     })
 
@@ -160,6 +500,32 @@ def get_cereals():
     cereals = load_cereals()
     return jsonify(cereals)
 
+@app.route('/api/verdict', methods=['POST'])
+def get_rule_verdict():
+    """Classify an ingredient list with the local rule engine (no LLM call)."""
+    data = request.get_json()
+    ingredients = data.get('ingredients')
+    
+    if not ingredients:
+        return jsonify({
+            'success': False,
+            'error': 'Missing ingredients'
+        }), 400
+    
+    with metrics.timer('rule_verdict_seconds'):
+        rule_verdict = classify_ingredients(ingredients)
+    
+    return jsonify({
+        'success': True,
+        'cereal_name': data.get('cereal_name', ''),
+        **rule_verdict
+    })
+
+@app.route('/api/verdicts')
+def get_catalog_verdicts():
+    """Score the whole cereal catalog with the local rule engine."""
+    return jsonify(score_catalog(load_cereals()))
+
 @app.route('/api/search-product', methods=['POST'])
 def search_product():
     """Search for product ingredients online using AI."""
@@ -176,13 +542,7 @@ def search_product():
         print(f"🔍 Searching for ingredients: {product_name}")
         
         # Use OpenAI to search for ingredients
-        from langchain_openai import ChatOpenAI
-        
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0,
-            api_key=os.environ.get('OPENAI_API_KEY')
-        )
+        llm = clients.chat_model("gpt-4o-mini", temperature=0, api_key=os.environ.get('OPENAI_API_KEY'))
         
         search_prompt = f"""You are a food product information assistant. 
         
@@ -285,6 +645,8 @@ def analyze_ingredients():
         cereal_name = data.get('cereal_name')
         ingredients = data.get('ingredients')
         generate_video = data.get('generate_video', True)  # New parameter
+        generate_audio = data.get('generate_audio', False)
+        mode = data.get('mode', DEFAULT_ANALYSIS_MODE)  # see ANALYSIS_MODES
         
         if not cereal_name or not ingredients:
             return jsonify({
@@ -292,33 +654,36 @@ def analyze_ingredients():
                 'error': 'Missing cereal_name or ingredients'
             }), 400
         
-        print(f"Analyzing ingredients for: {cereal_name}")
+        if mode not in ANALYSIS_MODES:
+            return jsonify(invalid_mode_error(mode)), 400
+        
+        print(f"Analyzing ingredients for: {cereal_name} ({mode})")
         
-        # Perform analysis
-        analysis = ingredient_analyzer.analyze_ingredients(cereal_name, ingredients)
+        # Deterministic verdict first - cheap and independent of the LLM
+        rule_verdict = classify_ingredients(ingredients)
+        
+        # Perform analysis (on the worker pool shared with batch requests)
+        analysis, report = analysis_pool.run(run_analysis, cereal_name, ingredients, mode)
         
         result = {
             'success': True,
             'cereal_name': cereal_name,
             'ingredients': ingredients,
+            'mode': mode,
+            'rule_verdict': rule_verdict,
             'analysis': analysis
         }
+        if report is not None:
+            result['report'] = report
+        
+        # Follow-up chat questions only need to send this ID
+        result['session_id'] = chat_sessions.create(cereal_name, ingredients, analysis)['session_id']
         
-        # Generate video explanation with D-ID
+        # Media is generated in the background; clients follow the job IDs
         if generate_video:
-            try:
-                from backend.video_generator import VideoGenerator
-                video_gen = VideoGenerator()
-                video_result = video_gen.create_explanation_video(analysis, cereal_name)
-                result['video'] = video_result
-            except Exception as e:
-                print(f"⚠️  Video generation failed: {str(e)}")
-                result['video'] = {
-                    'success': False,
-                    'error': str(e),
-                    'script': '',
-                    'type': 'video'
-                }
+            result['video'] = queue_video(analysis, cereal_name, report, rule_verdict=rule_verdict)
+        if generate_audio:
+            result['audio'] = queue_audio(analysis, cereal_name, report)
         
         return jsonify(result)
         
@@ -328,6 +693,438 @@ def analyze_ingredients():
             'error': str(e)
         }), 500
 
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_ingredients_stream():
+    """
+    Stream an ingredient analysis as newline-delimited JSON events.
+    
+    With generate_video, the video is queued as soon as the verdict streams
+    (a 'video' event with speculative true) so rendering overlaps the rest of
+    the analysis; the 'done' event carries the confirmed video.
+    
+    Unlike /api/analyze, the analysis runs on this request's connection rather
+    than the shared worker pool, and concurrent identical streams are not
+    coalesced; they are counted as 'streaming' in /api/analyze/pool.
+    """
+    global ingredient_analyzer
+    
+    started = time.perf_counter()
+    
+    # Check if system is initialized
+    if ingredient_analyzer is None:
+        return jsonify({
+            'success': False,
+            'error': 'System not initialized. Please configure API keys first.'
+        }), 400
+    
+    data = request.get_json()
+    cereal_name = data.get('cereal_name')
+    ingredients = data.get('ingredients')
+    mode = data.get('mode', DEFAULT_ANALYSIS_MODE)
+    generate_video = data.get('generate_video', False)
+    generate_audio = data.get('generate_audio', False)
+    
+    if not cereal_name or not ingredients:
+        return jsonify({
+            'success': False,
+            'error': 'Missing cereal_name or ingredients'
+        }), 400
+    
+    if mode not in ANALYSIS_MODES:
+        return jsonify(invalid_mode_error(mode)), 400
+    
+    print(f"Streaming {mode} analysis for: {cereal_name}")
+    
+    def generate():
+        first_byte_sent = False
+        speculative_video = None
+        confirmed = False
+        try:
+            # The rule-engine verdict goes out before any LLM work starts
+            rule_verdict = classify_ingredients(ingredients)
+            yield json.dumps({'type': 'rule_verdict', **rule_verdict}) + "\n"
+            metrics.observe('analyze_stream_ttfb_seconds', time.perf_counter() - started)
+            first_byte_sent = True
+            
+            # Streams run on the connection, outside the worker pool (see AnalysisWorkerPool.streaming)
+            with analysis_pool.streaming('stream'):
+                for event in ingredient_analyzer.stream_analysis(cereal_name, ingredients, mode):
+                    elapsed = time.perf_counter() - started
+                    if not first_byte_sent:
+                        metrics.observe('analyze_stream_ttfb_seconds', elapsed)
+                        first_byte_sent = True
+                    if event['type'] == 'verdict':
+                        metrics.observe('analyze_stream_verdict_seconds', elapsed)
+                    elif event['type'] == 'done':
+                        event['session_id'] = chat_sessions.create(cereal_name, ingredients, event['analysis'])['session_id']
+                        if generate_video:
+                            event['video'] = confirm_speculative_video(
+                                speculative_video, event['analysis'], cereal_name, event.get('report'), rule_verdict
+                            )
+                            confirmed = True
+                        if generate_audio:
+                            event['audio'] = queue_audio(event['analysis'], cereal_name, event.get('report'))
+                    yield json.dumps(event) + "\n"
+                
+                    # Start rendering while the rest of the analysis is generated
+                    if event['type'] == 'verdict' and generate_video and speculative_video is None:
+                        speculative_video = queue_speculative_video(event['verdict'], cereal_name, rule_verdict)
+                        yield json.dumps({'type': 'video', 'speculative': True, 'video': speculative_video}) + "\n"
+                metrics.inc('analyze_stream_requests_total', status='ok')
+        except Exception as e:
+            metrics.inc('analyze_stream_requests_total', status='error')
+            yield json.dumps({'type': 'error', 'error': str(e)}) + "\n"
+        finally:
+            # Failed or abandoned streams don't leave a video rendering
+            if speculative_video is not None and not confirmed:
+                cancel_speculative_video(speculative_video)
+            metrics.observe('analyze_stream_duration_seconds', time.perf_counter() - started)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so tokens flush immediately
+        }
+    )
+
+def plan_batch(products, default_mode):
+    """
+    Validate batch items and group identical inputs.
+    
+    Returns (jobs, invalid) where jobs maps a dedup key to the job's
+    (cereal_name, ingredients, mode) and the indexes of the items it answers,
+    and invalid lists (index, item, error) for items that can't run.
+    """
+    jobs, invalid = {}, []
+    for index, item in enumerate(products):
+        if not isinstance(item, dict):
+            invalid.append((index, {}, 'Item must be an object'))
+            continue
+        cereal_name = item.get('cereal_name')
+        ingredients = item.get('ingredients')
+        mode = item.get('mode', default_mode)
+        if not cereal_name or not ingredients:
+            invalid.append((index, item, 'Missing cereal_name or ingredients'))
+        elif mode not in ANALYSIS_MODES:
+            invalid.append((index, item, invalid_mode_error(mode)['error']))
+        else:
+            key = (canonical_text(cereal_name), canonical_ingredient_key(ingredients), mode)
+            job = jobs.setdefault(key, {'args': (cereal_name, ingredients, mode), 'items': []})
+            job['items'].append((index, item))
+    return jobs, invalid
+
+def timed_run_analysis(cereal_name, ingredients, mode):
+    """run_analysis that also returns its duration in seconds."""
+    started = time.perf_counter()
+    analysis, report = run_analysis(cereal_name, ingredients, mode)
+    return analysis, report, time.perf_counter() - started
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze many products, streaming one NDJSON line per item as it completes.
+    
+    Identical items (same canonical name, ingredients and mode) are analyzed
+    once. Analyses run on the worker pool shared with /api/analyze, with at
+    most BATCH_MAX_IN_FLIGHT items of a batch in the pool at a time. The last
+    line is a summary with counts and throughput.
+    """
+    global ingredient_analyzer
+    
+    started = time.perf_counter()
+    
+    if ingredient_analyzer is None:
+        return jsonify({
+            'success': False,
+            'error': 'System not initialized. Please configure API keys first.'
+        }), 400
+    
+    data = request.get_json() or {}
+    products = data.get('products')
+    mode = data.get('mode', DEFAULT_ANALYSIS_MODE)
+    
+    if not isinstance(products, list) or not products:
+        return jsonify({
+            'success': False,
+            'error': 'Missing products (a list of {cereal_name, ingredients})'
+        }), 400
+    
+    if len(products) > BATCH_MAX_ITEMS:
+        return jsonify({
+            'success': False,
+            'error': f'Too many products ({len(products)}). The limit is {BATCH_MAX_ITEMS} per batch.'
+        }), 413
+    
+    if mode not in ANALYSIS_MODES:
+        return jsonify(invalid_mode_error(mode)), 400
+    
+    jobs, invalid = plan_batch(products, mode)
+    print(f"Batch analysis: {len(products)} items, {len(jobs)} unique")
+    metrics.inc('analyze_batch_requests_total')
+    metrics.inc('analyze_batch_items_total', len(products))
+    metrics.inc('analyze_batch_deduplicated_total', len(products) - len(invalid) - len(jobs))
+    
+    def item_event(index, item, status, **fields):
+        return json.dumps({
+            'type': 'item',
+            'index': index,
+            'id': item.get('id'),
+            'cereal_name': item.get('cereal_name'),
+            'status': status,
+            **fields
+        }) + "\n"
+    
+    def generate():
+        counts = {'ok': 0, 'error': 0, 'invalid': len(invalid)}
+        for index, item, error in invalid:
+            yield item_event(index, item, 'invalid', error=error)
+        
+        outcomes = analysis_pool.imap_unordered(
+            timed_run_analysis,
+            ((key, job['args']) for key, job in jobs.items()),
+            max_in_flight=BATCH_MAX_IN_FLIGHT
+        )
+        for key, result, error in outcomes:
+            job = jobs[key]
+            for position, (index, item) in enumerate(job['items']):
+                fields = {'mode': job['args'][2], 'deduplicated': position > 0}
+                if error is not None:
+                    counts['error'] += 1
+                    metrics.inc('analyze_batch_results_total', status='error')
+                    yield item_event(index, item, 'error', error=str(error), **fields)
+                    continue
+                
+                analysis, report, seconds = result
+                counts['ok'] += 1
+                metrics.inc('analyze_batch_results_total', status='ok')
+                fields.update({
+                    'rule_verdict': classify_ingredients(job['args'][1]),
+                    'analysis': analysis,
+                    'seconds': round(seconds, 3)
+                })
+                if report is not None:
+                    fields['report'] = report
+                yield item_event(index, item, 'ok', **fields)
+        
+        elapsed = time.perf_counter() - started
+        metrics.observe('analyze_batch_duration_seconds', elapsed)
+        yield json.dumps({
+            'type': 'summary',
+            'items': len(products),
+            'unique': len(jobs),
+            'succeeded': counts['ok'],
+            'failed': counts['error'],
+            'invalid': counts['invalid'],
+            'seconds': round(elapsed, 3),
+            'items_per_second': round(len(products) / elapsed, 3) if elapsed else 0.0
+        }) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/api/analyze/pool')
+def get_analysis_pool_stats():
+    """Report the analysis worker pool size and the analyses queued and running."""
+    return jsonify({
+        'success': True,
+        **analysis_pool.stats()
+    })
+
+@app.route('/api/analyze/routes')
+def get_analysis_route_stats():
+    """Report how full analyses were routed, with latency and estimated cost per route."""
+    from backend.rag_engine import route_stats
+    return jsonify({
+        'success': True,
+        'enabled': MODEL_ROUTING,
+        'fast_model': ROUTER_FAST_MODEL,
+        'fast_max_tokens': ROUTER_FAST_MAX_TOKENS,
+        'routes': route_stats()
+    })
+
+@app.route('/api/media/jobs')
+def get_media_job_stats():
+    """Report the number of media jobs per status, the D-ID talks being polled and the media cache size."""
+    return jsonify({
+        'success': True,
+        **media_jobs.stats(),
+        **talk_poller.stats(),
+        'cache': media_cache.stats()
+    })
+
+@app.route('/api/media/jobs/<job_id>', methods=['GET'])
+def get_media_job(job_id):
+    """Report the status (and, once done, the result) of a media job."""
+    job = media_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown media job'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        **job
+    })
+
+@app.route('/api/media/jobs/<job_id>', methods=['DELETE'])
+def cancel_media_job(job_id):
+    """Cancel a queued or running media job."""
+    if media_jobs.cancel(job_id):
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'cancelled'
+        })
+    
+    job = media_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown media job'
+        }), 404
+    return jsonify({
+        'success': False,
+        'error': f"Media job already {job['status']}",
+        'status': job['status']
+    }), 409
+
+@app.route('/api/media/jobs/<job_id>/events')
+def media_job_events(job_id):
+    """Server-sent events: one 'status' event per job status change until it is final."""
+    if media_jobs.get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown media job'
+        }), 404
+    
+    def generate():
+        last_status = None
+        while True:
+            job = media_jobs.wait(job_id, timeout=15, last_status=last_status)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Unknown media job'})}\n\n"
+                return
+            if job['status'] == last_status:
+                yield ": keep-alive\n\n"
+                continue
+            last_status = job['status']
+            yield f"event: status\ndata: {json.dumps(job)}\n\n"
+            if last_status in FINAL_STATES:
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/api/audio/stream/<key>')
+def stream_audio(key):
+    """
+    Speak an issued audio script as a chunked MP3 stream, sentence by sentence.
+    
+    Only scripts queue_audio() issued with an analysis can be streamed, by
+    their media key, so the endpoint never synthesizes caller-supplied text.
+    Playback can start after the first sentence. Scripts that were already
+    synthesized redirect to their cached file.
+    """
+    from backend.audio_generator import AudioGenerator
+    
+    script = media_cache.get_script(key) if re.fullmatch(r'[0-9a-f]{64}', key) else None
+    if script is None:
+        return jsonify({
+            'success': False,
+            'error': 'Audio script not found'
+        }), 404
+    
+    audio_gen = AudioGenerator()
+    cached_url = audio_gen.cached_audio(script)
+    if cached_url:
+        return redirect(cached_url)
+    
+    return Response(
+        stream_with_context(audio_gen.stream_audio(script)),
+        mimetype='audio/mpeg',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/api/audio/<key>')
+def get_audio(key):
+    """
+    Serve generated audio from the media cache.
+    
+    The key is the sha256 of the script and voice, so the file behind a URL
+    never changes: responses carry the key as ETag, may be cached forever and
+    support Range requests for seeking.
+    """
+    path = media_cache.get_path(key) if re.fullmatch(r'[0-9a-f]{64}', key) else None
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': 'Audio not found'
+        }), 404
+    
+    response = send_file(path, mimetype='audio/mpeg', conditional=True, etag=key, max_age=AUDIO_MAX_AGE_SECONDS)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/did/webhook', methods=['POST'])
+def did_webhook():
+    """D-ID callback for a finished talk (enabled by DID_WEBHOOK_URL)."""
+    if DID_WEBHOOK_SECRET and not hmac.compare_digest(request.args.get('token', ''), DID_WEBHOOK_SECRET):
+        metrics.inc('did_webhooks_total', result='unauthorized')
+        return jsonify({
+            'success': False,
+            'error': 'Invalid webhook token'
+        }), 403
+    
+    talk = request.get_json(silent=True) or {}
+    talk_id = talk.get('id')
+    if not talk_id:
+        metrics.inc('did_webhooks_total', result='invalid')
+        return jsonify({
+            'success': False,
+            'error': 'Missing talk id'
+        }), 400
+    
+    resolved = talk_poller.resolve(talk_id, talk)
+    metrics.inc('did_webhooks_total', result='resolved' if resolved else 'ignored')
+    return jsonify({
+        'success': True,
+        'resolved': resolved
+    })
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Expose server metrics as JSON, or Prometheus text with ?format=prometheus."""
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(metrics.snapshot())
+
+@app.route('/api/metrics/tokens')
+def get_token_metrics():
+    """Report LLM token usage and prompt cache hit ratio per operation and prompt version."""
+    return jsonify({
+        'success': True,
+        'usage': token_usage_summary()
+    })
+
 @app.route('/api/status')
 def get_status():
     """Check if the RAG system is initialized."""
@@ -357,11 +1154,7 @@ def chat():
             }), 400
         
         data = request.get_json()
-        cereal_name = data.get('cereal_name')
-        ingredients = data.get('ingredients')
         question = data.get('question')
-        previous_analysis = data.get('previous_analysis', '')
-        chat_history = data.get('chat_history', [])
         
         if not question:
             return jsonify({
@@ -369,66 +1162,36 @@ def chat():
                 'error': 'Missing question'
             }), 400
         
-        print(f"Chat question for {cereal_name}: {question}")
-        
-        # Import ChatOpenAI
-        from langchain_openai import ChatOpenAI
-        from langchain_core.prompts import ChatPromptTemplate
-        
-        # Create chat LLM
-        chat_llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            api_key=api_keys['openai_api_key'],
-            temperature=0.7
-        )
+        # Clients with a session ID only send the question
+        session, chat_mode = open_chat_session(data)
+        if session is None:
+            return jsonify(SESSION_EXPIRED_ERROR), 404
         
-        # Build conversation context
-        history_text = ""
-        if len(chat_history) > 1:  # More than just the initial greeting
-            history_text = "\n\nPrevious conversation:\n"
-            for msg in chat_history[-4:]:  # Last 4 messages for context
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                if role == 'user':
-                    history_text += f"User: {content}\n"
-                else:
-                    history_text += f"Assistant: {content}\n"
-        
-        # Create chat prompt
-        chat_prompt = ChatPromptTemplate.from_template("""
-You are a helpful AI assistant specializing in food ingredients and nutrition for children. 
-
-You have already analyzed this product:
-Product: {cereal_name}
-Ingredients: {ingredients}
-
-Previous Analysis:
-{previous_analysis}
-{history}
-
-User Question: {question}
-
-Provide a helpful, clear, and concise answer based on the analysis and your knowledge of food ingredients. 
-Be friendly and conversational. If the question is about something not covered in the analysis, 
-use your knowledge about food ingredients to provide accurate information.
-
-Keep your response focused and under 200 words unless more detail is specifically requested.
-""")
-        
-        # Format and invoke
-        messages = chat_prompt.format_messages(
-            cereal_name=cereal_name,
-            ingredients=ingredients,
-            previous_analysis=previous_analysis,
-            history=history_text,
-            question=question
-        )
+        print(f"Chat question for {session['cereal_name']} ({chat_mode}): {question}")
         
-        response = chat_llm.invoke(messages)
+        lookup = lookup_cached_answer(session, question)
+        cached = bool(lookup and lookup['answer'] and not lookup['audit'])
+        if cached:
+            answer = lookup['answer']
+        else:
+            chat_llm = create_chat_llm()
+            create_history_compactor().compact(session)
+            messages = build_session_messages(session, question)
+            
+            response = chat_llm.invoke(messages, config={"metadata": {"prompt_version": CHAT_PROMPT_VERSION}})
+            record_chat_turn(response, chat_mode, request.content_length or 0)
+            answer = response.content
+            if lookup and lookup['audit']:
+                answer_cache.audit(lookup, answer)
+            elif lookup:
+                answer_cache.store(lookup, answer)
+        chat_sessions.append(session, question, answer)
         
         return jsonify({
             'success': True,
-            'answer': response.content
+            'answer': answer,
+            'cached': cached,
+            'session_id': session['session_id']
         })
         
     except Exception as e:
@@ -439,6 +1202,43 @@ Keep your response focused and under 200 words unless more detail is specificall
             'error': str(e)
         }), 500
 
+@app.route('/api/chat/sessions')
+def get_chat_session_stats():
+    """Report the number of live chat sessions."""
+    return jsonify({
+        'success': True,
+        **chat_sessions.stats()
+    })
+
+@app.route('/api/chat/answer-cache')
+def get_answer_cache_stats():
+    """Report the semantic answer cache hit rate and recent false-hit audits."""
+    if answer_cache is None:
+        return jsonify({
+            'success': False,
+            'error': 'System not initialized. Please configure API keys first.'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        **answer_cache.stats()
+    })
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Report analysis cache size and hit ratio."""
+    if analysis_cache is None:
+        return jsonify({
+            'success': False,
+            'error': 'System not initialized. Please configure API keys first.'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'versions': ingredient_analyzer.cache_versions,
+        **analysis_cache.stats()
+    })
+
 if __name__ == "__main__":
     # Use PORT environment variable for deployment (Render, Railway, etc.)
     # Default to 5001 for local development
@@ -0,0 +1,83 @@
+"""Sentence-by-sentence audio streaming with the stand-in TTS engine."""
+
+import threading
+import time
+
+import pytest
+
+from backend import audio_generator
+from backend.audio_generator import AudioGenerator, split_sentences
+from backend.media_cache import MediaCache
+from backend.worker_pool import AnalysisWorkerPool
+
+
+@pytest.fixture
+def audio(monkeypatch, tmp_path):
+    """Stand-in engine, a private media cache and a two-thread TTS pool."""
+    monkeypatch.setattr(audio_generator, 'TTS_ENGINE', 'standin')
+    monkeypatch.setattr(audio_generator, 'media_cache', MediaCache(':memory:', tmp_path))
+    monkeypatch.setattr(audio_generator, 'tts_pool', AnalysisWorkerPool(2, name='tts-test'))
+    return AudioGenerator()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Great news! Enjoy!', ['Great news!', 'Enjoy!']),
+    ("Hi! I'm Berry.\n\nIt is GOOD.", ['Hi!', "I'm Berry.", 'It is GOOD.']),
+    ('No terminal punctuation', ['No terminal punctuation']),
+    ('Ask Dr. Smith. The U.S. FDA agrees.', ['Ask Dr. Smith.', 'The U.S. FDA agrees.']),
+    ('It has Yellow No. 5 and Red No. 40. Avoid it.', ['It has Yellow No. 5 and Red No. 40.', 'Avoid it.']),
+    ('Use less sugar, e.g. honey. Done', ['Use less sugar, e.g. honey.', 'Done']),
+    ('It is 2.5 grams. ', ['It is 2.5 grams.']),
+    ('  \n\n ', []),
+])
+def test_split_sentences(text, expected):
+    assert split_sentences(text) == expected
+
+
+def test_stream_yields_segments_in_script_order(audio, monkeypatch):
+    # Later sentences finish first; the stream must still follow the script
+    delays = {'One.': 0.06, 'Two.': 0.03, 'Three.': 0.0}
+    monkeypatch.setattr(audio, 'synthesize', lambda text: time.sleep(delays[text]) or text.encode())
+
+    assert list(audio.stream_audio('One. Two. Three.')) == [b'One.', b'Two.', b'Three.']
+
+
+def test_stream_caches_joined_audio(audio):
+    script = 'Great news! Enjoy!'
+    chunks = list(audio.stream_audio(script))
+
+    assert audio.cached_audio(script) == audio_generator.audio_url(audio.cache_key(script))
+    assert audio_generator.media_cache.get_path(audio.cache_key(script)).read_bytes() == b''.join(chunks)
+
+
+def test_closing_the_stream_cancels_pending_sentences(audio, monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def synthesize(text):
+        started.append(text)
+        if text != 'One.':
+            release.wait(1)
+        return text.encode()
+
+    monkeypatch.setattr(audio, 'synthesize', synthesize)
+    stream = audio.stream_audio('One. Two. Three. Four. Five.')
+    assert next(stream) == b'One.'
+
+    stream.close()
+    release.set()
+    audio_generator.tts_pool._executor.shutdown(wait=True)
+
+    # Only the sentences already running when the client left were synthesized
+    assert 'Five.' not in started
+    assert len(started) <= 3
+    assert audio.cached_audio('One. Two. Three. Four. Five.') is None
+
+
+def test_scripts_are_streamable_only_by_issued_key(tmp_path):
+    cache = MediaCache(':memory:', tmp_path)
+    cache.put_script('a' * 64, 'Great news! Enjoy!')
+
+    assert cache.get_script('a' * 64) == 'Great news! Enjoy!'
+    assert cache.get_script('b' * 64) is None
+    assert cache.get_script('a' * 64, ttl=-1) is None
@@ -0,0 +1,25 @@
+"""Analysis cache versions change with everything that changes an analysis."""
+
+import pytest
+
+pytest.importorskip('langgraph')
+pytest.importorskip('langchain_openai')
+
+from backend import rag_engine  # noqa: E402
+from backend.rag_engine import IngredientAnalyzer  # noqa: E402
+
+
+def versions(**kwargs):
+    return IngredientAnalyzer(retriever=None, openai_api_key='test-key', **kwargs).cache_versions
+
+
+def test_retrieval_k_changes_every_version():
+    five, ten = versions(retrieval_k=5), versions(retrieval_k=10)
+    assert all(five[mode] != ten[mode] for mode in five)
+
+
+def test_embedding_model_changes_every_version(monkeypatch):
+    small = versions()
+    monkeypatch.setattr(rag_engine, 'EMBEDDING_MODEL', 'text-embedding-3-large')
+    large = versions()
+    assert all(small[mode] != large[mode] for mode in small)
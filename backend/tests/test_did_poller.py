@@ -0,0 +1,118 @@
+"""Shared D-ID talk poller against the in-process fake D-ID API."""
+
+import pytest
+
+for module in ('requests', 'httpx', 'langchain_openai'):
+    pytest.importorskip(module)
+
+from backend.did_poller import TalkFailed, TalkPoller, _PendingTalk  # noqa: E402
+from fake_did_server import FakeDID  # noqa: E402
+
+HEADERS = {'Authorization': 'Basic fake'}
+
+
+class FakeResponse:
+    """Just enough of requests.Response for the poller."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Serves GET /talks/<id> from a FakeDID without HTTP."""
+
+    def __init__(self, did: FakeDID):
+        self.did = did
+        self.gets = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.gets += 1
+        return FakeResponse(self.did.status(url.rsplit('/', 1)[1]))
+
+
+def make_poller(did, **options):
+    settings = dict(initial_delay=0.01, max_delay=0.05, backoff=2.0, timeout=5.0)
+    settings.update(options)
+    session = FakeSession(did)
+    return TalkPoller(api_url='http://fake-did', session=session, **settings), session
+
+
+def create_talk(did, script='Great choice!', webhook=None):
+    return did.create({'script': {'type': 'text', 'input': script}, 'webhook': webhook})['id']
+
+
+def test_backoff_grows_to_max_delay_and_stops_at_deadline():
+    did = FakeDID(render_seconds=60)
+    poller, _ = make_poller(did, max_delay=5.0)
+    pending = _PendingTalk(create_talk(did), HEADERS, delay=1.0, timeout=12.0)
+    poller._pending[pending.talk_id] = pending
+
+    delays = []
+    for _ in range(4):
+        poller._poll(pending)
+        delays.append(pending.delay)
+    assert delays == [2.0, 4.0, 5.0, 5.0]
+    assert pending.next_poll <= pending.deadline
+
+
+def test_talk_resolves_by_polling():
+    did = FakeDID(render_seconds=0.05)
+    poller, session = make_poller(did)
+
+    talk = poller.watch(create_talk(did), HEADERS).result(timeout=3)
+    assert talk['status'] == 'done'
+    assert session.gets >= 1
+    assert poller.stats() == {'pending_talks': 0}
+
+
+def test_talk_resolves_by_webhook_without_polling():
+    did = FakeDID(render_seconds=0)
+    poller, session = make_poller(did, initial_delay=60)
+    talk_id = create_talk(did)
+    future = poller.watch(talk_id, HEADERS)
+
+    # What /api/did/webhook does with the posted talk
+    assert poller.resolve(talk_id, did.status(talk_id))
+    assert future.result(timeout=1)['status'] == 'done'
+    assert session.gets == 0
+
+
+def test_failed_talk_raises_talk_failed():
+    did = FakeDID(render_seconds=0)
+    poller, _ = make_poller(did)
+
+    with pytest.raises(TalkFailed, match='Script asked to fail'):
+        poller.watch(create_talk(did, script='Please FAIL'), HEADERS).result(timeout=3)
+
+
+def test_talk_times_out():
+    did = FakeDID(render_seconds=60)
+    poller, _ = make_poller(did, timeout=0.1)
+
+    with pytest.raises(TalkFailed, match='timed out'):
+        poller.watch(create_talk(did), HEADERS).result(timeout=3)
+
+
+def test_unexpected_poll_error_fails_only_that_talk():
+    did = FakeDID(render_seconds=0)
+    poller, session = make_poller(did)
+    real_get = session.get
+
+    def get(url, headers=None, timeout=None):
+        if url.endswith(broken_id):
+            return FakeResponse(['not', 'a', 'talk'])  # .get() on a list raises AttributeError
+        return real_get(url, headers, timeout)
+
+    session.get = get
+    broken_id = create_talk(did)
+
+    with pytest.raises(TalkFailed, match='status check failed'):
+        poller.watch(broken_id, HEADERS).result(timeout=3)
+    # The polling thread survived and still serves other talks
+    assert poller.watch(create_talk(did), HEADERS).result(timeout=3)['status'] == 'done'
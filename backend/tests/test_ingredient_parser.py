@@ -0,0 +1,38 @@
+"""Ingredient parsing, fuzzy canonicalization and cache keys."""
+
+import pytest
+
+from backend.ingredient_parser import canonical_ingredient_key, get_canonicalizer
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Label typos resolve to the vocabulary
+    ('Coconute Sugar', 'coconut sugar'),
+    ('Organic Babana Puree', 'organic banana puree'),
+    ('Canola Oils', 'canola oil'),
+    # Valid words are left alone
+    ('Peas', 'peas'),
+    ('Palm Kernel Oil', 'palm kernel oil'),
+    ('Chocolate Chips', 'chocolate chips'),
+])
+def test_canonicalize(text, expected):
+    names = get_canonicalizer().canonicalize(text)
+    assert [name for name, _ in names] == [expected]
+
+
+def test_run_together_ingredients_are_split():
+    names = get_canonicalizer().canonicalize('Roboflavin Niacinamide')
+    assert [name for name, _ in names] == ['riboflavin', 'niacinamide']
+
+
+def test_key_includes_sub_ingredients():
+    dyed = canonical_ingredient_key('Oats, Chocolate Chips (Sugar, Cocoa, Red 40)')
+    plain = canonical_ingredient_key('Oats, Chocolate Chips (Sugar, Cocoa)')
+    assert dyed == 'oats, chocolate chips (sugar, cocoa, red 40)'
+    assert dyed != plain
+
+
+def test_key_ignores_label_formatting():
+    assert canonical_ingredient_key('Whole Grain Oats,  SUGAR , Salt.') == canonical_ingredient_key(
+        'whole grain oats, sugar, salt'
+    )
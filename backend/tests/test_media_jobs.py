@@ -0,0 +1,59 @@
+"""Media job queue leases and recovery across processes sharing the database."""
+
+import threading
+import time
+
+from backend.media_jobs import CANCELLED, DONE, QUEUED, RUNNING, MediaJobQueue
+from backend.metrics import metrics
+
+
+def wait_for(queue, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    job = queue.get(job_id)
+    while job['status'] != status and time.monotonic() < deadline:
+        job = queue.wait(job_id, deadline - time.monotonic(), job['status'])
+    return job
+
+
+def test_live_owner_keeps_its_running_job(tmp_path):
+    path = tmp_path / 'jobs.sqlite3'
+    release = threading.Event()
+    first = MediaJobQueue(path, workers=1, lease_seconds=30)
+    first.register('video', lambda payload: release.wait(5) and {'video_url': 'done'})
+    job_id = first.submit('video', {'script': 'hi'})
+    assert wait_for(first, job_id, RUNNING)['status'] == RUNNING
+
+    # A sibling process (or a reload) opening the same database leaves it alone
+    second = MediaJobQueue(path, workers=1, lease_seconds=30)
+    assert second.get(job_id)['status'] == RUNNING
+
+    release.set()
+    assert wait_for(first, job_id, DONE)['result'] == {'video_url': 'done'}
+
+
+def test_expired_lease_is_queued_again(tmp_path):
+    path = tmp_path / 'jobs.sqlite3'
+    first = MediaJobQueue(path, workers=1, lease_seconds=0.05)
+    first.register('video', lambda payload: threading.Event().wait(5))
+    job_id = first.submit('video', {'script': 'hi'})
+    assert wait_for(first, job_id, RUNNING)['status'] == RUNNING
+
+    # The owner stops renewing, as if its process had died
+    with first._lock:
+        first._conn.execute("UPDATE media_jobs SET owner = 'gone', lease_until = ? WHERE job_id = ?",
+                            (time.time() - 1, job_id))
+        first._conn.commit()
+
+    second = MediaJobQueue(path, workers=1, lease_seconds=30)
+    assert second.get(job_id)['status'] == QUEUED
+
+
+def test_cancel_metric_carries_the_kind(tmp_path):
+    queue = MediaJobQueue(tmp_path / 'jobs.sqlite3', workers=1)
+    queue._handlers['audio'] = lambda payload: {}
+    job_id = queue.submit('audio', {'script': 'hi'})
+    before = metrics.counter_value('media_jobs_total', kind='audio', status=CANCELLED)
+
+    assert queue.cancel(job_id)
+    assert not queue.cancel(job_id)
+    assert metrics.counter_value('media_jobs_total', kind='audio', status=CANCELLED) == before + 1
@@ -0,0 +1,40 @@
+"""Analysis prompts keep their cacheable prefix ahead of per-request text."""
+
+import pytest
+
+pytest.importorskip('langgraph')
+pytest.importorskip('langchain_openai')
+tiktoken = pytest.importorskip('tiktoken')
+
+from backend.rag_engine import IngredientAnalyzer  # noqa: E402
+
+# OpenAI only caches prompts of at least this many tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return IngredientAnalyzer(retriever=None, openai_api_key='test-key')
+
+
+def prompts(analyzer):
+    return {
+        **analyzer.prompts,
+        'verdict': analyzer.verdict_prompt,
+        'section': analyzer.section_prompt,
+        'fast': analyzer.fast_prompt
+    }
+
+
+def test_shared_system_prefix_is_cacheable(analyzer):
+    system = analyzer.analysis_prompt.messages[0].prompt.template
+    encoding = tiktoken.get_encoding('o200k_base')
+    assert len(encoding.encode(system)) >= PROMPT_CACHE_MIN_TOKENS
+
+
+def test_request_variables_only_in_the_last_message(analyzer):
+    for name, prompt in prompts(analyzer).items():
+        *fixed, last = prompt.messages
+        assert fixed[0] is analyzer.analysis_prompt.messages[0], name
+        assert all(not message.prompt.input_variables for message in fixed), name
+        assert 'context' in last.prompt.input_variables, name
@@ -0,0 +1,28 @@
+"""Model routing of full analyses."""
+
+import pytest
+
+pytest.importorskip('langgraph')
+
+from backend.rag_engine import IngredientAnalyzer, route_analysis  # noqa: E402
+
+
+@pytest.mark.parametrize('ingredients, expected', [
+    ('Whole Grain Oats, Corn Flour, Salt, Yellow No. 5, Red No. 40', ('fast', 'BAD')),
+    ('Organic Chia Seeds, Organic Buckwheat Kernels', ('full', 'GOOD')),
+    ('Sugar, Corn, Salt', ('full', 'BAD')),
+    ('Whole Grain Wheat, Raisins, Wheat Bran, Sugar, Brown Sugar Syrup, Salt', ('full', 'BAD')),
+    ('Whole Grain Oats, Almonds, Salt, Honey', ('full', 'MODERATE')),
+])
+def test_only_artificial_red_flags_take_the_fast_route(ingredients, expected):
+    assert route_analysis(ingredients) == expected
+
+
+def test_unrouted_analyzer_skips_the_router():
+    analyzer = IngredientAnalyzer.__new__(IngredientAnalyzer)
+    analyzer.model_routing = False
+    assert analyzer._route('full', 'Corn, Red 40') == ''
+
+    analyzer.model_routing = True
+    assert analyzer._route('full', 'Corn, Red 40') == 'fast'
+    assert analyzer._route('quick', 'Corn, Red 40') == ''
@@ -0,0 +1,68 @@
+"""Rule-engine verdicts over real label strings."""
+
+import pytest
+
+from backend.ingredient_parser import canonical_ingredient_names
+from backend.rule_engine import classify_ingredients
+
+FROOT_LOOPS = (
+    'Corn Flour Blend (Whole Grain Yellow Corn Flour, Degerminated Yellow Corn Flour), Sugar, '
+    'Wheat Flour, Whole Grain Oat Flour, Contains 2% or less of Oat Fiber, Soluble Corn Fiber, '
+    'Hydrogenated Vegetable Oil (Coconut, Soybean and/or Cottonseed), Salt, Natural Flavor, '
+    'Red No. 40, Yellow No. 5, Blue No. 1, Yellow No. 6, BHT for Freshness.'
+)
+
+
+@pytest.mark.parametrize('label, expected', [
+    ('Whole Grain Oats, Corn Flour, Salt, Yellow No. 5, Red No. 40, Blue No. 1',
+     ['whole grain oats', 'corn flour', 'salt', 'yellow 5', 'red 40', 'blue 1']),
+    ('Corn, Salt, FD&C Yellow #5, Red 40 Lake, Blue Nr. 1',
+     ['corn', 'salt', 'fd&c yellow 5', 'red 40 lake', 'blue 1']),
+    ('Corn Meal, Salt. Vitamins and Minerals: Niacin', ['corn meal', 'salt', 'niacin']),
+])
+def test_numbered_colors_stay_together(label, expected):
+    assert canonical_ingredient_names(label) == expected
+
+
+def test_numbered_dyes_are_red_flags():
+    result = classify_ingredients('Whole Grain Oats, Corn Flour, Salt, Yellow No. 5, Red No. 40, Blue No. 1')
+    assert result['verdict'] == 'BAD'
+    assert [trigger['ingredient'] for trigger in result['triggers']] == ['yellow 5', 'red 40', 'blue 1']
+
+
+def test_real_label_with_dyes_and_bht():
+    result = classify_ingredients(FROOT_LOOPS)
+    flagged = {trigger['ingredient'] for trigger in result['triggers']}
+    assert result['verdict'] == 'BAD'
+    assert {'red 40', 'yellow 5', 'blue 1', 'yellow 6', 'bht'} <= flagged
+
+
+def test_plain_whole_grain_label_is_good():
+    result = classify_ingredients('Organic Chia Seeds, Organic Buckwheat Kernels, Organic Hulled Hemp Seeds')
+    assert result['verdict'] == 'GOOD'
+    assert result['triggers'] == []
+
+
+@pytest.mark.parametrize('label, sugar', [
+    ('Whole Grain Oats, Chocolate Chips (Sugar, Chocolate, Cocoa Butter), Salt', 'sugar'),
+    ('Milk Chocolate (Sugar, Cocoa Butter, Milk)', 'sugar'),
+    ('Whole Grain Oats, Salt, Cinnamon Clusters (Honey, Oats)', 'honey'),
+])
+def test_nested_added_sugar_is_moderate(label, sugar):
+    result = classify_ingredients(label)
+    assert result['verdict'] == 'MODERATE'
+    assert {'rule': 'added_sugar', 'ingredient': sugar} in [
+        {'rule': trigger['rule'], 'ingredient': trigger['ingredient']} for trigger in result['triggers']
+    ]
+
+
+@pytest.mark.parametrize('label', ['', '   ', ' , ,'])
+def test_empty_label_is_not_good(label):
+    result = classify_ingredients(label)
+    assert result['verdict'] == 'MODERATE'
+    assert [trigger['rule'] for trigger in result['triggers']] == ['no_ingredients']
+
+
+def test_sugar_cane_fiber_is_not_an_added_sugar():
+    assert classify_ingredients('Oats, Sugar Cane Fiber')['verdict'] == 'GOOD'
+    assert classify_ingredients('Oats, Sugar, Salt')['verdict'] == 'BAD'
@@ -0,0 +1,58 @@
+"""Single-flight coalescing for threaded and async callers."""
+
+import asyncio
+
+import pytest
+
+from backend.single_flight import SingleFlight
+
+
+def test_async_duplicates_share_one_run():
+    flight = SingleFlight('test-ado')
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.ado('key', work, 21) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+    assert flight.in_flight() == 0
+
+
+def test_async_errors_reach_every_waiter():
+    flight = SingleFlight('test-ado-error')
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    async def main():
+        return await asyncio.gather(*(flight.ado('key', work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_run():
+    flight = SingleFlight('test-ado-cancel')
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado('key', work))
+        second = asyncio.ensure_future(flight.ado('key', work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 'done'
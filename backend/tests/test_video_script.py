@@ -0,0 +1,31 @@
+"""Speculative and confirmed video scripts agree."""
+
+import pytest
+
+for module in ('requests', 'httpx', 'langchain_openai'):
+    pytest.importorskip(module)
+
+from backend.rule_engine import classify_ingredients, has_artificial_red_flags  # noqa: E402
+from backend.video_generator import VideoGenerator  # noqa: E402
+
+ANALYSIS = "## VERDICT: {verdict} ❌\n\n**Quick Summary:** ...\n\n### 1. Overall Assessment\n..."
+
+
+@pytest.mark.parametrize('ingredients', [
+    'Corn Flour, Sugar, Salt, Red No. 40, Yellow No. 5',  # artificial red flags
+    'Sugar, Corn, Salt',  # BAD by sugar position only
+])
+def test_confirmed_script_matches_speculative_script(ingredients):
+    rule_verdict = classify_ingredients(ingredients)
+    assert rule_verdict['verdict'] == 'BAD'
+    video_gen = VideoGenerator()
+
+    speculative = video_gen.verdict_script('BAD', 'Test Loops', has_artificial_red_flags(rule_verdict))
+    confirmed = video_gen.create_short_script(ANALYSIS.format(verdict='BAD'), 'Test Loops', None, rule_verdict)
+    assert confirmed == speculative
+
+
+def test_structured_report_without_rule_verdict_uses_its_red_flags():
+    report = {'verdict': 'BAD', 'red_flags': [{'ingredient': 'Red 40', 'reason': 'Artificial color'}]}
+    script = VideoGenerator().create_short_script('', 'Test Loops', report)
+    assert 'artificial ingredients' in script
@@ -0,0 +1,39 @@
+"""Analysis worker pool admission and accounting."""
+
+import asyncio
+
+from backend.metrics import metrics
+from backend.worker_pool import AnalysisWorkerPool
+
+
+def test_run_executes_on_the_pool():
+    pool = AnalysisWorkerPool(2, name='test-run')
+    assert pool.run(lambda a, b: a + b, 2, 3) == 5
+    assert pool.stats() == {'max_workers': 2, 'max_async': pool.max_async, 'queued': 0, 'running': 0, 'streaming': 0}
+
+
+def test_streams_outside_the_pool_are_counted():
+    pool = AnalysisWorkerPool(2, name='test-stream')
+    before = metrics.counter_value('worker_pool_unpooled_total', pool='test-stream', route='stream')
+
+    with pool.streaming('stream'):
+        assert pool.stats()['streaming'] == 1
+    assert pool.stats()['streaming'] == 0
+    assert metrics.counter_value('worker_pool_unpooled_total', pool='test-stream', route='stream') == before + 1
+
+
+def test_async_runs_are_admitted_by_slots():
+    pool = AnalysisWorkerPool(2, name='test-async', max_async=1)
+    peak = []
+
+    async def job(value):
+        peak.append(pool.stats()['running'])
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(*(pool.arun(job, i) for i in range(3)))
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert max(peak) == 1
+    assert pool.stats()['queued'] == 0 and pool.stats()['running'] == 0
@@ -5,13 +5,14 @@ import CerealSelector from './components/CerealSelector';
 import AnalysisResults from './components/AnalysisResults';
 import CharacterVideo from './components/CharacterVideo';
 import Chatbot from './components/Chatbot';
-import { checkSystemStatus } from './services/api';
+import { analyzeIngredients, checkSystemStatus, subscribeToMediaJob } from './services/api';
 import './App.css';
 
 function App() {
   const [isInitialized, setIsInitialized] = useState(false);
   const [selectedCereal, setSelectedCereal] = useState(null);
   const [analysisResult, setAnalysisResult] = useState(null);
+  const [expanding, setExpanding] = useState(false);
 
   useEffect(() => {
     // Check system status on mount and periodically if not initialized
@@ -39,6 +40,31 @@ function App() {
     return () => clearInterval(interval);
   }, [isInitialized]);
 
+  // The video is generated in the background; follow its job until it finishes
+  const videoEventsUrl = analysisResult?.video?.events_url;
+  useEffect(() => {
+    if (!videoEventsUrl) {
+      return undefined;
+    }
+    return subscribeToMediaJob(videoEventsUrl, (job) => {
+      setAnalysisResult(prev => {
+        if (!prev || prev.video?.events_url !== videoEventsUrl) {
+          return prev;
+        }
+        return {
+          ...prev,
+          video: {
+            ...prev.video,
+            ...(job.result || {}),
+            status: job.status,
+            success: job.status === 'done',
+            error: job.error || prev.video.error,
+          },
+        };
+      });
+    });
+  }, [videoEventsUrl]);
+
   const handleCerealSelect = (cereal) => {
     setSelectedCereal(cereal);
     setAnalysisResult(null); // Clear previous results
@@ -48,6 +74,26 @@ function App() {
     setAnalysisResult(result);
   };
 
+  // Analyses start as the quick report; fetch the full one only on request
+  const handleExpand = async () => {
+    const { cereal_name: cerealName, ingredients } = analysisResult;
+    setExpanding(true);
+    try {
+      const full = await analyzeIngredients(cerealName, ingredients, 'full', false);
+      if (full.success) {
+        setAnalysisResult(prev => (
+          prev && prev.cereal_name === cerealName
+            ? { ...prev, analysis: full.analysis, mode: full.mode, session_id: full.session_id }
+            : prev
+        ));
+      }
+    } catch (err) {
+      console.log('Could not load the full report:', err);
+    } finally {
+      setExpanding(false);
+    }
+  };
+
   return (
     <div className="app">
       <div className="container">
@@ -74,11 +120,12 @@ function App() {
                   productName={analysisResult.cereal_name}
                 />
               )}
-              <AnalysisResults result={analysisResult} />
+              <AnalysisResults result={analysisResult} onExpand={handleExpand} expanding={expanding} />
               <Chatbot 
                 cerealName={analysisResult.cereal_name}
                 ingredients={analysisResult.ingredients}
                 analysisResult={analysisResult.analysis}
+                sessionId={analysisResult.session_id}
               />
             </>
           )}
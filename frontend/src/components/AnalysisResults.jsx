@@ -1,6 +1,6 @@
 import React from 'react';
 
-const AnalysisResults = ({ result }) => {
+const AnalysisResults = ({ result, onExpand, expanding }) => {
   // Convert markdown-style formatting to HTML
   const formatAnalysis = (text) => {
     let html = text
@@ -33,6 +33,11 @@ const AnalysisResults = ({ result }) => {
           className="analysis-results"
           dangerouslySetInnerHTML={{ __html: formatAnalysis(result.analysis) }}
         />
+        {result.mode === 'quick' && onExpand && (
+          <button className="expand-btn" onClick={onExpand} disabled={expanding}>
+            {expanding ? 'Loading full report...' : 'Show full report'}
+          </button>
+        )}
       </div>
     </div>
   );
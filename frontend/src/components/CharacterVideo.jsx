@@ -7,7 +7,7 @@ const CharacterVideo = ({ videoData, productName }) => {
     return null;
   }
 
-  const { success, video_url, script, has_api } = videoData;
+  const { success, video_url, script, has_api, status } = videoData;
 
   // If D-ID API not configured
   if (!has_api) {
@@ -40,6 +40,28 @@ const CharacterVideo = ({ videoData, productName }) => {
     );
   }
 
+  // Background video job failed or was cancelled: show the script instead
+  if (status === 'failed' || status === 'cancelled') {
+    return (
+      <div className="character-section">
+        <div className="character-card no-video">
+          <div className="character-header">
+            <div className="character-avatar">🐶</div>
+            <div>
+              <h3>Berry's Quick Take: {productName}</h3>
+              <p>The video couldn't be generated this time</p>
+            </div>
+          </div>
+          {script && (
+            <div className="character-message">
+              <p>{script}</p>
+            </div>
+          )}
+        </div>
+      </div>
+    );
+  }
+
   // Video is being generated
   if (!success && !video_url) {
     return (
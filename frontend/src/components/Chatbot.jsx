@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { sendChatMessage } from '../services/api';
 
-const Chatbot = ({ cerealName, ingredients, analysisResult }) => {
+const Chatbot = ({ cerealName, ingredients, analysisResult, sessionId: initialSessionId }) => {
   const [messages, setMessages] = useState([
     {
       role: 'assistant',
@@ -10,6 +10,8 @@ const Chatbot = ({ cerealName, ingredients, analysisResult }) => {
   ]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  // Server-side chat session: once we have one, only the question is sent
+  const [sessionId, setSessionId] = useState(initialSessionId || null);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -31,14 +33,29 @@ const Chatbot = ({ cerealName, ingredients, analysisResult }) => {
     setMessages((prev) => [...prev, { role: 'user', content: userMessage }]);
     setLoading(true);
 
+    const fullPayload = {
+      cereal_name: cerealName,
+      ingredients: ingredients,
+      previous_analysis: analysisResult,
+      question: userMessage,
+      chat_history: messages,
+    };
+
     try {
-      const response = await sendChatMessage({
-        cereal_name: cerealName,
-        ingredients: ingredients,
-        previous_analysis: analysisResult,
-        question: userMessage,
-        chat_history: messages,
-      });
+      let response;
+      try {
+        response = await sendChatMessage(
+          sessionId ? { session_id: sessionId, question: userMessage } : fullPayload
+        );
+      } catch (error) {
+        // Session expired on the server: start a new one with the full context
+        if (error.response?.data?.error_code !== 'session_expired') throw error;
+        response = await sendChatMessage(fullPayload);
+      }
+
+      if (response.session_id) {
+        setSessionId(response.session_id);
+      }
 
       if (response.success) {
         setMessages((prev) => [
@@ -24,14 +24,33 @@ export const configureAPIKeys = async (config) => {
   return response.data;
 };
 
-export const analyzeIngredients = async (cerealName, ingredients) => {
+// The results card and its media only need the quick analysis; request 'full'
+// (without another video) when the user expands the report.
+export const analyzeIngredients = async (cerealName, ingredients, mode = 'quick', generateVideo = true) => {
   const response = await api.post('/api/analyze', {
     cereal_name: cerealName,
     ingredients: ingredients,
+    mode: mode,
+    generate_video: generateVideo,
   });
   return response.data;
 };
 
+// Follow a background media job (video/audio) over server-sent events.
+// Calls onStatus with the job on every status change; returns an unsubscribe function.
+export const subscribeToMediaJob = (eventsUrl, onStatus) => {
+  const source = new EventSource(`${API_BASE_URL}${eventsUrl}`);
+  source.addEventListener('status', (event) => {
+    const job = JSON.parse(event.data);
+    onStatus(job);
+    if (['done', 'failed', 'cancelled'].includes(job.status)) {
+      source.close();
+    }
+  });
+  source.addEventListener('error', () => source.close());
+  return () => source.close();
+};
+
 export const sendChatMessage = async (chatData) => {
   const response = await api.post('/api/chat', chatData);
   return response.data;